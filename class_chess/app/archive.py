@@ -0,0 +1,255 @@
+"""Compact binary game archives.
+
+Each move is stored as one byte: its index in the sorted legal moves of
+the position it is played from (a position never has more than 218), so
+a game costs its ply count in bytes plus a small record header. Decoding
+replays the game through the move generator.
+
+Layout, all integers little-endian:
+
+* ``HEADER``: ``MAGIC``, game count, index offset.
+* Game records, each a ``GAME_HEADER`` (ply count, result code, starting
+  FEN length, tag block length) followed by the FEN (empty for the
+  standard start), the tags as ``name\\tvalue\\n`` UTF-8 lines and one
+  byte per ply. Backslashes, tabs, carriage returns and newlines in tag
+  names and values are backslash-escaped.
+* The index: game count + 1 uint64 record offsets, the last one marking
+  the end of the final record.
+
+The index makes any game, and the move byte of any of its plies, reachable
+in O(1) from a memory map of the file.
+"""
+
+from __future__ import annotations
+
+import mmap
+import os
+import re
+import struct
+from typing import Iterable, Iterator
+
+import numpy as np
+
+from movegen import legal_moves
+from pgn import Game
+from position import STARTING_FEN, Position
+
+MAGIC = b"TCARCH01"
+HEADER = struct.Struct("<8sQQ")
+GAME_HEADER = struct.Struct("<HBBH")
+RESULT_CODES = {"*": 0, "1-0": 1, "0-1": 2, "1/2-1/2": 3}
+RESULTS = {code: result for result, code in RESULT_CODES.items()}
+TAG_ESCAPES = {"\\": "\\\\", "\t": "\\t", "\r": "\\r", "\n": "\\n"}
+TAG_UNESCAPES = {"\\": "\\", "t": "\t", "r": "\r", "n": "\n"}
+
+
+def escape_tag(text: str) -> str:
+    """Returns text with the characters of the tag block escaped."""
+    return "".join(TAG_ESCAPES.get(char, char) for char in text)
+
+
+def unescape_tag(text: str) -> str:
+    """Reverts ``escape_tag``."""
+    return re.sub(r"\\(.)", lambda match: TAG_UNESCAPES[match[1]], text)
+
+
+def encode_moves(position: Position, moves: Iterable[int]) -> bytes:
+    """Returns the legal-move indices of moves played from a position.
+
+    The position is left unchanged.
+    """
+    encoded = bytearray()
+    played = 0
+    try:
+        for move in moves:
+            encoded.append(sorted(legal_moves(position)).index(move))
+            position.make_move(move)
+            played += 1
+    finally:
+        for _ in range(played):
+            position.unmake_move()
+    return bytes(encoded)
+
+
+def decode_moves(position: Position, data: bytes) -> list[int]:
+    """Returns the moves encoded by ``encode_moves``, leaving position as is."""
+    moves = []
+    try:
+        for index in data:
+            move = sorted(legal_moves(position))[index]
+            position.make_move(move)
+            moves.append(move)
+    finally:
+        for _ in moves:
+            position.unmake_move()
+    return moves
+
+
+class ArchiveWriter:
+    """Writes games to a new archive file.
+
+    Records stream to a temporary file; ``close`` appends the index and
+    renames it into place, so a crash never leaves a partial archive. A
+    ``with`` block that raises discards the archive instead.
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        self._temporary = f"{path}.tmp"
+        self._file = open(self._temporary, "wb")  # pylint: disable=consider-using-with
+        self._file.write(HEADER.pack(MAGIC, 0, 0))
+        self._offsets = [HEADER.size]
+
+    def add(self, game: Game) -> None:
+        """Appends a game."""
+        position = game.starting_position()
+        fen = position.fen()
+        fen_bytes = b"" if fen == STARTING_FEN else fen.encode("ascii")
+        tags = "".join(
+            f"{escape_tag(name)}\t{escape_tag(value)}\n"
+            for name, value in game.headers.items()
+            if name not in ("FEN", "SetUp")
+        ).encode("utf-8")
+        moves = encode_moves(position, game.moves)
+        if len(moves) > 0xFFFF or len(tags) > 0xFFFF:
+            raise ValueError("Game too long for the archive format")
+        self._file.write(
+            GAME_HEADER.pack(
+                len(moves),
+                RESULT_CODES.get(game.headers.get("Result", "*"), 0),
+                len(fen_bytes),
+                len(tags),
+            )
+        )
+        self._file.write(fen_bytes)
+        self._file.write(tags)
+        self._file.write(moves)
+        self._offsets.append(
+            self._offsets[-1]
+            + GAME_HEADER.size
+            + len(fen_bytes)
+            + len(tags)
+            + len(moves)
+        )
+
+    def close(self) -> None:
+        """Writes the index and moves the archive into place."""
+        if self._file.closed:
+            return
+        index_offset = self._offsets[-1]
+        self._file.write(np.asarray(self._offsets, dtype="<u8").tobytes())
+        self._file.seek(0)
+        self._file.write(HEADER.pack(MAGIC, len(self._offsets) - 1, index_offset))
+        self._file.flush()
+        os.fsync(self._file.fileno())
+        self._file.close()
+        os.replace(self._temporary, self.path)
+
+    def discard(self) -> None:
+        """Deletes the games written so far without creating the archive."""
+        if self._file.closed:
+            return
+        self._file.close()
+        os.remove(self._temporary)
+
+    def __enter__(self) -> ArchiveWriter:
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback) -> None:
+        if exc_type is None:
+            self.close()
+        else:
+            self.discard()
+
+
+def write_archive(path: str, games: Iterable[Game]) -> None:
+    """Writes games to an archive file."""
+    with ArchiveWriter(path) as writer:
+        for game in games:
+            writer.add(game)
+
+
+class Archive:
+    """Random access to the games of a memory-mapped archive."""
+
+    def __init__(self, path: str):
+        self.path = path
+        with open(path, "rb") as archive:
+            self._map = mmap.mmap(archive.fileno(), 0, access=mmap.ACCESS_READ)
+        magic, count, index_offset = HEADER.unpack_from(self._map)
+        if magic != MAGIC:
+            raise ValueError(f"Not a game archive: {path}")
+        self.offsets = np.frombuffer(
+            self._map, dtype="<u8", count=count + 1, offset=index_offset
+        )
+
+    def __len__(self) -> int:
+        return len(self.offsets) - 1
+
+    def _offset(self, index: int) -> int:
+        """Returns the file offset of a game, checking the index."""
+        if not 0 <= index < len(self):
+            raise IndexError(f"Game index out of range: {index}")
+        return int(self.offsets[index])
+
+    def _record(self, index: int) -> tuple[int, int, str, int]:
+        """Returns the ply count, result code, FEN and move offset of a game."""
+        offset = self._offset(index)
+        plies, result, fen_length, tags_length = GAME_HEADER.unpack_from(
+            self._map, offset
+        )
+        offset += GAME_HEADER.size
+        fen = self._map[offset : offset + fen_length].decode("ascii") or STARTING_FEN
+        return plies, result, fen, offset + fen_length + tags_length
+
+    def headers(self, index: int) -> dict[str, str]:
+        """Returns the tags of a game, without replaying it."""
+        offset = self._offset(index)
+        _, result, fen_length, tags_length = GAME_HEADER.unpack_from(self._map, offset)
+        start = offset + GAME_HEADER.size + fen_length
+        lines = self._map[start : start + tags_length].decode("utf-8").split("\n")
+        headers = dict(map(unescape_tag, line.split("\t", 1)) for line in lines if line)
+        headers["Result"] = RESULTS[result]
+        if fen_length:
+            headers["SetUp"] = "1"
+            headers["FEN"] = self._map[offset + GAME_HEADER.size : start].decode(
+                "ascii"
+            )
+        return headers
+
+    def plies(self, index: int) -> int:
+        """Returns the number of moves of a game."""
+        return self._record(index)[0]
+
+    def moves(self, index: int, plies: int | None = None) -> list[int]:
+        """Returns the moves of a game, or only its first plies."""
+        count, _, fen, offset = self._record(index)
+        if plies is not None:
+            count = min(count, plies)
+        return decode_moves(Position.from_fen(fen), self._map[offset : offset + count])
+
+    def position(self, index: int, ply: int) -> Position:
+        """Returns the position of a game after ply moves."""
+        _, _, fen, _ = self._record(index)
+        position = Position.from_fen(fen)
+        for move in self.moves(index, ply):
+            position.make_move(move)
+        return position
+
+    def __getitem__(self, index: int) -> Game:
+        return Game.from_moves(self.moves(index), self.headers(index))
+
+    def __iter__(self) -> Iterator[Game]:
+        for index in range(len(self)):
+            yield self[index]
+
+    def close(self) -> None:
+        """Releases the memory map."""
+        self.offsets = None
+        self._map.close()
+
+    def __enter__(self) -> Archive:
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        self.close()
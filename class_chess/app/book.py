@@ -0,0 +1,128 @@
+"""Polyglot opening book reader.
+
+A Polyglot book is a sorted array of 16-byte big-endian entries: the
+Polyglot hash of a position, a move, a weight and a learn value. The file
+is memory-mapped and the entries of a position are found by binary search,
+so a lookup reads a handful of pages whatever the book size.
+"""
+
+from __future__ import annotations
+
+import mmap
+import random
+import struct
+from typing import NamedTuple
+
+from movegen import legal_moves
+from position import BLACK, KING, PAWN, WHITE, Position, iter_bits
+from polyglot_keys import RANDOM64
+
+ENTRY = struct.Struct(">QHHI")
+CASTLING_OFFSET = 768
+EP_OFFSET = 772
+TURN_OFFSET = 780
+# Polyglot castling key order: white short, white long, black short, black long.
+CASTLING_BITS = (1, 2, 4, 8)
+# A castling king move is stored as the king capturing its own rook.
+CASTLING_MOVES = {(4, 7): 6, (4, 0): 2, (60, 63): 62, (60, 56): 58}
+
+
+class BookEntry(NamedTuple):
+    move: int
+    weight: int
+    learn: int
+
+
+def polyglot_key(position: Position) -> int:
+    """Returns the Polyglot hash of a position."""
+    key = 0
+    for color in (WHITE, BLACK):
+        for piece_type, bitboard in enumerate(position.pieces[color]):
+            base = 64 * (2 * piece_type + (color == WHITE))
+            for sq in iter_bits(bitboard):
+                key ^= RANDOM64[base + sq]
+    for index, right in enumerate(CASTLING_BITS):
+        if position.castling & right:
+            key ^= RANDOM64[CASTLING_OFFSET + index]
+    # Position only records the en passant square when a pawn can capture,
+    # which is exactly when Polyglot hashes it.
+    if position.ep_square is not None:
+        key ^= RANDOM64[EP_OFFSET + (position.ep_square & 7)]
+    if position.turn == WHITE:
+        key ^= RANDOM64[TURN_OFFSET]
+    return key
+
+
+def decode_move(position: Position, book_move: int) -> int:
+    """Returns the move encoding of a Polyglot book move in a position."""
+    from_sq, to_sq, promotion = book_move >> 6 & 63, book_move & 63, book_move >> 12
+    piece = position.mailbox[from_sq]
+    if piece and piece[1] == KING and (from_sq, to_sq) in CASTLING_MOVES:
+        to_sq = CASTLING_MOVES[from_sq, to_sq]
+    # Polyglot numbers promotions knight 1 to queen 4, as movegen does.
+    return from_sq | to_sq << 6 | (promotion if piece and piece[1] == PAWN else 0) << 12
+
+
+class PolyglotBook:
+    """Looks up book moves in a memory-mapped Polyglot file."""
+
+    def __init__(self, path: str):
+        self.path = path
+        with open(path, "rb") as book:
+            self._map = mmap.mmap(book.fileno(), 0, access=mmap.ACCESS_READ)
+        self.size = len(self._map) // ENTRY.size
+
+    def _key_at(self, index: int) -> int:
+        """Returns the hash of an entry."""
+        return ENTRY.unpack_from(self._map, index * ENTRY.size)[0]
+
+    def entries(self, position: Position) -> list[BookEntry]:
+        """Returns the legal book entries of a position, heaviest first."""
+        key = polyglot_key(position)
+        low, high = 0, self.size
+        while low < high:
+            middle = (low + high) // 2
+            if self._key_at(middle) < key:
+                low = middle + 1
+            else:
+                high = middle
+        moves = legal_moves(position)
+        found = []
+        for index in range(low, self.size):
+            entry_key, move, weight, learn = ENTRY.unpack_from(
+                self._map, index * ENTRY.size
+            )
+            if entry_key != key:
+                break
+            move = decode_move(position, move)
+            if move in moves:
+                found.append(BookEntry(move, weight, learn))
+        found.sort(key=lambda entry: -entry.weight)
+        return found
+
+    def choose(
+        self, position: Position, rng: random.Random | None = None
+    ) -> int | None:
+        """Returns a book move picked with probability by weight, if any.
+
+        Without a random generator the heaviest move is returned.
+        """
+        entries = [entry for entry in self.entries(position) if entry.weight]
+        if not entries:
+            return None
+        if rng is None:
+            return entries[0].move
+        return rng.choices(
+            [entry.move for entry in entries],
+            weights=[entry.weight for entry in entries],
+        )[0]
+
+    def close(self) -> None:
+        """Releases the memory map."""
+        self._map.close()
+
+    def __enter__(self) -> PolyglotBook:
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        self.close()
@@ -1,8 +1,13 @@
+from __future__ import annotations
+
 from dataclasses import dataclass
 
-import pygame
+from chess_set import ChessSet, Piece, get_piece_factory
+from lazy import lazy_import
+from pgn import Game
+from position import COLOR_NAMES, PIECE_NAMES, Position, square_at
 
-from chess_set import ChessSet, Piece
+pygame = lazy_import("pygame")
 
 
 @dataclass
@@ -10,6 +15,11 @@ class Coordinate:
     x: int
     y: int
 
+    @property
+    def square(self) -> int:
+        """Returns the position square index of the coordinate."""
+        return square_at(self.x, self.y)
+
     def __str__(self):
         return f"{chr(self.x + 97)}{8 - self.y}"
 
@@ -35,17 +45,44 @@ class Square:
 
 
 class ChessBoard:
-    def __init__(self, square_size, board_pos):
+    def __init__(self, square_size, board_pos, position: Position = None):
         self.square_size = square_size
         self.board_pos = board_pos
+        self.position = position or Position.starting()
         self.board, self.grid = self.__create_board_surface()
+        self.dirty_squares: list[Square] = []
+
+    @classmethod
+    def from_fen(cls, fen: str, square_size, board_pos) -> ChessBoard:
+        """Returns a board set up from a FEN string."""
+        return cls(square_size, board_pos, Position.from_fen(fen))
+
+    @classmethod
+    def from_game(cls, game: Game, square_size, board_pos) -> ChessBoard:
+        """Returns a board with the moves of a game played, ready for undo."""
+        position = game.starting_position()
+        for move in game.moves:
+            position.make_move(move)
+        return cls(square_size, board_pos, position)
+
+    def fen(self) -> str:
+        """Returns the FEN string of the board's position."""
+        return self.position.fen()
+
+    def game(self, headers: dict[str, str] | None = None) -> Game:
+        """Returns the moves played on the board as a game."""
+        start = self.position.copy()
+        while start.history:
+            start.unmake_move()
+        moves = [undo.move for undo in self.position.history]
+        return Game.from_moves(moves, headers, start)
 
     def __create_board_surface(self) -> tuple[pygame.Surface, list[list[Square]]]:
         """Create a surface for the chess board."""
         board = pygame.Surface((self.square_size * 8, self.square_size * 8))
         board.fill((255, 255, 255))
         grid: list[list[Square]] = [[None for x in range(8)] for y in range(8)]
-        chess_set = ChessSet(board, grid)
+        chess_set = ChessSet(board, self.position)
 
         for y in range(8):
             for x in range(8):
@@ -70,18 +107,69 @@ class ChessBoard:
                 )
                 square.draw_square()
 
-                piece: Piece = None
-                if 0 <= y <= 1:
-                    piece = next(chess_set.chess_set["black"])
-                    piece.blitme(rect.center)
-                elif 6 <= y <= 7:
-                    piece = next(chess_set.chess_set["white"])
+                piece: Piece = chess_set.chess_set.get(square.cord.square)
+                if piece:
                     piece.blitme(rect.center)
                 square.piece = piece
 
                 grid[x][y] = square
         return board, grid
 
+    def play_move(self, move: int) -> None:
+        """Plays a legal move on the position and redraws the board."""
+        self.position.make_move(move)
+        self.sync_squares()
+
+    def undo_move(self) -> None:
+        """Takes back the last move and redraws the board."""
+        if self.position.history:
+            self.position.unmake_move()
+            self.sync_squares()
+
+    def sync_squares(self) -> None:
+        """Redraws every square whose piece no longer matches the position."""
+        stale: list[Square] = []
+        for column in self.grid:
+            for square in column:
+                occupant = self.position.piece_at(square.cord.square)
+                expected = occupant and (
+                    COLOR_NAMES[occupant[0]],
+                    PIECE_NAMES[occupant[1]],
+                )
+                current = square.piece and (square.piece.color, square.piece.name)
+                if expected != current:
+                    stale.append(square)
+        self.dirty_squares.extend(stale)
+
+        spare: dict[tuple[str, str], list[Piece]] = {}
+        for square in stale:
+            if square.piece:
+                spare.setdefault((square.piece.color, square.piece.name), []).append(
+                    square.piece
+                )
+            square.piece = None
+            square.draw_square()
+
+        for square in stale:
+            occupant = self.position.piece_at(square.cord.square)
+            if occupant:
+                color, name = COLOR_NAMES[occupant[0]], PIECE_NAMES[occupant[1]]
+                pieces = spare.get((color, name))
+                square.piece = (
+                    pieces.pop()
+                    if pieces
+                    else get_piece_factory(name).create_piece(
+                        self.board, self.position, color
+                    )
+                )
+                square.piece.blitme(square.rect.center)
+
+    def pop_dirty_rects(self) -> list[pygame.Rect]:
+        """Returns and forgets the screen rects of squares redrawn since last call."""
+        rects = [square.rect.move(self.board_pos) for square in self.dirty_squares]
+        self.dirty_squares = []
+        return rects
+
     def get_square_under_mouse(self) -> Square:
         mouse_pos = pygame.Vector2(pygame.mouse.get_pos()) - pygame.Vector2(
             self.board_pos
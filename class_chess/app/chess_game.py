@@ -1,4 +1,6 @@
 import sys
+from concurrent.futures import Future, ThreadPoolExecutor
+from time import perf_counter
 
 from pygame import constants
 from pygame import event
@@ -6,9 +8,16 @@ from pygame import base
 from pygame import display
 from pygame import time
 from pygame import mouse
+from pygame import draw
+from pygame import Rect
 
 from settings import Settings
 from chess_board import ChessBoard, Square
+from metrics import METRICS
+from search import Searcher, SearchLimits
+
+# Posted by the search thread when an engine move is ready.
+ENGINE_DONE = constants.USEREVENT
 
 
 class ChessGame:
@@ -26,51 +35,143 @@ class ChessGame:
             self.settings.square_size, self.settings.board_pos
         )
         self.selection: Square = None
+        self.searcher = Searcher()
+        self.executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="search")
+        self.engine_search: Future = None
+        self.engine_start: tuple[int, int] = None
+        self.dirty_rects: list[Rect] = [self.screen.get_rect()]
+        self.drag_rect: Rect = None
 
     def run_game(self):
         while True:
-            self._check_events()
+            events = self._wait_for_events()
+            # Time spent waiting for input is idle, not event handling.
+            start = perf_counter()
+            self._check_events(events)
+            handled = perf_counter()
             self._update_screen()
-            self.clock.tick(60)
+            METRICS.observe("ui_event_handling", handled - start)
+            METRICS.observe("ui_frame", perf_counter() - handled)
+            if self.selection:
+                self.clock.tick(self.settings.drag_fps)
+
+    def _wait_for_events(self):
+        """Returns pending events, sleeping until one arrives when idle."""
+        if self.selection or self.dirty_rects:
+            return event.get()
+        return [event.wait(), *event.get()]
 
-    def _check_events(self):
-        for this_event in event.get():
+    def _check_events(self, events):
+        for this_event in events:
             if this_event.type == constants.QUIT:
-                sys.exit()
+                self._quit()
+            elif this_event.type == ENGINE_DONE:
+                self._finish_engine_move()
             elif this_event.type == constants.KEYDOWN:
                 if this_event.key == constants.K_q:
-                    sys.exit()
+                    self._quit()
+                elif this_event.key in (constants.K_u, constants.K_BACKSPACE):
+                    self._stop_engine()
+                    self.chess_board.undo_move()
+                elif this_event.key == constants.K_e:
+                    self._start_engine_move()
             elif this_event.type == constants.MOUSEBUTTONDOWN:
                 square = self.chess_board.get_square_under_mouse()
                 if square and square.piece:
                     self.selection = square
+                    self.dirty_rects.append(self._screen_rect(square.rect))
 
             elif this_event.type == constants.MOUSEBUTTONUP:
                 square = self.chess_board.get_square_under_mouse()
-                if (
-                    square
-                    and self.selection
-                    and (square != self.selection)
-                    and self.selection.piece.validator(
-                        self.selection, square, self.selection.piece.direction
-                    )
-                ):
-                    square.piece = self.selection.piece
-                    self.selection.piece = None
-                    square.draw_square()
-                    square.piece.blitme(square.rect.center)
-                    self.selection.draw_square()
+                move = None
+                if square and self.selection and (square != self.selection):
+                    move = self.selection.piece.validator(self.selection, square)
+                if move is not None:
+                    self._stop_engine()
+                    self.chess_board.play_move(move)
 
+                if self.selection:
+                    self.dirty_rects.append(self._screen_rect(self.selection.rect))
                 self.selection = None
+            elif this_event.type in (constants.VIDEOEXPOSE, constants.WINDOWEXPOSED):
+                self.dirty_rects.append(self.screen.get_rect())
+
+    def _start_engine_move(self):
+        """Starts searching a move for the side to move in the background.
+
+        Events keep being handled during the search; the move is played
+        when the search thread posts ENGINE_DONE.
+        """
+        if self.engine_search is not None:
+            return
+        position = self.chess_board.position
+        self.engine_start = (position.key, len(position.history))
+        self.engine_search = self.executor.submit(
+            self.searcher.search,
+            position.copy(),
+            SearchLimits(movetime=self.settings.engine_movetime),
+        )
+        self.engine_search.add_done_callback(
+            lambda _: event.post(event.Event(ENGINE_DONE))
+        )
+
+    def _finish_engine_move(self):
+        """Plays the searched move unless the position changed meanwhile."""
+        search, self.engine_search = self.engine_search, None
+        if search is None:
+            return
+        result = search.result()
+        position = self.chess_board.position
+        if (
+            result.move is not None
+            and (position.key, len(position.history)) == self.engine_start
+        ):
+            self.chess_board.play_move(result.move)
+
+    def _stop_engine(self):
+        """Cuts a running search short; its move will be discarded."""
+        if self.engine_search is not None:
+            self.searcher.stop()
+
+    def _quit(self):
+        self._stop_engine()
+        self.executor.shutdown()
+        sys.exit()
+
+    def _screen_rect(self, board_rect: Rect) -> Rect:
+        """Returns the screen rect of a rect on the board surface."""
+        return board_rect.move(self.settings.board_pos)
 
     def _update_screen(self):
-        self.screen.fill(self.settings.bg_color)
-        self.screen.blit(self.chess_board.board, self.settings.board_pos)
+        """Redraws and presents only the regions that changed."""
+        dirty = self.dirty_rects + self.chess_board.pop_dirty_rects()
+        self.dirty_rects = []
+
+        drag_rect = None
+        if self.selection:
+            drag_rect = self.selection.piece.image.get_rect(topleft=mouse.get_pos())
+        if drag_rect != self.drag_rect:
+            dirty.extend(rect for rect in (self.drag_rect, drag_rect) if rect)
+            self.drag_rect = drag_rect
+        if not dirty:
+            return
 
+        board_pos = self.settings.board_pos
+        for rect in dirty:
+            self.screen.fill(self.settings.bg_color, rect)
+            self.screen.blit(
+                self.chess_board.board, rect, rect.move(-board_pos[0], -board_pos[1])
+            )
         if self.selection:
-            self.screen.blit(self.selection.piece.image, mouse.get_pos())
+            draw.rect(
+                self.screen,
+                self.settings.highlight_color,
+                self._screen_rect(self.selection.rect),
+                4,
+            )
+            self.screen.blit(self.selection.piece.image, drag_rect)
 
-        display.flip()
+        display.update(dirty)
 
 
 if __name__ == "__main__":
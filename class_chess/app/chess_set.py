@@ -1,78 +1,46 @@
 from __future__ import annotations
-from itertools import product
-from typing import Any, TYPE_CHECKING, Callable
+from typing import TYPE_CHECKING, Callable
 from dataclasses import dataclass, field
 from abc import ABC, abstractmethod
 
-
-import pygame
-
-from spritesheet import SpriteSheet
 from chess_moves import get_validator
 
+from position import COLOR_NAMES, PIECE_NAMES, iter_bits
+
 if TYPE_CHECKING:
+    import pygame
+
     from chess_board import Square
+    from position import Position
 
 
 class ChessSet:
     """Represents a set of chess pieces. Each piece is an object of the Piece class."""
 
-    def __init__(self, screen: pygame.Surface, grid: list[list[Square]]) -> None:
+    def __init__(self, screen: pygame.Surface, position: Position) -> None:
         """Initializes attributes of a chess set.
 
         Args:
-            screen (Surface): _description_
+            screen (Surface): Surface the pieces are drawn on.
+            position (Position): Position the pieces are created from.
         """
         self.screen = screen
-        self.grid = grid
+        self.position = position
         self.__chess_set = self.__create_set()
 
     @property
-    def chess_set(self) -> dict[str, list[Any]]:
-        """Returns the chess set."""
+    def chess_set(self) -> dict[int, Piece]:
+        """Returns the chess set keyed by square index."""
         return self.__chess_set
 
-    def __create_set(self) -> dict[str, list[Any]]:
-        """Creates a list of chess pieces."""
-        colors = ["white", "black"]
-
-        pieces = {
-            color: (iter if color == "black" else reversed)(
-                [
-                    get_piece_factory("rook").create_piece(
-                        self.screen, self.grid, color
-                    ),
-                    get_piece_factory("knight").create_piece(
-                        self.screen, self.grid, color
-                    ),
-                    get_piece_factory("bishop").create_piece(
-                        self.screen, self.grid, color
-                    ),
-                    get_piece_factory("queen").create_piece(
-                        self.screen, self.grid, color
-                    ),
-                    get_piece_factory("king").create_piece(
-                        self.screen, self.grid, color
-                    ),
-                    get_piece_factory("bishop").create_piece(
-                        self.screen, self.grid, color
-                    ),
-                    get_piece_factory("knight").create_piece(
-                        self.screen, self.grid, color
-                    ),
-                    get_piece_factory("rook").create_piece(
-                        self.screen, self.grid, color
-                    ),
-                    *[
-                        get_piece_factory("pawn").create_piece(
-                            self.screen, self.grid, color
-                        )
-                        for _ in range(8)
-                    ],
-                ]
+    def __create_set(self) -> dict[int, Piece]:
+        """Creates a chess piece for every occupied square of the position."""
+        pieces = {}
+        for sq in iter_bits(self.position.occupancy):
+            color, piece_type = self.position.piece_at(sq)
+            pieces[sq] = get_piece_factory(PIECE_NAMES[piece_type]).create_piece(
+                self.screen, self.position, COLOR_NAMES[color]
             )
-            for color in colors
-        }
         return pieces
 
 
@@ -96,7 +64,7 @@ class PieceFactory(ABC):
 
     @abstractmethod
     def create_piece(
-        self, screen: pygame.Surface, grid: list[list[Square]], color: str
+        self, screen: pygame.Surface, position: Position, color: str
     ) -> Piece:
         """Creates a chess piece."""
 
@@ -105,60 +73,64 @@ class PawnFactory(PieceFactory):
     """Creates a pawn chess piece."""
 
     def create_piece(
-        self, screen: pygame.Surface, grid: list[list[Square]], color: str
+        self, screen: pygame.Surface, position: Position, color: str
     ) -> Piece:
         """Creates a pawn chess piece."""
-        return Piece(screen, "pawn", color, get_validator("pawn")(grid).validate)
+        return Piece(screen, "pawn", color, get_validator("pawn")(position).validate)
 
 
 class RookFactory(PieceFactory):
     """Creates a rook chess piece."""
 
     def create_piece(
-        self, screen: pygame.Surface, grid: list[list[Square]], color: str
+        self, screen: pygame.Surface, position: Position, color: str
     ) -> Piece:
         """Creates a rook chess piece."""
-        return Piece(screen, "rook", color, get_validator("rook")(grid).validate)
+        return Piece(screen, "rook", color, get_validator("rook")(position).validate)
 
 
 class KnightFactory(PieceFactory):
     """Creates a knight chess piece."""
 
     def create_piece(
-        self, screen: pygame.Surface, grid: list[list[Square]], color: str
+        self, screen: pygame.Surface, position: Position, color: str
     ) -> Piece:
         """Creates a knight chess piece."""
-        return Piece(screen, "knight", color, get_validator("knight")().validate)
+        return Piece(
+            screen, "knight", color, get_validator("knight")(position).validate
+        )
 
 
 class BishopFactory(PieceFactory):
     """Creates a bishop chess piece."""
 
     def create_piece(
-        self, screen: pygame.Surface, grid: list[list[Square]], color: str
+        self, screen: pygame.Surface, position: Position, color: str
     ) -> Piece:
         """Creates a bishop chess piece."""
-        return Piece(screen, "bishop", color, get_validator("bishop")(grid).validate)
+        return Piece(
+            screen, "bishop", color, get_validator("bishop")(position).validate
+        )
 
 
 class QueenFactory(PieceFactory):
     """Creates a queen chess piece."""
 
     def create_piece(
-        self, screen: pygame.Surface, grid: list[list[Square]], color: str
+        self, screen: pygame.Surface, position: Position, color: str
     ) -> Piece:
         """Creates a queen chess piece."""
-        return Piece(screen, "queen", color, get_validator("queen")(grid).validate)
+        return Piece(screen, "queen", color, get_validator("queen")(position).validate)
 
 
 class KingFactory(PieceFactory):
     """Creates a king chess piece."""
 
     def create_piece(
-        self, screen: pygame.Surface, grid: list[list[Square]], color: str
+        self, screen: pygame.Surface, position: Position, color: str
     ) -> Piece:
         """Creates a king chess piece."""
-        return Piece(screen, "king", color, get_validator("king")(grid).validate)
+        return Piece(screen, "king", color, get_validator("king")(position).validate)
 
 
 @dataclass
@@ -166,35 +138,30 @@ class Piece:
     screen: pygame.Surface
     name: str
     color: str
-    validator: Callable[[Square, Square], bool] = None
-    image: pygame.Surface = field(init=False)
+    validator: Callable[[Square, Square], int | None] = None
     rect: pygame.Rect = field(init=False)
     direction: int = None
+    _image: pygame.Surface = field(init=False, default=None, repr=False)
 
     def __str__(self) -> str:
         return f"{self.color} {self.name}"
 
     def __post_init__(self):
-        self.__load_images()
-        self.image = self._piece_images[(self.color, self.name)]
         self.direction = -1 if self.color == "white" else 1
 
+    @property
+    def image(self) -> pygame.Surface:
+        """Returns the piece sprite, loading the sheet on first use."""
+        if self._image is None:
+            # Imported here so the rules can be used without pygame.
+            # pylint: disable-next=import-outside-toplevel
+            from spritesheet import get_atlas
+
+            self._image = get_atlas().sprite(self.color, self.name)
+        return self._image
+
     def blitme(self, center: tuple[int, int]) -> None:
         """Draws the piece at its current location."""
         self.rect = self.image.get_rect()
         self.rect.center = center
         self.screen.blit(self.image, self.rect)
-
-    def __load_images(self) -> None:
-        """_summary_"""
-        filename = "graphics/chess_pieces.bmp"
-        pieces_ss = SpriteSheet(filename)
-
-        colors = ["black", "white"]
-        names = ["king", "queen", "rook", "bishop", "knight", "pawn"]
-
-        self._piece_images = dict(
-            zip(
-                product(colors, names), pieces_ss.load_grid_images(2, 6, 64, 72, 68, 48)
-            )
-        )
@@ -0,0 +1,201 @@
+"""Streaming training batches from memory-mapped record shards.
+
+Shards written by ``selfplay`` are never loaded whole: only their headers
+are read up front, ``.bin`` shards are memory-mapped and ``.npz`` shards
+are decompressed one block at a time. The records are split into
+fixed-size blocks; worker ``worker_id`` of ``num_workers`` reads every
+block whose index is congruent to its id, so workers see disjoint data
+and the split only depends on the shard list.
+
+Within a worker, shard order is shuffled per epoch, then the blocks of
+each shard: randomly for memory-mapped ``.bin`` shards, in file order for
+``.npz`` shards, whose stream would otherwise restart on every backward
+seek. Records pass through a fixed-size shuffle window: each incoming
+block replaces randomly chosen window slots, whose previous records are
+emitted. Memory use is bounded by the window size whatever the dataset
+size.
+"""
+
+from __future__ import annotations
+
+import glob
+import os
+from typing import Iterator, NamedTuple, Sequence
+
+import numpy as np
+
+from encoder import BoardEncoder
+from inference import POLICY_SIZE
+from records import RECORD_DTYPE, SHARD_EXTENSIONS, ShardReader
+
+
+class Batch(NamedTuple):
+    planes: np.ndarray
+    policy: np.ndarray
+    value: np.ndarray
+
+
+def shard_paths(source: str | Sequence[str]) -> list[str]:
+    """Returns the sorted shard files of a directory, glob or path list.
+
+    A directory yields its shards of every format ``selfplay`` writes.
+    """
+    if isinstance(source, str):
+        if os.path.isdir(source):
+            return sorted(
+                path
+                for extension in SHARD_EXTENSIONS
+                for path in glob.glob(os.path.join(source, f"shard-*{extension}"))
+            )
+        return sorted(glob.glob(source))
+    return list(source)
+
+
+def decode_batch(
+    records: np.ndarray, encoder: BoardEncoder, policy: np.ndarray | None = None
+) -> Batch:
+    """Decodes records into planes, dense policy targets and values.
+
+    Planes are unpacked straight from the record fields, so no Position is
+    built. The planes live in the encoder's buffer and are overwritten by
+    its next use.
+    """
+    count = len(records)
+    planes = encoder.encode_arrays(
+        records["bitboards"],
+        records["turn"],
+        records["castling"],
+        records["ep_square"],
+        records["repetitions"],
+    )
+    if policy is None or len(policy) < count:
+        policy = np.zeros((count, POLICY_SIZE), dtype=np.float32)
+    policy = policy[:count]
+    policy[:] = 0
+    moves = records["policy_moves"].astype(np.int64) & 4095
+    probabilities = records["policy_probs"].astype(np.float32)
+    np.add.at(policy, (np.arange(count)[:, None], moves), probabilities)
+    return Batch(planes, policy, records["outcome"].astype(np.float32))
+
+
+class ShardDataset:
+    """Iterates shuffled training batches over record shards."""
+
+    def __init__(
+        self,
+        source: str | Sequence[str],
+        batch_size: int = 256,
+        shuffle_window: int = 1 << 16,
+        block_size: int = 4096,
+        worker_id: int = 0,
+        num_workers: int = 1,
+        seed: int = 0,
+        shuffle: bool = True,
+    ):
+        """Reads the shard headers; records are only read while iterating.
+
+        Args:
+            source: Shard directory, glob pattern or list of paths.
+            batch_size: Records per batch.
+            shuffle_window: Records held in the shuffle window.
+            block_size: Records per contiguous read and per worker split unit.
+            worker_id: Index of this worker among num_workers.
+            num_workers: Number of workers splitting the data.
+            seed: Base seed; the shuffle also depends on the epoch and worker.
+            shuffle: Whether to shuffle at all.
+        """
+        if not 0 <= worker_id < num_workers:
+            raise ValueError(f"Invalid worker {worker_id} of {num_workers}")
+        self.paths = shard_paths(source)
+        if not self.paths:
+            raise ValueError(f"No shards found in {source}")
+        self.batch_size = batch_size
+        self.shuffle_window = shuffle_window
+        self.block_size = block_size
+        self.worker_id = worker_id
+        self.num_workers = num_workers
+        self.seed = seed
+        self.shuffle = shuffle
+        self.epoch = 0
+        self.shards = [ShardReader(path) for path in self.paths]
+        self.blocks = [
+            (shard_index, start)
+            for shard_index, shard in enumerate(self.shards)
+            for start in range(0, len(shard), block_size)
+        ][worker_id::num_workers]
+        self.encoder = BoardEncoder(batch_size)
+        self._policy = np.zeros((batch_size, POLICY_SIZE), dtype=np.float32)
+
+    def __len__(self) -> int:
+        """Returns the number of records this worker reads per epoch."""
+        return sum(
+            min(self.block_size, len(self.shards[shard]) - start)
+            for shard, start in self.blocks
+        )
+
+    def set_epoch(self, epoch: int) -> None:
+        """Selects the epoch whose shuffle order the next iteration uses."""
+        self.epoch = epoch
+
+    def records(self) -> Iterator[np.ndarray]:
+        """Yields record arrays in (window-)shuffled order."""
+        rng = np.random.default_rng(
+            (self.seed, self.epoch, self.worker_id, self.num_workers)
+        )
+        if not self.shuffle:
+            for shard, start in self.blocks:
+                yield self.shards[shard].read(start, self.block_size)
+            return
+
+        window = np.zeros(self.shuffle_window, dtype=RECORD_DTYPE)
+        filled = 0
+        for shard, start in self._block_order(rng):
+            block = self.shards[shard].read(start, self.block_size)
+            room = min(len(block), self.shuffle_window - filled)
+            window[filled : filled + room] = block[:room]
+            filled += room
+            incoming = block[room:]
+            while len(incoming):
+                take = incoming[: self.shuffle_window]
+                slots = rng.choice(self.shuffle_window, size=len(take), replace=False)
+                yield window[slots].copy()
+                window[slots] = take
+                incoming = incoming[len(take) :]
+        yield window[rng.permutation(filled)]
+
+    def _block_order(self, rng: np.random.Generator) -> list[tuple[int, int]]:
+        """Returns this epoch's blocks, shard by shard in shuffled order.
+
+        Blocks of compressed shards stay in file order, so their
+        decompression stream only ever moves forward.
+        """
+        by_shard: dict[int, list[int]] = {}
+        for shard, start in self.blocks:
+            by_shard.setdefault(shard, []).append(start)
+        order = []
+        for shard in rng.permutation(list(by_shard)):
+            starts = by_shard[shard]
+            if not self.shards[shard].compressed:
+                starts = rng.permutation(starts)
+            order.extend((int(shard), int(start)) for start in starts)
+        return order
+
+    def __iter__(self) -> Iterator[Batch]:
+        """Yields batches; the last one may be smaller.
+
+        Planes and policy arrays are reused between batches; copy them to
+        keep a batch beyond the next iteration step.
+        """
+        pending = np.zeros(self.batch_size, dtype=RECORD_DTYPE)
+        count = 0
+        for records in self.records():
+            while len(records):
+                take = min(self.batch_size - count, len(records))
+                pending[count : count + take] = records[:take]
+                count += take
+                records = records[take:]
+                if count == self.batch_size:
+                    yield decode_batch(pending, self.encoder, self._policy)
+                    count = 0
+        if count:
+            yield decode_batch(pending[:count], self.encoder, self._policy)
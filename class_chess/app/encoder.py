@@ -0,0 +1,176 @@
+"""Batched encoding of positions into NumPy board tensors.
+
+A batch is encoded into an ``(N, PLANES, 8, 8)`` array indexed
+``[position, plane, rank, file]`` with rank 0 being the first rank. The
+planes are, in order:
+
+* 0-5: white pawn, knight, bishop, rook, queen, king
+* 6-11: black pawn, knight, bishop, rook, queen, king
+* 12: ones when white is to move
+* 13-16: ones per castling right (white kingside, white queenside,
+  black kingside, black queenside)
+* 17: the en passant square
+* 18-19: ones when the position occurred at least once / twice before
+
+Piece planes are unpacked straight from the 64-bit bitboards, so the only
+per-position Python work is gathering twelve integers.
+"""
+
+from __future__ import annotations
+
+import argparse
+import time
+from typing import Sequence
+
+import numpy as np
+
+from position import BLACK, WHITE, Position
+
+PIECE_PLANES = 12
+TURN_PLANE = 12
+CASTLING_PLANE = 13
+EP_PLANE = 17
+REPETITION_PLANE = 18
+PLANES = 20
+
+
+def encode_arrays(
+    bitboards: np.ndarray,
+    turn: np.ndarray,
+    castling: np.ndarray,
+    ep_square: np.ndarray,
+    repetitions: np.ndarray,
+    out: np.ndarray,
+) -> np.ndarray:
+    """Encodes raw position fields into planes, writing into out.
+
+    Args:
+        bitboards: ``(N, 12)`` uint64 piece bitboards in plane order.
+        turn: ``(N,)`` side to move, 0 for white.
+        castling: ``(N,)`` castling rights masks.
+        ep_square: ``(N,)`` en passant squares, negative for none.
+        repetitions: ``(N,)`` earlier occurrences of each position.
+        out: ``(N, PLANES, 8, 8)`` array the planes are written to.
+    """
+    count = len(bitboards)
+    octets = np.ascontiguousarray(bitboards, dtype="<u8").view(np.uint8)
+    out[:, :PIECE_PLANES] = np.unpackbits(
+        octets.reshape(count, PIECE_PLANES, 8, 1), axis=-1, bitorder="little"
+    )
+    out[:, TURN_PLANE] = (np.asarray(turn) == WHITE)[:, None, None]
+    rights = (np.asarray(castling)[:, None] >> np.arange(4)) & 1
+    out[:, CASTLING_PLANE:EP_PLANE] = rights[:, :, None, None]
+
+    out[:, EP_PLANE] = 0
+    ep_square = np.asarray(ep_square)
+    rows = np.flatnonzero(ep_square >= 0)
+    out[rows, EP_PLANE, ep_square[rows] >> 3, ep_square[rows] & 7] = 1
+
+    repetitions = np.asarray(repetitions)
+    out[:, REPETITION_PLANE] = (repetitions >= 1)[:, None, None]
+    out[:, REPETITION_PLANE + 1] = (repetitions >= 2)[:, None, None]
+    return out
+
+
+class BoardEncoder:
+    """Encodes batches of positions into a reusable preallocated buffer.
+
+    The array returned by ``encode`` is a view of the internal buffer and
+    is overwritten by the next call; copy it to keep it.
+    """
+
+    def __init__(self, capacity: int = 1024, dtype: np.dtype = np.float32):
+        """Initializes buffers for up to capacity positions."""
+        self.dtype = dtype
+        self._allocate(capacity)
+
+    def _allocate(self, capacity: int) -> None:
+        """Allocates the plane buffer and field scratch arrays."""
+        self.capacity = capacity
+        self.buffer = np.zeros((capacity, PLANES, 8, 8), dtype=self.dtype)
+        self.bitboards = np.zeros((capacity, PIECE_PLANES), dtype=np.uint64)
+        self.turn = np.zeros(capacity, dtype=np.uint8)
+        self.castling = np.zeros(capacity, dtype=np.uint8)
+        self.ep_square = np.zeros(capacity, dtype=np.int8)
+        self.repetitions = np.zeros(capacity, dtype=np.uint8)
+
+    def reserve(self, count: int) -> None:
+        """Grows the buffers to hold at least count positions."""
+        if count > self.capacity:
+            self._allocate(max(count, self.capacity * 2))
+
+    def encode(self, positions: Sequence[Position]) -> np.ndarray:
+        """Returns the planes of a batch of positions."""
+        count = len(positions)
+        self.reserve(count)
+        self.bitboards[:count] = [
+            position.pieces[WHITE] + position.pieces[BLACK] for position in positions
+        ]
+        self.turn[:count] = [position.turn for position in positions]
+        self.castling[:count] = [position.castling for position in positions]
+        self.ep_square[:count] = [
+            -1 if position.ep_square is None else position.ep_square
+            for position in positions
+        ]
+        self.repetitions[:count] = [
+            min(position.repetitions(), 2) for position in positions
+        ]
+        return self.encode_arrays(
+            self.bitboards[:count],
+            self.turn[:count],
+            self.castling[:count],
+            self.ep_square[:count],
+            self.repetitions[:count],
+        )
+
+    def encode_arrays(
+        self,
+        bitboards: np.ndarray,
+        turn: np.ndarray,
+        castling: np.ndarray,
+        ep_square: np.ndarray,
+        repetitions: np.ndarray,
+    ) -> np.ndarray:
+        """Returns the planes of raw position fields (see ``encode_arrays``)."""
+        count = len(bitboards)
+        self.reserve(count)
+        return encode_arrays(
+            bitboards, turn, castling, ep_square, repetitions, self.buffer[:count]
+        )
+
+
+def main(argv: list[str] | None = None) -> None:
+    parser = argparse.ArgumentParser(description="Benchmark board encoding.")
+    parser.add_argument("--batch", type=int, default=4096)
+    parser.add_argument("--rounds", type=int, default=50)
+    args = parser.parse_args(argv)
+
+    position = Position.from_fen(
+        "r3k2r/p1ppqpb1/bn2pnp1/3PN3/1p2P3/2N2Q1p/PPPBBPPP/R3K2R w KQkq - 0 1"
+    )
+    positions = [position] * args.batch
+    encoder = BoardEncoder(args.batch)
+    encoder.encode(positions)
+
+    for name, encode in (
+        ("positions", lambda: encoder.encode(positions)),
+        (
+            "arrays",
+            lambda: encoder.encode_arrays(
+                encoder.bitboards,
+                encoder.turn,
+                encoder.castling,
+                encoder.ep_square,
+                encoder.repetitions,
+            ),
+        ),
+    ):
+        start = time.perf_counter()
+        for _ in range(args.rounds):
+            encode()
+        seconds = time.perf_counter() - start
+        print(f"{name}: {args.batch * args.rounds / seconds:.0f} positions/s")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,241 @@
+"""Classical static evaluation.
+
+The score is tapered between a middlegame and an endgame value by the
+material left on the board. Material and piece-square terms are not
+computed here: ``Position`` keeps their packed sum in ``psqt`` as pieces
+are placed and removed (see ``psqt``). Pawn structure depends on the pawns
+only, so it is cached in a ``PawnTable`` keyed by ``Position.pawn_key``
+and recomputed only for pawn formations not seen before. Mobility, the
+bishop pair and king safety are evaluated per call.
+"""
+
+from __future__ import annotations
+
+from movegen import (
+    KING_ATTACKS,
+    KNIGHT_ATTACKS,
+    bishop_attacks,
+    queen_attacks,
+    rook_attacks,
+)
+from position import (
+    BISHOP,
+    BLACK,
+    FULL_BOARD,
+    KNIGHT,
+    PAWN,
+    QUEEN,
+    ROOK,
+    WHITE,
+    Position,
+    iter_bits,
+)
+from psqt import pack, unpack
+
+MAX_PHASE = 24
+PHASE_WEIGHTS = (0, 1, 1, 2, 4, 0)
+TEMPO = 10
+
+DOUBLED = pack(-10, -20)
+ISOLATED = pack(-5, -15)
+# Indexed by the rank of the pawn as seen from its own side.
+PASSED = tuple(
+    pack(mg, eg)
+    for mg, eg in (
+        (0, 0),
+        (5, 10),
+        (10, 20),
+        (15, 35),
+        (25, 60),
+        (40, 100),
+        (60, 150),
+        (0, 0),
+    )
+)
+# Per safe square attacked, indexed by piece type.
+MOBILITY = (0, pack(4, 4), pack(5, 5), pack(2, 4), pack(1, 2), 0)
+BISHOP_PAIR = pack(30, 50)
+PAWN_SHIELD = pack(12, 0)
+# King attack units per attacked square of the king zone, by piece type.
+KING_ATTACK_WEIGHTS = (0, 2, 2, 3, 5, 0)
+MAX_KING_DANGER = 500
+
+PAWN_TABLE_ENTRIES = 1 << 14
+
+FILE_A = 0x0101010101010101
+FILES = tuple(FILE_A << file for file in range(8))
+ADJACENT_FILES = tuple(
+    (FILES[file - 1] if file > 0 else 0) | (FILES[file + 1] if file < 7 else 0)
+    for file in range(8)
+)
+
+
+def _forward_ranks(color: int, sq: int) -> int:
+    """Returns the ranks strictly in front of a square for a side."""
+    rank = sq >> 3
+    if color == WHITE:
+        return FULL_BOARD << 8 * (rank + 1) & FULL_BOARD
+    return (1 << 8 * rank) - 1
+
+
+# Squares that must be free of enemy pawns for a pawn to be passed, and
+# the squares in front of a pawn on its own file.
+PASSED_SPANS = tuple(
+    tuple(
+        _forward_ranks(color, sq) & (FILES[sq & 7] | ADJACENT_FILES[sq & 7])
+        for sq in range(64)
+    )
+    for color in (WHITE, BLACK)
+)
+FRONT_SPANS = tuple(
+    tuple(_forward_ranks(color, sq) & FILES[sq & 7] for sq in range(64))
+    for color in (WHITE, BLACK)
+)
+
+
+def _shield(color: int, sq: int) -> int:
+    """Returns the two ranks in front of a king on its own and adjacent
+    files.
+    """
+    ranks = 0
+    for step in (1, 2):
+        rank = (sq >> 3) + (step if color == WHITE else -step)
+        if 0 <= rank < 8:
+            ranks |= 0xFF << 8 * rank
+    return ranks & (FILES[sq & 7] | ADJACENT_FILES[sq & 7])
+
+
+SHIELDS = tuple(
+    tuple(_shield(color, sq) for sq in range(64)) for color in (WHITE, BLACK)
+)
+
+
+def pawn_attacks(color: int, pawns: int) -> int:
+    """Returns the squares attacked by a side's pawns."""
+    west, east = pawns & ~FILES[0], pawns & ~FILES[7]
+    if color == WHITE:
+        return (west << 7 | east << 9) & FULL_BOARD
+    return west >> 9 | east >> 7
+
+
+def pawn_structure(position: Position) -> int:
+    """Returns the packed white-relative score of the pawn formation."""
+    score = 0
+    for color, sign in ((WHITE, 1), (BLACK, -1)):
+        ours = position.pieces[color][PAWN]
+        theirs = position.pieces[color ^ 1][PAWN]
+        for sq in iter_bits(ours):
+            file = sq & 7
+            if FRONT_SPANS[color][sq] & ours:
+                score += sign * DOUBLED
+            if not ADJACENT_FILES[file] & ours:
+                score += sign * ISOLATED
+            if not PASSED_SPANS[color][sq] & theirs:
+                rank = sq >> 3 if color == WHITE else 7 - (sq >> 3)
+                score += sign * PASSED[rank]
+    return score
+
+
+class PawnTable:
+    """Fixed-size cache of pawn structure scores keyed by pawn key."""
+
+    def __init__(self, entries: int = PAWN_TABLE_ENTRIES):
+        """Initializes a table holding a power of two number of entries."""
+        self.size = 1 << (max(1, entries).bit_length() - 1)
+        self.mask = self.size - 1
+        self.keys: list[int] = [-1] * self.size
+        self.scores: list[int] = [0] * self.size
+        self.hits = 0
+        self.probes = 0
+
+    def score(self, position: Position) -> int:
+        """Returns the pawn structure score, computing it on a miss."""
+        key = position.pawn_key
+        index = key & self.mask
+        self.probes += 1
+        if self.keys[index] == key:
+            self.hits += 1
+            return self.scores[index]
+        score = pawn_structure(position)
+        self.keys[index] = key
+        self.scores[index] = score
+        return score
+
+    def clear(self) -> None:
+        """Removes all entries."""
+        self.keys = [-1] * self.size
+        self.hits = self.probes = 0
+
+
+def phase(position: Position) -> int:
+    """Returns the game phase, MAX_PHASE with all pieces, 0 with none."""
+    total = 0
+    for pieces in position.pieces:
+        for piece_type in (KNIGHT, BISHOP, ROOK, QUEEN):
+            total += PHASE_WEIGHTS[piece_type] * pieces[piece_type].bit_count()
+    return min(total, MAX_PHASE)
+
+
+def pieces_and_king(position: Position, color: int) -> int:
+    """Returns the packed score of a side's mobility, bishop pair and king
+    safety.
+    """
+    pieces = position.pieces[color]
+    them = color ^ 1
+    occupancy = position.occupancy
+    safe = ~position.occupied[color] & ~pawn_attacks(them, position.pieces[them][PAWN])
+    king_sq = position.king_square(them)
+    zone = KING_ATTACKS[king_sq] | 1 << king_sq
+
+    score = 0
+    units = attackers = 0
+    for piece_type in (KNIGHT, BISHOP, ROOK, QUEEN):
+        for sq in iter_bits(pieces[piece_type]):
+            if piece_type == KNIGHT:
+                attacks = KNIGHT_ATTACKS[sq]
+            elif piece_type == BISHOP:
+                attacks = bishop_attacks(sq, occupancy)
+            elif piece_type == ROOK:
+                attacks = rook_attacks(sq, occupancy)
+            else:
+                attacks = queen_attacks(sq, occupancy)
+            score += MOBILITY[piece_type] * (attacks & safe).bit_count()
+            if attacks & zone:
+                attackers += 1
+                units += KING_ATTACK_WEIGHTS[piece_type] * (attacks & zone).bit_count()
+    if pieces[BISHOP].bit_count() >= 2:
+        score += BISHOP_PAIR
+    # Pressure on the enemy king, then the pawns sheltering our own.
+    if attackers >= 2:
+        score += pack(min(units * units // 4, MAX_KING_DANGER), 0)
+    score += (
+        PAWN_SHIELD
+        * (SHIELDS[color][position.king_square(color)] & pieces[PAWN]).bit_count()
+    )
+    return score
+
+
+class Evaluator:
+    """Classical evaluation for the side to move, with a pawn cache.
+
+    Instances are callables suitable as ``Searcher(evaluator=...)``.
+    """
+
+    def __init__(self, pawn_entries: int = PAWN_TABLE_ENTRIES):
+        self.pawns = PawnTable(pawn_entries)
+
+    def __call__(self, position: Position) -> int:
+        """Returns the tapered score from the side to move's point of view."""
+        score = (
+            position.psqt
+            + self.pawns.score(position)
+            + pieces_and_king(position, WHITE)
+            - pieces_and_king(position, BLACK)
+        )
+        mg, eg = unpack(score)
+        game_phase = phase(position)
+        value = mg * game_phase + eg * (MAX_PHASE - game_phase)
+        # Rounded from the side to move's view so mirrored positions agree.
+        if position.turn != WHITE:
+            value = -value
+        return value // MAX_PHASE + TEMPO
@@ -0,0 +1,260 @@
+"""On-disk index of the positions reached in a game collection.
+
+The index is a directory of immutable segment files. Each ``add`` call
+replays a batch of games and writes one segment holding, sorted by
+Zobrist key:
+
+* per (key, move) aggregates: how often the move was played and with
+  which results, for the opening explorer;
+* per (key, game id) postings: which games reached the position.
+
+A segment is a ``HEADER`` (``MAGIC``, aggregate count, posting count)
+followed by four arrays: aggregate keys (uint64), ``STATS_DTYPE``
+aggregates, posting keys (uint64) and game ids (uint32). Queries
+memory-map every segment and binary search the contiguous key arrays with
+``np.searchsorted``, touching a few pages per segment whatever the index
+size. ``compact`` merges the segments into one when their number grows.
+
+Compaction first writes the merged segment as ``compact-<n>.pending``,
+covering every segment numbered up to n, then removes those segments and
+renames it to ``segment-<n>.idx``. Opening an index finishes a compaction
+a crash interrupted, so no segment is ever counted twice.
+"""
+
+from __future__ import annotations
+
+import glob
+import os
+import struct
+from typing import Iterable, NamedTuple
+
+import numpy as np
+
+from pgn import Game
+from position import Position
+
+MAGIC = b"TCINDEX1"
+HEADER = struct.Struct("<8sQQ")
+STATS_DTYPE = np.dtype(
+    [
+        ("move", "<u2"),
+        ("games", "<u4"),
+        ("white_wins", "<u4"),
+        ("draws", "<u4"),
+        ("black_wins", "<u4"),
+    ]
+)
+STATS_FIELDS = ("games", "white_wins", "draws", "black_wins")
+RESULT_INDEX = {"1-0": 0, "1/2-1/2": 1, "0-1": 2}
+
+
+class MoveStats(NamedTuple):
+    move: int
+    games: int
+    white_wins: int
+    draws: int
+    black_wins: int
+
+
+class Segment(NamedTuple):
+    move_keys: np.ndarray
+    stats: np.ndarray
+    game_keys: np.ndarray
+    games: np.ndarray
+
+
+def write_segment(path: str, segment: Segment) -> None:
+    """Writes a segment atomically."""
+    temporary = f"{path}.tmp"
+    with open(temporary, "wb") as output:
+        output.write(HEADER.pack(MAGIC, len(segment.stats), len(segment.games)))
+        output.write(np.ascontiguousarray(segment.move_keys, dtype="<u8").tobytes())
+        output.write(np.ascontiguousarray(segment.stats, dtype=STATS_DTYPE).tobytes())
+        output.write(np.ascontiguousarray(segment.game_keys, dtype="<u8").tobytes())
+        output.write(np.ascontiguousarray(segment.games, dtype="<u4").tobytes())
+        output.flush()
+        os.fsync(output.fileno())
+    os.replace(temporary, path)
+
+
+def read_segment(path: str) -> Segment:
+    """Returns the memory-mapped arrays of a segment."""
+    with open(path, "rb") as segment:
+        magic, moves, games = HEADER.unpack(segment.read(HEADER.size))
+    if magic != MAGIC:
+        raise ValueError(f"Not an index segment: {path}")
+    arrays = []
+    offset = HEADER.size
+    for dtype, count in (
+        (np.dtype("<u8"), moves),
+        (STATS_DTYPE, moves),
+        (np.dtype("<u8"), games),
+        (np.dtype("<u4"), games),
+    ):
+        arrays.append(
+            np.memmap(path, dtype=dtype, mode="r", offset=offset, shape=(count,))
+            if count
+            else np.zeros(0, dtype=dtype)
+        )
+        offset += dtype.itemsize * count
+    return Segment(*arrays)
+
+
+def aggregate(keys: np.ndarray, stats: np.ndarray) -> tuple[np.ndarray, np.ndarray]:
+    """Returns keys and stats summed per (key, move), sorted."""
+    if not keys.size:
+        return np.zeros(0, dtype=np.uint64), np.zeros(0, dtype=STATS_DTYPE)
+    order = np.lexsort((stats["move"], keys))
+    keys, stats = keys[order], stats[order]
+    moves = stats["move"]
+    starts = np.flatnonzero(
+        np.concatenate(([True], (keys[1:] != keys[:-1]) | (moves[1:] != moves[:-1])))
+    )
+    summed = np.zeros(len(starts), dtype=STATS_DTYPE)
+    summed["move"] = moves[starts]
+    for field in STATS_FIELDS:
+        summed[field] = np.add.reduceat(stats[field], starts)
+    return keys[starts], summed
+
+
+def _sorted_postings(keys: np.ndarray, games: np.ndarray) -> tuple[np.ndarray, ...]:
+    """Returns postings sorted by key, then game id."""
+    order = np.lexsort((games, keys))
+    return keys[order], games[order]
+
+
+class PositionIndex:
+    """Answers which games reached a position and what was played there."""
+
+    def __init__(self, directory: str):
+        """Opens, or creates, the index stored in a directory."""
+        self.directory = directory
+        os.makedirs(directory, exist_ok=True)
+        self.segments: list[Segment] = []
+        self.reload()
+
+    def _segment_paths(self) -> list[str]:
+        """Returns the segment files in creation order."""
+        return sorted(glob.glob(os.path.join(self.directory, "segment-*.idx")))
+
+    def _segment_path(self, number: int) -> str:
+        """Returns the path of a segment number."""
+        return os.path.join(self.directory, f"segment-{number:06d}.idx")
+
+    @staticmethod
+    def _number(path: str) -> int:
+        """Returns the number of a segment or pending compaction file."""
+        return int(os.path.basename(path).split("-")[1][:6])
+
+    def reload(self) -> None:
+        """Memory-maps the segments currently on disk."""
+        pending = glob.glob(os.path.join(self.directory, "compact-*.pending"))
+        for path in sorted(pending):
+            self._publish(path)
+        self.segments = [read_segment(path) for path in self._segment_paths()]
+
+    def _publish(self, pending: str) -> None:
+        """Replaces the segments a merged segment covers by it."""
+        number = self._number(pending)
+        for path in self._segment_paths():
+            if self._number(path) < number:
+                os.remove(path)
+        os.replace(pending, self._segment_path(number))
+
+    def _write(self, segment: Segment) -> None:
+        """Writes a new segment after the existing ones."""
+        paths = self._segment_paths()
+        number = self._number(paths[-1]) + 1 if paths else 0
+        write_segment(self._segment_path(number), segment)
+
+    def add(
+        self, games: Iterable[tuple[int, Game]], max_plies: int | None = None
+    ) -> None:
+        """Indexes (game id, game) pairs as one new segment.
+
+        Args:
+            games: Game ids and games, e.g. archive indices and games.
+            max_plies: Index only this many moves and the positions they reach.
+        """
+        keys, moves, results, game_keys, game_ids = [], [], [], [], []
+        for game_id, game in games:
+            result = RESULT_INDEX.get(game.headers.get("Result"), 3)
+            position = game.starting_position()
+            seen = set()
+            plies = game.moves[:max_plies]
+            for move in plies:
+                keys.append(position.key)
+                moves.append(move)
+                results.append(result)
+                if position.key not in seen:
+                    seen.add(position.key)
+                    game_keys.append(position.key)
+                    game_ids.append(game_id)
+                position.make_move(move)
+            # The position after the last indexed move was reached too.
+            if position.key not in seen:
+                game_keys.append(position.key)
+                game_ids.append(game_id)
+        if not game_keys:
+            return
+
+        results = np.array(results, dtype=np.int8)
+        stats = np.zeros(len(keys), dtype=STATS_DTYPE)
+        stats["move"] = moves
+        stats["games"] = 1
+        for index, field in enumerate(STATS_FIELDS[1:]):
+            stats[field] = results == index
+        move_keys, stats = aggregate(np.array(keys, dtype=np.uint64), stats)
+        game_keys, game_ids = _sorted_postings(
+            np.array(game_keys, dtype=np.uint64), np.array(game_ids, dtype=np.uint32)
+        )
+        self._write(Segment(move_keys, stats, game_keys, game_ids))
+        self.reload()
+
+    def compact(self) -> None:
+        """Merges every segment into a single one."""
+        if len(self.segments) < 2:
+            return
+        old = self._segment_paths()
+        move_keys, stats = aggregate(
+            np.concatenate([segment.move_keys for segment in self.segments]),
+            np.concatenate([segment.stats for segment in self.segments]),
+        )
+        game_keys, game_ids = _sorted_postings(
+            np.concatenate([segment.game_keys for segment in self.segments]),
+            np.concatenate([segment.games for segment in self.segments]),
+        )
+        self.segments = []
+        pending = os.path.join(
+            self.directory, f"compact-{self._number(old[-1]):06d}.pending"
+        )
+        write_segment(pending, Segment(move_keys, stats, game_keys, game_ids))
+        self._publish(pending)
+        self.reload()
+
+    def moves(self, position: Position | int) -> list[MoveStats]:
+        """Returns the moves played from a position, most played first."""
+        key = np.uint64(position if isinstance(position, int) else position.key)
+        keys, stats = [], []
+        for segment in self.segments:
+            start = np.searchsorted(segment.move_keys, key, "left")
+            end = np.searchsorted(segment.move_keys, key, "right")
+            keys.append(segment.move_keys[start:end])
+            stats.append(segment.stats[start:end])
+        if not keys:
+            return []
+        _, summed = aggregate(np.concatenate(keys), np.concatenate(stats))
+        return sorted(
+            (MoveStats(*map(int, entry.tolist())) for entry in summed),
+            key=lambda entry: -entry.games,
+        )
+
+    def games(self, position: Position | int, limit: int | None = None) -> list[int]:
+        """Returns the ids of games that reached a position, in id order."""
+        key = np.uint64(position if isinstance(position, int) else position.key)
+        found = [np.zeros(0, dtype=np.uint32)]
+        for segment in self.segments:
+            start = np.searchsorted(segment.game_keys, key, "left")
+            end = np.searchsorted(segment.game_keys, key, "right")
+            found.append(segment.games[start:end])
+        return np.unique(np.concatenate(found))[:limit].tolist()
@@ -0,0 +1,267 @@
+"""Batched neural network evaluation shared by concurrent searches.
+
+Searches running in many threads (or asyncio tasks) submit leaf positions
+to a ``BatchEvaluator``. A dispatcher thread collects submissions until the
+batch is full or the oldest request has waited ``max_wait`` seconds, runs
+one forward pass for the whole batch and resolves each request's future.
+
+The policy head scores every (from, to) square pair, so a move's policy
+index is ``move & 4095``; under-promotions share the index of the queen
+promotion.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import math
+import queue
+import threading
+import time
+from abc import ABC, abstractmethod
+from concurrent.futures import Future
+from typing import NamedTuple
+
+import numpy as np
+
+from encoder import PLANES, BoardEncoder
+from position import BLACK, WHITE, Position
+
+POLICY_SIZE = 64 * 64
+
+
+def policy_index(move: int) -> int:
+    """Returns the policy head index of a move."""
+    return move & 4095
+
+
+def move_priors(logits: np.ndarray, moves: list[int]) -> np.ndarray:
+    """Returns the softmax of the policy logits over the given moves."""
+    if not moves:
+        return np.zeros(0, dtype=np.float32)
+    scores = logits[[move & 4095 for move in moves]].astype(np.float64)
+    scores = np.exp(scores - scores.max())
+    return (scores / scores.sum()).astype(np.float32)
+
+
+class Model(ABC):
+    """Represents a network mapping board planes to policy and value."""
+
+    @abstractmethod
+    def predict(self, planes: np.ndarray) -> tuple[np.ndarray, np.ndarray]:
+        """Returns (N, POLICY_SIZE) policy logits and (N,) values in [-1, 1].
+
+        Values are from the point of view of the side to move.
+        """
+
+
+class MLPModel(Model):
+    """A small multilayer perceptron written with NumPy.
+
+    It stands in for a real network on CPU-only machines and in tests; the
+    weights are random unless loaded from a ``.npz`` file.
+    """
+
+    def __init__(self, hidden: int = 128, seed: int = 0):
+        """Initializes random weights."""
+        rng = np.random.default_rng(seed)
+        inputs = PLANES * 64
+        self.w1 = (rng.standard_normal((inputs, hidden)) / math.sqrt(inputs)).astype(
+            np.float32
+        )
+        self.b1 = np.zeros(hidden, dtype=np.float32)
+        self.w_policy = (
+            rng.standard_normal((hidden, POLICY_SIZE)) / math.sqrt(hidden)
+        ).astype(np.float32)
+        self.b_policy = np.zeros(POLICY_SIZE, dtype=np.float32)
+        self.w_value = (rng.standard_normal(hidden) / math.sqrt(hidden)).astype(
+            np.float32
+        )
+        self.b_value = np.float32(0)
+
+    @classmethod
+    def load(cls, filename: str) -> MLPModel:
+        """Loads weights saved by ``save``."""
+        model = cls.__new__(cls)
+        with np.load(filename) as weights:
+            for name in ("w1", "b1", "w_policy", "b_policy", "w_value", "b_value"):
+                setattr(model, name, weights[name])
+        return model
+
+    def save(self, filename: str) -> None:
+        """Saves the weights to a ``.npz`` file."""
+        np.savez(
+            filename,
+            w1=self.w1,
+            b1=self.b1,
+            w_policy=self.w_policy,
+            b_policy=self.b_policy,
+            w_value=self.w_value,
+            b_value=self.b_value,
+        )
+
+    def predict(self, planes: np.ndarray) -> tuple[np.ndarray, np.ndarray]:
+        inputs = planes.reshape(len(planes), -1)
+        hidden = np.maximum(inputs @ self.w1 + self.b1, 0)
+        return hidden @ self.w_policy + self.b_policy, np.tanh(
+            hidden @ self.w_value + self.b_value
+        )
+
+
+class Evaluation(NamedTuple):
+    logits: np.ndarray
+    value: float
+
+
+class _Request(NamedTuple):
+    bitboards: list[int]
+    turn: int
+    castling: int
+    ep_square: int
+    repetitions: int
+    future: Future
+
+
+class BatchEvaluator:
+    """Coalesces evaluation requests from concurrent searches into batches."""
+
+    def __init__(self, model: Model, batch_size: int = 64, max_wait: float = 0.002):
+        """Starts the dispatcher thread.
+
+        Args:
+            model (Model): Network evaluated on each batch.
+            batch_size (int): Largest number of positions per forward pass.
+            max_wait (float): Seconds a request may wait for the batch to fill.
+        """
+        self.model = model
+        self.batch_size = batch_size
+        self.max_wait = max_wait
+        self.encoder = BoardEncoder(batch_size)
+        self.batches = 0
+        self.positions = 0
+        self._requests: queue.Queue[_Request | None] = queue.Queue()
+        # Held while queueing so no request lands behind the stop sentinel.
+        self._lock = threading.Lock()
+        self._closed = False
+        self._thread = threading.Thread(
+            target=self._dispatch, name="batch-evaluator", daemon=True
+        )
+        self._thread.start()
+
+    def submit(self, position: Position) -> Future:
+        """Queues a position and returns a future of its ``Evaluation``.
+
+        The position is captured at submission, so the caller may keep
+        changing it while waiting.
+
+        Raises:
+            RuntimeError: If the evaluator is closed.
+        """
+        future: Future = Future()
+        request = _Request(
+            position.pieces[WHITE] + position.pieces[BLACK],
+            position.turn,
+            position.castling,
+            -1 if position.ep_square is None else position.ep_square,
+            min(position.repetitions(), 2),
+            future,
+        )
+        with self._lock:
+            if self._closed:
+                raise RuntimeError("BatchEvaluator is closed")
+            self._requests.put(request)
+        return future
+
+    def evaluate(self, position: Position) -> Evaluation:
+        """Returns the evaluation of a position, blocking until it is ready."""
+        return self.submit(position).result()
+
+    async def evaluate_async(self, position: Position) -> Evaluation:
+        """Returns the evaluation of a position without blocking the loop."""
+        return await asyncio.wrap_future(self.submit(position))
+
+    @property
+    def average_batch_size(self) -> float:
+        """Returns the mean number of positions per forward pass."""
+        return self.positions / self.batches if self.batches else 0.0
+
+    def close(self) -> None:
+        """Stops the dispatcher once queued requests are served.
+
+        Requests found behind the stop sentinel fail with ``RuntimeError``.
+        """
+        with self._lock:
+            if self._closed:
+                return
+            self._closed = True
+            self._requests.put(None)
+        self._thread.join()
+        while True:
+            try:
+                request = self._requests.get_nowait()
+            except queue.Empty:
+                break
+            if request is not None:
+                request.future.set_exception(RuntimeError("BatchEvaluator is closed"))
+
+    def __enter__(self) -> BatchEvaluator:
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        self.close()
+
+    def _collect(self) -> tuple[list[_Request], bool]:
+        """Waits for a batch; returns it and whether the evaluator closed."""
+        first = self._requests.get()
+        if first is None:
+            return [], True
+        batch = [first]
+        deadline = time.perf_counter() + self.max_wait
+        while len(batch) < self.batch_size:
+            remaining = deadline - time.perf_counter()
+            try:
+                request = (
+                    self._requests.get(timeout=remaining)
+                    if remaining > 0
+                    else self._requests.get_nowait()
+                )
+            except queue.Empty:
+                break
+            if request is None:
+                return batch, True
+            batch.append(request)
+        return batch, False
+
+    def _dispatch(self) -> None:
+        """Serves batches until closed."""
+        closed = False
+        while not closed:
+            batch, closed = self._collect()
+            if batch:
+                self._run_batch(batch)
+
+    def _run_batch(self, batch: list[_Request]) -> None:
+        """Evaluates a batch and resolves its futures."""
+        count = len(batch)
+        encoder = self.encoder
+        encoder.bitboards[:count] = [request.bitboards for request in batch]
+        encoder.turn[:count] = [request.turn for request in batch]
+        encoder.castling[:count] = [request.castling for request in batch]
+        encoder.ep_square[:count] = [request.ep_square for request in batch]
+        encoder.repetitions[:count] = [request.repetitions for request in batch]
+        try:
+            planes = encoder.encode_arrays(
+                encoder.bitboards[:count],
+                encoder.turn[:count],
+                encoder.castling[:count],
+                encoder.ep_square[:count],
+                encoder.repetitions[:count],
+            )
+            logits, values = self.model.predict(planes)
+        except Exception as error:  # pylint: disable=broad-except
+            for request in batch:
+                request.future.set_exception(error)
+            return
+        self.batches += 1
+        self.positions += count
+        for index, request in enumerate(batch):
+            request.future.set_result(Evaluation(logits[index], float(values[index])))
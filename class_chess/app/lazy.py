@@ -0,0 +1,28 @@
+"""Modules imported on first attribute access.
+
+``pygame = lazy_import("pygame")`` at the top of a module binds a module
+object whose code only runs when one of its attributes is first used, so
+importing the UI modules for their rules or data does not pay for loading
+pygame and SDL.
+"""
+
+from __future__ import annotations
+
+import importlib.util
+import sys
+from types import ModuleType
+
+
+def lazy_import(name: str) -> ModuleType:
+    """Returns a module that is loaded when an attribute is first read."""
+    if name in sys.modules:
+        return sys.modules[name]
+    spec = importlib.util.find_spec(name)
+    if spec is None:
+        raise ModuleNotFoundError(f"No module named {name!r}", name=name)
+    loader = importlib.util.LazyLoader(spec.loader)
+    spec.loader = loader
+    module = importlib.util.module_from_spec(spec)
+    sys.modules[name] = module
+    loader.exec_module(module)
+    return module
@@ -0,0 +1,530 @@
+"""Engine-vs-engine matches with adjudication and SPRT early stopping.
+
+Usage::
+
+    python app/match.py --engine name=base,eval=material,nodes=2000 \\
+        --engine name=dev,nodes=2000 --games 2000 --openings book.epd \\
+        --pgn match.pgn --tablebase syzygy/ --sprt 0 5
+
+An engine is either this package's searcher, configured with ``depth``,
+``nodes``, ``movetime`` (seconds), ``hash`` (MB) and ``eval``
+(``classical``, ``material`` or the path of an NNUE weight file), or an
+external UCI program given as ``cmd``. Engines given none of ``depth``,
+``nodes`` and ``movetime`` move after ``DEFAULT_MOVETIME`` seconds.
+Openings are FENs, EPD lines (whose operations are ignored) or UCI move
+lists. Each opening is played twice with colours reversed, one pair per
+job of a process pool whose workers keep their engines between games, so
+the number of games must be even. Games end by the rules or are
+adjudicated by Syzygy endgame tables, when both sides agree one of them is
+lost (resign) or when both have scored the game level for long enough
+(draw).
+
+After every pair the results update a sequential probability ratio test
+of Elo ``elo0`` against ``elo1``; the match stops as soon as either
+hypothesis is accepted.
+"""
+
+from __future__ import annotations
+
+import argparse
+import logging
+import math
+import os
+import shlex
+import subprocess
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from contextlib import ExitStack
+from dataclasses import dataclass, field, fields
+from multiprocessing.util import Finalize
+from types import SimpleNamespace
+
+from evaluation import Evaluator
+from movegen import game_result, move_uci, parse_uci
+from pgn import Game
+from position import STARTING_FEN, WHITE, Position
+from search import MATE_SCORE, Searcher, SearchLimits, TranspositionTable, evaluate
+from selfplay import load_openings, opening_position
+
+logger = logging.getLogger(__name__)
+
+RESULT_SCORES = {"1-0": 1.0, "1/2-1/2": 0.5, "0-1": 0.0}
+# Seconds per move of engines configured without any limit.
+DEFAULT_MOVETIME = 0.1
+
+
+@dataclass
+class EngineConfig:
+    name: str
+    cmd: str | None = None
+    depth: int | None = None
+    nodes: int | None = None
+    movetime: float | None = None
+    hash: int = 16
+    eval: str = "classical"
+
+    @classmethod
+    def parse(cls, spec: str) -> EngineConfig:
+        """Returns the engine described by ``key=value,...``."""
+        values = dict(item.split("=", 1) for item in spec.split(",") if item)
+        config = cls(values.pop("name", values.get("cmd", "engine")))
+        names = {option.name for option in fields(cls)}
+        for key, value in values.items():
+            if key not in names:
+                raise ValueError(f"Unknown engine option: {key}")
+            if key in ("depth", "nodes", "hash"):
+                value = int(value)
+            elif key == "movetime":
+                value = float(value)
+            setattr(config, key, value)
+        return config
+
+    @property
+    def limits(self) -> SearchLimits:
+        """Returns the search limits of every move.
+
+        An engine without any limit would search forever, so it gets
+        ``DEFAULT_MOVETIME`` seconds.
+        """
+        if not (self.depth or self.nodes or self.movetime):
+            return SearchLimits(movetime=DEFAULT_MOVETIME)
+        return SearchLimits(self.depth, self.nodes, self.movetime)
+
+
+@dataclass
+class Adjudication:
+    tablebase: str | None = None
+    # Both sides' scores beyond resign_score for resign_moves moves each.
+    resign_score: int = 600
+    resign_moves: int = 4
+    # Both sides' scores within draw_score for draw_moves moves each,
+    # from move draw_move_number on.
+    draw_score: int = 10
+    draw_moves: int = 8
+    draw_move_number: int = 40
+    max_plies: int = 400
+
+
+@dataclass
+class MatchConfig:
+    engines: tuple[EngineConfig, EngineConfig]
+    games: int
+    openings: list[str] = field(default_factory=lambda: [STARTING_FEN])
+    adjudication: Adjudication = field(default_factory=Adjudication)
+    workers: int = os.cpu_count() or 1
+    pgn_path: str | None = None
+    elo0: float = 0.0
+    elo1: float = 5.0
+    alpha: float = 0.05
+    beta: float = 0.05
+
+
+class SearchPlayer:
+    """Plays with this package's searcher."""
+
+    def __init__(self, config: EngineConfig):
+        if config.eval == "material":
+            evaluator = evaluate
+        elif config.eval == "classical":
+            evaluator = Evaluator()
+        else:
+            # pylint: disable-next=import-outside-toplevel
+            from nnue import NNUEEvaluator
+
+            evaluator = NNUEEvaluator(config.eval)
+        self.searcher = Searcher(TranspositionTable(config.hash), evaluator)
+        self.limits = config.limits
+
+    def new_game(self) -> None:
+        """Forgets what was learnt in the previous game."""
+        self.searcher.tt.clear()
+
+    def choose(self, position: Position) -> tuple[int, int]:
+        """Returns the move to play and its score for the side to move."""
+        result = self.searcher.search(position, self.limits)
+        return result.move, result.score
+
+    def close(self) -> None:
+        """Releases the engine."""
+
+
+class UCIPlayer:
+    """Plays with an external UCI engine process."""
+
+    def __init__(self, config: EngineConfig):
+        self.config = config
+        self.process = subprocess.Popen(  # pylint: disable=consider-using-with
+            shlex.split(config.cmd),
+            stdin=subprocess.PIPE,
+            stdout=subprocess.PIPE,
+            text=True,
+            bufsize=1,
+        )
+        self.send("uci")
+        self.read_until("uciok")
+        self.send(f"setoption name Hash value {config.hash}")
+        self.new_game()
+
+    def send(self, line: str) -> None:
+        """Writes one command to the engine."""
+        self.process.stdin.write(line + "\n")
+
+    def read_until(self, prefix: str) -> list[str]:
+        """Returns the engine's non-blank lines up to the one starting with
+        prefix.
+        """
+        lines = []
+        for line in self.process.stdout:
+            line = line.strip()
+            if not line:
+                continue
+            lines.append(line)
+            if line.startswith(prefix):
+                return lines
+        raise RuntimeError(f"{self.config.name} exited")
+
+    def new_game(self) -> None:
+        """Tells the engine a new game starts."""
+        self.send("ucinewgame")
+        self.send("isready")
+        self.read_until("readyok")
+
+    def choose(self, position: Position) -> tuple[int, int]:
+        """Returns the move to play and its score for the side to move."""
+        start = position.copy()
+        while start.history:
+            start.unmake_move()
+        moves = " ".join(move_uci(undo.move) for undo in position.history)
+        self.send(f"position fen {start.fen()}" + (f" moves {moves}" if moves else ""))
+        limits = self.config.limits
+        go = ["go"]
+        if limits.depth:
+            go += ["depth", str(limits.depth)]
+        if limits.nodes:
+            go += ["nodes", str(limits.nodes)]
+        if limits.movetime:
+            go += ["movetime", str(int(limits.movetime * 1000))]
+        self.send(" ".join(go))
+
+        score = 0
+        lines = self.read_until("bestmove")
+        for line in lines:
+            tokens = line.split()
+            if tokens and tokens[0] == "info" and "score" in tokens:
+                kind, value = tokens[
+                    tokens.index("score") + 1 : tokens.index("score") + 3
+                ]
+                value = int(value)
+                # Mate in n moves is 2n - 1 plies away, mated in n is 2n.
+                if kind == "mate":
+                    value = (
+                        MATE_SCORE - 2 * value + 1
+                        if value > 0
+                        else -MATE_SCORE - 2 * value
+                    )
+                score = value
+        return parse_uci(lines[-1].split()[1]), score
+
+    def close(self) -> None:
+        """Quits the engine process, killing it if it does not exit."""
+        try:
+            self.send("quit")
+            self.process.stdin.close()
+            self.process.wait(timeout=5)
+        except (OSError, subprocess.TimeoutExpired):
+            self.process.kill()
+            self.process.wait()
+
+
+def make_player(config: EngineConfig):
+    """Returns the player of an engine configuration."""
+    return UCIPlayer(config) if config.cmd else SearchPlayer(config)
+
+
+def adjudicate(
+    position: Position, scores: list[int], rules: Adjudication, tablebase
+) -> tuple[str, str] | None:
+    """Returns the (result, reason) of a game that can be called early.
+
+    Args:
+        position: The position after the last move.
+        scores: The score of every move so far, from white's point of view.
+        rules: Adjudication thresholds.
+        tablebase: Endgame tables, or None.
+    """
+    if tablebase is not None:
+        wdl = tablebase.probe(position)
+        if wdl is not None:
+            if position.turn != WHITE:
+                wdl = -wdl
+            return {2: "1-0", 0: "1/2-1/2", -2: "0-1"}[wdl], "tablebase"
+
+    window = scores[-2 * rules.resign_moves :]
+    if len(window) == 2 * rules.resign_moves:
+        if all(score >= rules.resign_score for score in window):
+            return "1-0", "resign"
+        if all(score <= -rules.resign_score for score in window):
+            return "0-1", "resign"
+
+    window = scores[-2 * rules.draw_moves :]
+    if (
+        position.fullmove_number >= rules.draw_move_number
+        and len(window) == 2 * rules.draw_moves
+        and all(abs(score) <= rules.draw_score for score in window)
+    ):
+        return "1/2-1/2", "draw"
+    if len(scores) >= rules.max_plies:
+        return "1/2-1/2", "max plies"
+    return None
+
+
+def play_game(white, black, opening: str, rules: Adjudication, tablebase) -> Game:
+    """Plays one game from an opening and returns it with its result."""
+    position = opening_position(opening)
+    start = position.copy()
+    while start.history:
+        start.unmake_move()
+    for player in (white, black):
+        player.new_game()
+
+    scores = []
+    reason = "normal"
+    result = game_result(position)
+    while result is None:
+        player = white if position.turn == WHITE else black
+        move, score = player.choose(position)
+        scores.append(score if position.turn == WHITE else -score)
+        position.make_move(move)
+        result = game_result(position)
+        if result is None:
+            adjudicated = adjudicate(position, scores, rules, tablebase)
+            if adjudicated:
+                result, reason = adjudicated
+
+    headers = {"Result": result, "Termination": reason}
+    return Game.from_moves([undo.move for undo in position.history], headers, start)
+
+
+# State each pool process keeps between jobs.
+_WORKER = SimpleNamespace(players=None, tablebase=None)
+
+
+def _init_worker(config: MatchConfig) -> None:
+    """Starts the engines and opens the tables a pool process reuses."""
+    _WORKER.players = [make_player(engine) for engine in config.engines]
+    # Forked pool workers skip atexit handlers but run multiprocessing
+    # finalizers when the pool shuts them down.
+    Finalize(None, _close_players, exitpriority=10)
+    if config.adjudication.tablebase:
+        # pylint: disable-next=import-outside-toplevel
+        from tablebase import Tablebase
+
+        _WORKER.tablebase = Tablebase(*config.adjudication.tablebase.split(":"))
+
+
+def _close_players() -> None:
+    """Quits the engines of a pool process."""
+    for player in _WORKER.players or ():
+        player.close()
+
+
+def play_pair(config: MatchConfig, index: int) -> list[tuple[str, float]]:
+    """Plays an opening with both colour assignments.
+
+    Returns the PGN of each game and the first engine's score in it.
+    """
+    opening = config.openings[index % len(config.openings)]
+    games = []
+    for first_is_white in (True, False):
+        players = _WORKER.players
+        white, black = players if first_is_white else players[::-1]
+        game = play_game(white, black, opening, config.adjudication, _WORKER.tablebase)
+        names = [engine.name for engine in config.engines]
+        game.headers["White"], game.headers["Black"] = (
+            names if first_is_white else names[::-1]
+        )
+        game.headers["Round"] = str(2 * index + (not first_is_white) + 1)
+        score = RESULT_SCORES[game.headers["Result"]]
+        games.append((game.pgn(), score if first_is_white else 1 - score))
+    return games
+
+
+def expected_score(elo: float) -> float:
+    """Returns the expected score of an Elo difference."""
+    return 1 / (1 + 10 ** (-elo / 400))
+
+
+def score_statistics(wins: float, draws: float, losses: float) -> tuple[float, float]:
+    """Returns the mean and variance of the per-game score."""
+    total = wins + draws + losses
+    score = (wins + draws / 2) / total
+    return score, (wins + draws / 4) / total - score**2
+
+
+def elo_estimate(wins: int, draws: int, losses: int) -> tuple[float, float]:
+    """Returns the Elo difference and its 95% error margin."""
+    games = wins + draws + losses
+    if not games:
+        return 0.0, math.inf
+    # Half a game of each outcome keeps the margin non-zero while every
+    # result so far is the same.
+    score, variance = score_statistics(wins + 0.5, draws + 0.5, losses + 0.5)
+    margin = 1.96 * math.sqrt(variance / games)
+
+    def elo(value):
+        value = min(max(value, 1e-6), 1 - 1e-6)
+        return -400 * math.log10(1 / value - 1)
+
+    return elo(score), (elo(score + margin) - elo(score - margin)) / 2
+
+
+@dataclass
+class SPRT:
+    elo0: float = 0.0
+    elo1: float = 5.0
+    alpha: float = 0.05
+    beta: float = 0.05
+
+    @property
+    def bounds(self) -> tuple[float, float]:
+        """Returns the log-likelihood ratio bounds accepting H0 and H1."""
+        return (
+            math.log(self.beta / (1 - self.alpha)),
+            math.log((1 - self.beta) / self.alpha),
+        )
+
+    def llr(self, wins: int, draws: int, losses: int) -> float:
+        """Returns the generalized log-likelihood ratio of the results.
+
+        While every result is the same the raw variance is zero, so the
+        variance is then taken with half a game of each outcome added, as
+        in ``elo_estimate``; a one-sided match still reaches a bound.
+        """
+        games = wins + draws + losses
+        if not games:
+            return 0.0
+        score, variance = score_statistics(wins, draws, losses)
+        if variance <= 0:
+            _, variance = score_statistics(wins + 0.5, draws + 0.5, losses + 0.5)
+        score0, score1 = expected_score(self.elo0), expected_score(self.elo1)
+        return (
+            games * (score1 - score0) * (2 * score - score0 - score1) / (2 * variance)
+        )
+
+    def decision(self, wins: int, draws: int, losses: int) -> str | None:
+        """Returns "H0" or "H1" once a hypothesis is accepted."""
+        llr = self.llr(wins, draws, losses)
+        lower, upper = self.bounds
+        if llr <= lower:
+            return "H0"
+        if llr >= upper:
+            return "H1"
+        return None
+
+
+def run(config: MatchConfig) -> tuple[int, int, int, str | None]:
+    """Plays the match and returns (wins, draws, losses, SPRT decision) of
+    the first engine.
+    """
+    if config.games % 2:
+        raise ValueError("The number of games must be even")
+    sprt = SPRT(config.elo0, config.elo1, config.alpha, config.beta)
+    wins = draws = losses = 0
+    decision = None
+    with ExitStack() as stack:
+        output = None
+        if config.pgn_path:
+            output = stack.enter_context(open(config.pgn_path, "w", encoding="utf-8"))
+        pool = ProcessPoolExecutor(
+            max_workers=config.workers, initializer=_init_worker, initargs=(config,)
+        )
+        stack.callback(pool.shutdown, cancel_futures=True)
+        futures = [
+            pool.submit(play_pair, config, index) for index in range(config.games // 2)
+        ]
+        for future in as_completed(futures):
+            for pgn, score in future.result():
+                wins += score == 1
+                draws += score == 0.5
+                losses += score == 0
+                if output:
+                    output.write(pgn + "\n")
+            elo, margin = elo_estimate(wins, draws, losses)
+            logger.info(
+                "+%d =%d -%d  elo %.1f +- %.1f  llr %.2f (%.2f, %.2f)",
+                wins,
+                draws,
+                losses,
+                elo,
+                margin,
+                sprt.llr(wins, draws, losses),
+                *sprt.bounds,
+            )
+            decision = sprt.decision(wins, draws, losses)
+            if decision:
+                logger.info("SPRT accepted %s", decision)
+                break
+    return wins, draws, losses, decision
+
+
+def main(argv: list[str] | None = None) -> None:
+    parser = argparse.ArgumentParser(description="Play an engine match.")
+    parser.add_argument(
+        "--engine",
+        action="append",
+        required=True,
+        help="name=...,cmd=...|eval=...,depth=...,nodes=...,movetime=...,hash=...",
+    )
+    parser.add_argument(
+        "--games", type=int, default=100, help="even: openings are played in pairs"
+    )
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 1)
+    parser.add_argument("--openings", help="file of FENs or UCI move lines")
+    parser.add_argument("--pgn", help="output PGN file")
+    parser.add_argument(
+        "--tablebase",
+        help="directories of Syzygy tables, colon separated",
+    )
+    parser.add_argument("--resign-score", type=int, default=600)
+    parser.add_argument("--resign-moves", type=int, default=4)
+    parser.add_argument("--draw-score", type=int, default=10)
+    parser.add_argument("--draw-moves", type=int, default=8)
+    parser.add_argument("--draw-move-number", type=int, default=40)
+    parser.add_argument("--max-plies", type=int, default=400)
+    parser.add_argument(
+        "--sprt", type=float, nargs=2, default=[0.0, 5.0], metavar=("ELO0", "ELO1")
+    )
+    parser.add_argument("--alpha", type=float, default=0.05)
+    parser.add_argument("--beta", type=float, default=0.05)
+    args = parser.parse_args(argv)
+    if len(args.engine) != 2:
+        parser.error("exactly two --engine options are needed")
+    if args.games % 2:
+        parser.error("--games must be even")
+
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s %(message)s")
+    config = MatchConfig(
+        engines=tuple(EngineConfig.parse(spec) for spec in args.engine),
+        games=args.games,
+        adjudication=Adjudication(
+            args.tablebase,
+            args.resign_score,
+            args.resign_moves,
+            args.draw_score,
+            args.draw_moves,
+            args.draw_move_number,
+            args.max_plies,
+        ),
+        workers=args.workers,
+        pgn_path=args.pgn,
+        elo0=args.sprt[0],
+        elo1=args.sprt[1],
+        alpha=args.alpha,
+        beta=args.beta,
+    )
+    if args.openings:
+        config.openings = load_openings(args.openings)
+    run(config)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,338 @@
+"""PUCT Monte Carlo tree search over an array-backed node store.
+
+Nodes live in parallel NumPy arrays rather than per-node objects, and the
+children of a node occupy one contiguous block, so selection is a single
+vectorized PUCT argmax over a slice. Several worker threads can descend
+the tree at once: each applies a virtual loss on its path so the others
+explore elsewhere while it waits for its leaf evaluation, which is what
+lets a ``BatchEvaluator`` fill its batches.
+
+Node values are stored from the point of view of the player who made the
+move leading to the node. After a move is played, ``advance`` keeps the
+subtree below it so the next search starts from the statistics gathered.
+"""
+
+from __future__ import annotations
+
+import math
+import threading
+from typing import Callable
+
+import numpy as np
+
+from inference import Evaluation, move_priors
+from movegen import checkers, legal_moves
+from position import Position
+
+NO_CHILDREN = -1
+
+
+class NodeStore:
+    """Parallel arrays holding the statistics of every node of a tree."""
+
+    def __init__(self, capacity: int = 1 << 16):
+        """Allocates room for capacity nodes."""
+        self.size = 0
+        self.capacity = capacity
+        self.visits = np.zeros(capacity, dtype=np.int32)
+        self.value_sum = np.zeros(capacity, dtype=np.float32)
+        self.virtual_loss = np.zeros(capacity, dtype=np.int32)
+        self.prior = np.zeros(capacity, dtype=np.float32)
+        self.move = np.zeros(capacity, dtype=np.int32)
+        self.parent = np.full(capacity, -1, dtype=np.int32)
+        self.first_child = np.full(capacity, NO_CHILDREN, dtype=np.int32)
+        self.child_count = np.zeros(capacity, dtype=np.int32)
+        self.terminal = np.full(capacity, np.nan, dtype=np.float32)
+
+    def _grow(self, needed: int) -> None:
+        """Doubles the arrays until needed more nodes fit."""
+        capacity = self.capacity
+        while self.size + needed > capacity:
+            capacity *= 2
+        for name, fill in (
+            ("visits", 0),
+            ("value_sum", 0),
+            ("virtual_loss", 0),
+            ("prior", 0),
+            ("move", 0),
+            ("parent", -1),
+            ("first_child", NO_CHILDREN),
+            ("child_count", 0),
+            ("terminal", np.nan),
+        ):
+            old = getattr(self, name)
+            new = np.full(capacity, fill, dtype=old.dtype)
+            new[: self.size] = old[: self.size]
+            setattr(self, name, new)
+        self.capacity = capacity
+
+    def add_root(self) -> int:
+        """Adds a node without a parent and returns its index."""
+        return self.add_children(-1, np.zeros(1, dtype=np.int32), np.ones(1))
+
+    def add_children(self, parent: int, moves, priors) -> int:
+        """Adds a contiguous block of children and returns the first index."""
+        count = len(moves)
+        if self.size + count > self.capacity:
+            self._grow(count)
+        first = self.size
+        block = slice(first, first + count)
+        self.move[block] = moves
+        self.prior[block] = priors
+        self.parent[block] = parent
+        self.size += count
+        if parent >= 0:
+            self.first_child[parent] = first
+            self.child_count[parent] = count
+        return first
+
+    def is_expanded(self, node: int) -> bool:
+        """Returns whether the children of a node were added."""
+        return self.first_child[node] != NO_CHILDREN
+
+
+class MCTS:
+    """Runs PUCT searches, reusing the tree between moves."""
+
+    def __init__(
+        self,
+        evaluate: Callable[[Position], Evaluation],
+        c_puct: float = 1.5,
+        virtual_loss: int = 3,
+        capacity: int = 1 << 16,
+        dirichlet_alpha: float = 0.3,
+        noise_fraction: float = 0.0,
+        seed: int | None = None,
+    ):
+        """Initializes an empty tree.
+
+        Args:
+            evaluate: Returns policy logits and a value for the side to move,
+                e.g. ``BatchEvaluator.evaluate``.
+            c_puct: Exploration constant.
+            virtual_loss: Visits counted as losses while a path is pending.
+            capacity: Initial number of node slots.
+            dirichlet_alpha: Concentration of the root exploration noise.
+            noise_fraction: Weight of root noise, 0 to disable.
+        """
+        self.evaluate = evaluate
+        self.c_puct = c_puct
+        self.virtual_loss = virtual_loss
+        self.dirichlet_alpha = dirichlet_alpha
+        self.noise_fraction = noise_fraction
+        self.rng = np.random.default_rng(seed)
+        self.lock = threading.Lock()
+        self.capacity = capacity
+        self.store = NodeStore(capacity)
+        self.root = self.store.add_root()
+        self.root_key: int | None = None
+        # Noise is mixed into a root's priors once, not on every search.
+        self.root_noised = False
+
+    def reset(self) -> None:
+        """Discards the tree."""
+        self.store = NodeStore(self.capacity)
+        self.root = self.store.add_root()
+        self.root_key = None
+        self.root_noised = False
+
+    def search(
+        self, position: Position, simulations: int = 800, threads: int = 1
+    ) -> None:
+        """Runs simulations from the position, spread over worker threads."""
+        if self.root_key != position.key:
+            self.reset()
+            self.root_key = position.key
+        if not self.store.is_expanded(self.root):
+            self._simulate(position.copy())
+            simulations -= 1
+        self._add_root_noise()
+
+        remaining = [simulations]
+
+        def worker() -> None:
+            local = position.copy()
+            while True:
+                with self.lock:
+                    if remaining[0] <= 0:
+                        return
+                    remaining[0] -= 1
+                self._simulate(local)
+
+        if threads <= 1:
+            worker()
+            return
+        workers = [threading.Thread(target=worker) for _ in range(threads)]
+        for thread in workers:
+            thread.start()
+        for thread in workers:
+            thread.join()
+
+    def _add_root_noise(self) -> None:
+        """Mixes Dirichlet noise into the root priors for exploration, once
+        per root so repeated searches do not compound it.
+        """
+        store = self.store
+        count = store.child_count[self.root]
+        if not self.noise_fraction or not count or self.root_noised:
+            return
+        self.root_noised = True
+        block = slice(
+            store.first_child[self.root], store.first_child[self.root] + count
+        )
+        noise = self.rng.dirichlet([self.dirichlet_alpha] * count)
+        store.prior[block] = (1 - self.noise_fraction) * store.prior[
+            block
+        ] + self.noise_fraction * noise
+
+    def _select(self, node: int) -> int:
+        """Returns the child of a node with the highest PUCT score."""
+        store = self.store
+        first = store.first_child[node]
+        block = slice(first, first + store.child_count[node])
+        virtual = store.virtual_loss[block]
+        visits = store.visits[block] + virtual
+        values = store.value_sum[block] - virtual
+        q = np.divide(values, visits, out=np.zeros(len(values)), where=visits > 0)
+        parent_visits = store.visits[node] + store.virtual_loss[node]
+        u = (
+            self.c_puct
+            * store.prior[block]
+            * math.sqrt(parent_visits + 1)
+            / (1 + visits)
+        )
+        return first + int(np.argmax(q + u))
+
+    def _simulate(self, position: Position) -> None:
+        """Runs one selection, evaluation and backup pass."""
+        path = [self.root]
+        played = 0
+        with self.lock:
+            store = self.store
+            node = self.root
+            store.virtual_loss[node] += self.virtual_loss
+            while store.is_expanded(node) and store.child_count[node]:
+                node = self._select(node)
+                store.virtual_loss[node] += self.virtual_loss
+                position.make_move(int(store.move[node]))
+                played += 1
+                path.append(node)
+            terminal = store.terminal[node]
+
+        priors = None
+        try:
+            if not math.isnan(terminal):
+                value = float(terminal)
+                moves = None
+            elif position.halfmove_clock >= 100 or position.is_repetition():
+                value, moves = 0.0, []
+            else:
+                moves = legal_moves(position)
+                if not moves:
+                    value = -1.0 if checkers(position) else 0.0
+                else:
+                    evaluation = self.evaluate(position)
+                    value = evaluation.value
+                    priors = move_priors(evaluation.logits, moves)
+        except BaseException:
+            with self.lock:
+                for visited in path:
+                    self.store.virtual_loss[visited] -= self.virtual_loss
+            raise
+        finally:
+            for _ in range(played):
+                position.unmake_move()
+
+        with self.lock:
+            store = self.store
+            if moves is not None and not store.is_expanded(node):
+                if moves:
+                    store.add_children(node, moves, priors)
+                else:
+                    store.terminal[node] = value
+            # The leaf value is for the side to move there; the node itself
+            # stores values for the player who moved into it.
+            value = -value
+            for visited in reversed(path):
+                store.virtual_loss[visited] -= self.virtual_loss
+                store.visits[visited] += 1
+                store.value_sum[visited] += value
+                value = -value
+
+    def children(self) -> tuple[list[int], np.ndarray]:
+        """Returns the root moves and their visit counts."""
+        store = self.store
+        first = store.first_child[self.root]
+        if first == NO_CHILDREN:
+            return [], np.zeros(0, dtype=np.int32)
+        block = slice(first, first + store.child_count[self.root])
+        return store.move[block].tolist(), store.visits[block].copy()
+
+    def policy(self, temperature: float = 1.0) -> tuple[list[int], np.ndarray]:
+        """Returns the root moves and visit-count probabilities."""
+        moves, visits = self.children()
+        if not moves:
+            return moves, visits.astype(np.float32)
+        if temperature <= 0:
+            probabilities = np.zeros(len(moves), dtype=np.float32)
+            probabilities[int(np.argmax(visits))] = 1
+            return moves, probabilities
+        weights = visits.astype(np.float64) ** (1 / temperature)
+        total = weights.sum()
+        if not total:
+            return moves, np.full(len(moves), 1 / len(moves), dtype=np.float32)
+        return moves, (weights / total).astype(np.float32)
+
+    def best_move(self) -> int | None:
+        """Returns the most visited root move."""
+        moves, visits = self.children()
+        return moves[int(np.argmax(visits))] if moves else None
+
+    def value(self) -> float:
+        """Returns the mean root value for the side to move at the root."""
+        visits = self.store.visits[self.root]
+        return -float(self.store.value_sum[self.root]) / visits if visits else 0.0
+
+    def advance(self, move: int, position: Position) -> None:
+        """Keeps the subtree below move, the position after playing it."""
+        store = self.store
+        first = store.first_child[self.root]
+        child = -1
+        if first != NO_CHILDREN:
+            for index in range(first, first + store.child_count[self.root]):
+                if store.move[index] == move:
+                    child = index
+                    break
+        if child < 0:
+            self.reset()
+        else:
+            self._compact(child)
+        self.root_key = position.key
+        self.root_noised = False
+
+    def _compact(self, new_root: int) -> None:
+        """Copies the subtree of new_root into a fresh store."""
+        old = self.store
+        new = NodeStore(max(self.capacity, old.size))
+        root = new.add_root()
+        new.visits[root] = old.visits[new_root]
+        new.value_sum[root] = old.value_sum[new_root]
+        new.terminal[root] = old.terminal[new_root]
+        pending = [(new_root, root)]
+        while pending:
+            old_node, new_node = pending.pop()
+            first = old.first_child[old_node]
+            if first == NO_CHILDREN:
+                continue
+            count = old.child_count[old_node]
+            block = slice(first, first + count)
+            new_first = new.add_children(new_node, old.move[block], old.prior[block])
+            new_block = slice(new_first, new_first + count)
+            new.visits[new_block] = old.visits[block]
+            new.value_sum[new_block] = old.value_sum[block]
+            new.terminal[new_block] = old.terminal[block]
+            pending.extend(
+                (first + offset, new_first + offset) for offset in range(count)
+            )
+        self.store = new
+        self.root = root
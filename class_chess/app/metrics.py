@@ -0,0 +1,176 @@
+"""Process-wide counters and timers for the engine and the UI loop.
+
+Hot loops do not touch the registry: the searcher counts nodes, table
+probes, move generations and evaluations in its own attributes and adds
+them to ``METRICS`` once per search, and the UI records one timing per
+frame. Reading the registry therefore costs nothing while searching.
+
+A snapshot can be written as JSON or in the Prometheus text format, to a
+file (``dump``, or periodically with ``Exporter``) or over HTTP for a
+Prometheus scraper (``serve_http``).
+"""
+
+from __future__ import annotations
+
+import json
+import os
+import threading
+import time
+from contextlib import contextmanager
+from typing import TYPE_CHECKING, Iterator
+
+if TYPE_CHECKING:
+    from http.server import ThreadingHTTPServer
+
+PREFIX = "tensorchess_"
+
+
+class Metrics:
+    """Thread-safe registry of monotonic counters and timers.
+
+    A timer keeps the count, total and maximum of its observations.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.counters: dict[str, int] = {}
+        self.timers: dict[str, list[float]] = {}
+
+    def increment(self, name: str, value: int = 1) -> None:
+        """Adds to a counter."""
+        with self._lock:
+            self.counters[name] = self.counters.get(name, 0) + value
+
+    def observe(self, name: str, seconds: float) -> None:
+        """Records one duration of a timer."""
+        with self._lock:
+            timer = self.timers.setdefault(name, [0, 0.0, 0.0])
+            timer[0] += 1
+            timer[1] += seconds
+            timer[2] = max(timer[2], seconds)
+
+    @contextmanager
+    def timer(self, name: str) -> Iterator[None]:
+        """Times the body of a ``with`` statement."""
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(name, time.perf_counter() - start)
+
+    def snapshot(self) -> dict:
+        """Returns a copy of every counter and timer."""
+        with self._lock:
+            return {
+                "counters": dict(self.counters),
+                "timers": {
+                    name: {"count": count, "seconds": total, "max_seconds": longest}
+                    for name, (count, total, longest) in self.timers.items()
+                },
+            }
+
+    def reset(self) -> None:
+        """Removes every counter and timer."""
+        with self._lock:
+            self.counters.clear()
+            self.timers.clear()
+
+    def to_json(self) -> str:
+        """Returns the snapshot as JSON."""
+        return json.dumps(self.snapshot(), indent=2, sort_keys=True)
+
+    def to_prometheus(self) -> str:
+        """Returns the snapshot in the Prometheus text exposition format."""
+        snapshot = self.snapshot()
+        lines = []
+        for name, value in sorted(snapshot["counters"].items()):
+            lines.append(f"# TYPE {PREFIX}{name} counter")
+            lines.append(f"{PREFIX}{name} {value}")
+        for name, timer in sorted(snapshot["timers"].items()):
+            metric = f"{PREFIX}{name}_seconds"
+            lines.append(f"# TYPE {metric} summary")
+            lines.append(f"{metric}_count {timer['count']}")
+            lines.append(f"{metric}_sum {timer['seconds']:.6f}")
+            lines.append(f"# TYPE {metric}_max gauge")
+            lines.append(f"{metric}_max {timer['max_seconds']:.6f}")
+        return "\n".join(lines) + "\n"
+
+    def dump(self, path: str, fmt: str | None = None) -> None:
+        """Writes the snapshot atomically, in Prometheus text for ``.prom``
+        files and JSON otherwise unless fmt says which.
+        """
+        fmt = fmt or ("prometheus" if path.endswith(".prom") else "json")
+        text = self.to_prometheus() if fmt == "prometheus" else self.to_json()
+        temporary = f"{path}.tmp"
+        with open(temporary, "w", encoding="utf-8") as output:
+            output.write(text)
+        os.replace(temporary, path)
+
+
+METRICS = Metrics()
+
+
+class Exporter:
+    """Background thread dumping a registry to a file at an interval."""
+
+    def __init__(
+        self,
+        path: str,
+        interval: float = 10.0,
+        fmt: str | None = None,
+        metrics: Metrics = METRICS,
+    ):
+        self.path = path
+        self.interval = interval
+        self.fmt = fmt
+        self.metrics = metrics
+        self._stopped = threading.Event()
+        self._thread = threading.Thread(target=self._run, daemon=True)
+
+    def _run(self) -> None:
+        while not self._stopped.wait(self.interval):
+            self.metrics.dump(self.path, self.fmt)
+
+    def start(self) -> Exporter:
+        """Starts dumping and returns the exporter."""
+        self._thread.start()
+        return self
+
+    def stop(self) -> None:
+        """Stops the thread after a last dump."""
+        self._stopped.set()
+        self._thread.join()
+        self.metrics.dump(self.path, self.fmt)
+
+
+def serve_http(
+    port: int, host: str = "127.0.0.1", metrics: Metrics = METRICS
+) -> ThreadingHTTPServer:
+    """Serves the registry from a daemon thread and returns the server.
+
+    Any path answers in the Prometheus text format except
+    ``/metrics.json``. ``shutdown`` on the server stops it.
+    """
+    # Imported here: most processes never serve metrics over HTTP.
+    # pylint: disable-next=import-outside-toplevel
+    from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+    class Handler(BaseHTTPRequestHandler):
+        def do_GET(self):  # pylint: disable=invalid-name
+            if self.path.split("?")[0] == "/metrics.json":
+                body, content_type = metrics.to_json(), "application/json"
+            else:
+                body, content_type = metrics.to_prometheus(), "text/plain"
+            body = body.encode()
+            self.send_response(200)
+            self.send_header("Content-Type", f"{content_type}; charset=utf-8")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, *args):
+            pass
+
+    server = ThreadingHTTPServer((host, port), Handler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
@@ -0,0 +1,408 @@
+"""Legal move generation for bitboard positions.
+
+Moves are plain integers: bits 0-5 hold the origin square, bits 6-11 the
+destination and bits 12-14 the promotion piece type (0 for none, which is
+unambiguous because a pawn is never a promotion target).
+
+Knight, king and pawn attacks come from precomputed tables. Sliding
+attacks are looked up per line (rank, file, diagonal, anti-diagonal) in
+tables keyed by the relevant occupancy bits of that line, the dictionary
+equivalent of magic bitboard indexing.
+"""
+
+from __future__ import annotations
+
+from typing import TYPE_CHECKING
+
+from position import (
+    BISHOP,
+    BLACK_SQUARES,
+    BLACK,
+    BLACK_KINGSIDE,
+    BLACK_QUEENSIDE,
+    FULL_BOARD,
+    KING,
+    KNIGHT,
+    PAWN,
+    QUEEN,
+    ROOK,
+    WHITE,
+    WHITE_KINGSIDE,
+    WHITE_QUEENSIDE,
+    iter_bits,
+    parse_square,
+    square_name,
+)
+
+if TYPE_CHECKING:
+    from position import Position
+
+PROMOTION_PIECES = (QUEEN, ROOK, BISHOP, KNIGHT)
+PROMOTION_SYMBOLS = {KNIGHT: "n", BISHOP: "b", ROOK: "r", QUEEN: "q"}
+
+KNIGHT_OFFSETS = (
+    (1, 2),
+    (2, 1),
+    (2, -1),
+    (1, -2),
+    (-1, -2),
+    (-2, -1),
+    (-2, 1),
+    (-1, 2),
+)
+KING_OFFSETS = ((1, 0), (1, 1), (0, 1), (-1, 1), (-1, 0), (-1, -1), (0, -1), (1, -1))
+# Pairs of opposite directions making up the four lines through a square.
+LINES = (
+    ((1, 0), (-1, 0)),
+    ((0, 1), (0, -1)),
+    ((1, 1), (-1, -1)),
+    ((1, -1), (-1, 1)),
+)
+
+
+def encode_move(from_sq: int, to_sq: int, promotion: int = 0) -> int:
+    """Returns the integer encoding of a move."""
+    return from_sq | to_sq << 6 | promotion << 12
+
+
+def move_from(move: int) -> int:
+    """Returns the origin square of a move."""
+    return move & 63
+
+
+def move_to(move: int) -> int:
+    """Returns the destination square of a move."""
+    return move >> 6 & 63
+
+
+def move_promotion(move: int) -> int:
+    """Returns the promotion piece type of a move, 0 if none."""
+    return move >> 12
+
+
+def move_uci(move: int) -> str:
+    """Returns the UCI notation of a move, e.g. ``e7e8q``."""
+    promotion = move >> 12
+    return (
+        square_name(move & 63)
+        + square_name(move >> 6 & 63)
+        + (PROMOTION_SYMBOLS[promotion] if promotion else "")
+    )
+
+
+def parse_uci(uci: str) -> int:
+    """Returns the move encoded by a UCI string."""
+    if len(uci) not in (4, 5):
+        raise ValueError(f"Invalid UCI move: {uci}")
+    promotion = 0
+    if len(uci) == 5:
+        symbols = {symbol: piece for piece, symbol in PROMOTION_SYMBOLS.items()}
+        if uci[4] not in symbols:
+            raise ValueError(f"Invalid UCI move: {uci}")
+        promotion = symbols[uci[4]]
+    return encode_move(parse_square(uci[:2]), parse_square(uci[2:4]), promotion)
+
+
+def _walk(sq: int, directions, occupancy: int = 0) -> int:
+    """Returns the squares reached from sq, stopping at the first blocker."""
+    attacks = 0
+    file, rank = sq & 7, sq >> 3
+    for file_step, rank_step in directions:
+        x, y = file + file_step, rank + rank_step
+        while 0 <= x < 8 and 0 <= y < 8:
+            target = 1 << (y * 8 + x)
+            attacks |= target
+            if occupancy & target:
+                break
+            x, y = x + file_step, y + rank_step
+    return attacks
+
+
+def _steps(sq: int, offsets) -> int:
+    """Returns the squares a single step away from sq."""
+    attacks = 0
+    file, rank = sq & 7, sq >> 3
+    for file_step, rank_step in offsets:
+        x, y = file + file_step, rank + rank_step
+        if 0 <= x < 8 and 0 <= y < 8:
+            attacks |= 1 << (y * 8 + x)
+    return attacks
+
+
+def _relevant_mask(sq: int, directions) -> int:
+    """Returns the squares of a line whose occupancy can block a slider."""
+    mask = 0
+    file, rank = sq & 7, sq >> 3
+    for file_step, rank_step in directions:
+        x, y = file + file_step, rank + rank_step
+        while 0 <= x + file_step < 8 and 0 <= y + rank_step < 8:
+            mask |= 1 << (y * 8 + x)
+            x, y = x + file_step, y + rank_step
+    return mask
+
+
+def _line_table(directions) -> tuple[list[int], list[dict[int, int]]]:
+    """Returns per-square relevant masks and occupancy-keyed attack tables."""
+    masks, tables = [], []
+    for sq in range(64):
+        mask = _relevant_mask(sq, directions)
+        table = {}
+        subset = 0
+        while True:
+            table[subset] = _walk(sq, directions, subset)
+            subset = (subset - mask) & mask
+            if not subset:
+                break
+        masks.append(mask)
+        tables.append(table)
+    return masks, tables
+
+
+KNIGHT_ATTACKS = [_steps(sq, KNIGHT_OFFSETS) for sq in range(64)]
+KING_ATTACKS = [_steps(sq, KING_OFFSETS) for sq in range(64)]
+PAWN_ATTACKS = (
+    [_steps(sq, ((1, 1), (-1, 1))) for sq in range(64)],
+    [_steps(sq, ((1, -1), (-1, -1))) for sq in range(64)],
+)
+
+(
+    (RANK_MASKS, RANK_ATTACKS),
+    (FILE_MASKS, FILE_ATTACKS),
+    (DIAGONAL_MASKS, DIAGONAL_ATTACKS),
+    (ANTI_DIAGONAL_MASKS, ANTI_DIAGONAL_ATTACKS),
+) = (_line_table(line) for line in LINES)
+
+# BETWEEN[a][b]: squares strictly between two aligned squares.
+# LINE[a][b]: the full line through two aligned squares, 0 otherwise.
+BETWEEN = [[0] * 64 for _ in range(64)]
+LINE = [[0] * 64 for _ in range(64)]
+for _from in range(64):
+    for _line in LINES:
+        _full = _walk(_from, _line) | 1 << _from
+        for _file_step, _rank_step in _line:
+            _ray = 0
+            _x, _y = (_from & 7) + _file_step, (_from >> 3) + _rank_step
+            while 0 <= _x < 8 and 0 <= _y < 8:
+                _to = _y * 8 + _x
+                LINE[_from][_to] = _full
+                BETWEEN[_from][_to] = _ray
+                _ray |= 1 << _to
+                _x, _y = _x + _file_step, _y + _rank_step
+del _from, _line, _full, _file_step, _rank_step, _ray, _x, _y, _to
+
+CASTLING_PATHS = {
+    WHITE: (
+        (WHITE_KINGSIDE, 4, 6, 7, 0x60, 0x60),
+        (WHITE_QUEENSIDE, 4, 2, 0, 0x0E, 0x0C),
+    ),
+    BLACK: (
+        (BLACK_KINGSIDE, 60, 62, 63, 0x60 << 56, 0x60 << 56),
+        (BLACK_QUEENSIDE, 60, 58, 56, 0x0E << 56, 0x0C << 56),
+    ),
+}
+
+
+def rook_attacks(sq: int, occupancy: int) -> int:
+    """Returns the squares a rook on sq attacks."""
+    return (
+        RANK_ATTACKS[sq][occupancy & RANK_MASKS[sq]]
+        | FILE_ATTACKS[sq][occupancy & FILE_MASKS[sq]]
+    )
+
+
+def bishop_attacks(sq: int, occupancy: int) -> int:
+    """Returns the squares a bishop on sq attacks."""
+    return (
+        DIAGONAL_ATTACKS[sq][occupancy & DIAGONAL_MASKS[sq]]
+        | ANTI_DIAGONAL_ATTACKS[sq][occupancy & ANTI_DIAGONAL_MASKS[sq]]
+    )
+
+
+def queen_attacks(sq: int, occupancy: int) -> int:
+    """Returns the squares a queen on sq attacks."""
+    return rook_attacks(sq, occupancy) | bishop_attacks(sq, occupancy)
+
+
+def attackers(position: Position, color: int, sq: int, occupancy: int) -> int:
+    """Returns the pieces of color attacking sq given an occupancy."""
+    pieces = position.pieces[color]
+    return (
+        KNIGHT_ATTACKS[sq] & pieces[KNIGHT]
+        | KING_ATTACKS[sq] & pieces[KING]
+        | PAWN_ATTACKS[color ^ 1][sq] & pieces[PAWN]
+        | rook_attacks(sq, occupancy) & (pieces[ROOK] | pieces[QUEEN])
+        | bishop_attacks(sq, occupancy) & (pieces[BISHOP] | pieces[QUEEN])
+    )
+
+
+def is_attacked(position: Position, color: int, sq: int) -> bool:
+    """Returns whether color attacks sq in the position."""
+    return bool(attackers(position, color, sq, position.occupancy))
+
+
+def checkers(position: Position) -> int:
+    """Returns the enemy pieces giving check to the side to move."""
+    us = position.turn
+    return attackers(position, us ^ 1, position.king_square(us), position.occupancy)
+
+
+def is_check(position: Position) -> bool:
+    """Returns whether the side to move is in check."""
+    return bool(checkers(position))
+
+
+def pinned(position: Position, color: int) -> int:
+    """Returns the pieces of color pinned to their own king."""
+    them = position.pieces[color ^ 1]
+    ours = position.occupied[color]
+    occupancy = ours | position.occupied[color ^ 1]
+    king = position.king_square(color)
+    snipers = rook_attacks(king, 0) & (them[ROOK] | them[QUEEN]) | bishop_attacks(
+        king, 0
+    ) & (them[BISHOP] | them[QUEEN])
+    result = 0
+    for sniper in iter_bits(snipers):
+        blockers = BETWEEN[king][sniper] & occupancy
+        if blockers and not blockers & (blockers - 1) and blockers & ours:
+            result |= blockers
+    return result
+
+
+def legal_moves(position: Position) -> list[int]:
+    """Returns every legal move of the side to move."""
+    us = position.turn
+    them = us ^ 1
+    pieces = position.pieces[us]
+    ours = position.occupied[us]
+    theirs = position.occupied[them]
+    occupancy = ours | theirs
+    king = pieces[KING].bit_length() - 1
+    moves: list[int] = []
+    append = moves.append
+
+    king_checkers = attackers(position, them, king, occupancy)
+    without_king = occupancy ^ 1 << king
+    for to_sq in iter_bits(KING_ATTACKS[king] & ~ours):
+        if not attackers(position, them, to_sq, without_king):
+            append(king | to_sq << 6)
+    if king_checkers & (king_checkers - 1):
+        return moves
+
+    if king_checkers:
+        checker = king_checkers.bit_length() - 1
+        target_mask = king_checkers | BETWEEN[king][checker]
+    else:
+        target_mask = FULL_BOARD
+        for right, king_from, king_to, rook_sq, empty, safe in CASTLING_PATHS[us]:
+            if (
+                position.castling & right
+                and not occupancy & empty
+                and pieces[ROOK] >> rook_sq & 1
+                and not any(
+                    attackers(position, them, sq, occupancy) for sq in iter_bits(safe)
+                )
+            ):
+                append(king_from | king_to << 6)
+
+    pins = pinned(position, us)
+    targets = ~ours & target_mask
+
+    for from_sq in iter_bits(pieces[KNIGHT] & ~pins):
+        for to_sq in iter_bits(KNIGHT_ATTACKS[from_sq] & targets):
+            append(from_sq | to_sq << 6)
+
+    for piece_type, attacks in (
+        (BISHOP, bishop_attacks),
+        (ROOK, rook_attacks),
+        (QUEEN, queen_attacks),
+    ):
+        for from_sq in iter_bits(pieces[piece_type]):
+            reachable = attacks(from_sq, occupancy) & targets
+            if pins >> from_sq & 1:
+                reachable &= LINE[king][from_sq]
+            for to_sq in iter_bits(reachable):
+                append(from_sq | to_sq << 6)
+
+    empty = ~occupancy
+    forward = 8 if us == WHITE else -8
+    start_rank, last_rank = (1, 7) if us == WHITE else (6, 0)
+    for from_sq in iter_bits(pieces[PAWN]):
+        reachable = PAWN_ATTACKS[us][from_sq] & theirs
+        single = from_sq + forward
+        if empty >> single & 1:
+            reachable |= 1 << single
+            double = single + forward
+            if from_sq >> 3 == start_rank and empty >> double & 1:
+                reachable |= 1 << double
+        reachable &= target_mask
+        if pins >> from_sq & 1:
+            reachable &= LINE[king][from_sq]
+        for to_sq in iter_bits(reachable):
+            if to_sq >> 3 == last_rank:
+                for promotion in PROMOTION_PIECES:
+                    append(from_sq | to_sq << 6 | promotion << 12)
+            else:
+                append(from_sq | to_sq << 6)
+
+    ep_square = position.ep_square
+    if ep_square is not None:
+        captured = ep_square - forward
+        if target_mask >> ep_square & 1 or king_checkers >> captured & 1:
+            sliders = position.pieces[them]
+            for from_sq in iter_bits(PAWN_ATTACKS[them][ep_square] & pieces[PAWN]):
+                after = occupancy ^ (1 << from_sq | 1 << captured | 1 << ep_square)
+                if not (
+                    rook_attacks(king, after) & (sliders[ROOK] | sliders[QUEEN])
+                    or bishop_attacks(king, after) & (sliders[BISHOP] | sliders[QUEEN])
+                ):
+                    append(from_sq | ep_square << 6)
+
+    return moves
+
+
+def find_move(position: Position, from_sq: int, to_sq: int) -> int | None:
+    """Returns the legal move between two squares, promoting to a queen."""
+    moves = legal_moves(position)
+    for move in (from_sq | to_sq << 6, from_sq | to_sq << 6 | QUEEN << 12):
+        if move in moves:
+            return move
+    return None
+
+
+def is_insufficient_material(position: Position) -> bool:
+    """Returns whether neither side can possibly checkmate.
+
+    Covers bare kings, a single minor piece, and bishops all on squares of
+    one color.
+    """
+    for color in (WHITE, BLACK):
+        pieces = position.pieces[color]
+        if pieces[PAWN] or pieces[ROOK] or pieces[QUEEN]:
+            return False
+    knights = position.pieces[WHITE][KNIGHT] | position.pieces[BLACK][KNIGHT]
+    bishops = position.pieces[WHITE][BISHOP] | position.pieces[BLACK][BISHOP]
+    if not bishops:
+        return knights.bit_count() <= 1
+    if knights:
+        return False
+    return not bishops & BLACK_SQUARES or not bishops & ~BLACK_SQUARES
+
+
+def game_result(position: Position) -> str | None:
+    """Returns the result of a finished game ("1-0", "0-1", "1/2-1/2")."""
+    if not legal_moves(position):
+        if is_check(position):
+            return "0-1" if position.turn == WHITE else "1-0"
+        return "1/2-1/2"
+    if (
+        position.halfmove_clock >= 100
+        or position.is_repetition()
+        or is_insufficient_material(position)
+    ):
+        return "1/2-1/2"
+    return None
+
+
+def is_legal(position: Position, move: int) -> bool:
+    """Returns whether a move is legal in the position."""
+    return move in legal_moves(position)
@@ -0,0 +1,336 @@
+"""Efficiently updatable neural network (NNUE) evaluation with NumPy.
+
+Usage::
+
+    python app/nnue.py net.nnue --write --hidden 128
+    python app/nnue.py net.nnue --depth 4
+
+The network has one input per (perspective, piece, square): 768 features
+seen from white and the same board mirrored for black. The first layer
+turns each perspective into an int16 accumulator of ``hidden`` values;
+the side to move's accumulator and the other one are clipped to
+``[0, QA]``, concatenated and reduced to the score by an int16 output
+layer.
+
+The accumulator is a sum of weight rows, so a move only adds and removes
+the rows of the few pieces it changes. ``NNUEEvaluator`` caches
+accumulators by Zobrist key and, for a new position, replays the moves
+since the nearest cached ancestor from the ``Undo`` records instead of
+summing the rows of every piece again. ``evaluate_batch`` is the dense
+fallback for many unrelated positions at once.
+
+A weight file is little-endian: a ``HEADER`` of ``MAGIC``, the feature
+count, the hidden size, the output scale and the output bias (int32),
+then int16 arrays of the feature weights (features x hidden), the
+feature biases (hidden) and the output weights (2 x hidden, side to move
+first). The arrays are memory-mapped, not copied.
+"""
+
+from __future__ import annotations
+
+import argparse
+import struct
+import time
+from typing import Sequence
+
+import numpy as np
+
+from evaluation import Evaluator
+from perft import STANDARD_POSITIONS
+from movegen import legal_moves
+from position import (
+    BLACK,
+    CASTLING_ROOKS,
+    KING,
+    PAWN,
+    ROOK,
+    WHITE,
+    Position,
+    iter_bits,
+)
+from search import Searcher, SearchLimits
+
+MAGIC = b"TCNNUE01"
+HEADER = struct.Struct("<8sIIii")
+FEATURES = 768
+# Clipping bound of the accumulator and fixed-point scale of output weights.
+QA = 255
+QB = 64
+DEFAULT_SCALE = 400
+CACHE_ENTRIES = 1 << 14
+# Plies walked back looking for a cached accumulator before refreshing.
+MAX_REPLAY = 8
+
+
+def feature(perspective: int, color: int, piece_type: int, sq: int) -> int:
+    """Returns the input index of a piece seen from one side."""
+    if perspective == BLACK:
+        sq ^= 56
+    return (color != perspective) * 384 + piece_type * 64 + sq
+
+
+def position_features(position: Position) -> tuple[list[int], list[int]]:
+    """Returns the active features of both perspectives."""
+    white, black = [], []
+    for color in (WHITE, BLACK):
+        for piece_type, bitboard in enumerate(position.pieces[color]):
+            for sq in iter_bits(bitboard):
+                white.append(feature(WHITE, color, piece_type, sq))
+                black.append(feature(BLACK, color, piece_type, sq))
+    return white, black
+
+
+def move_changes(undo, us: int) -> tuple[list, list]:
+    """Returns the (color, piece type, square) pieces a move added and
+    removed, from its ``Undo`` record.
+    """
+    move, captured, _, ep_square, _, _, piece_type = undo
+    from_sq, to_sq, promotion = move & 63, move >> 6 & 63, move >> 12
+    added = [(us, promotion or piece_type, to_sq)]
+    removed = [(us, piece_type, from_sq)]
+    if captured:
+        removed.append((*captured, to_sq))
+    elif piece_type == PAWN and to_sq == ep_square:
+        removed.append((us ^ 1, PAWN, to_sq - 8 if us == WHITE else to_sq + 8))
+    elif piece_type == KING and abs(to_sq - from_sq) == 2:
+        rook_from, rook_to = CASTLING_ROOKS[to_sq]
+        added.append((us, ROOK, rook_to))
+        removed.append((us, ROOK, rook_from))
+    return added, removed
+
+
+class Network:
+    """Quantized weights memory-mapped from a weight file."""
+
+    def __init__(self, path: str):
+        self.path = path
+        with open(path, "rb") as weights:
+            magic, features, hidden, scale, bias = HEADER.unpack(
+                weights.read(HEADER.size)
+            )
+        if magic != MAGIC or features != FEATURES:
+            raise ValueError(f"Not a network file: {path}")
+        self.hidden = hidden
+        self.scale = scale
+        self.output_bias = bias
+        offset = HEADER.size
+        arrays = []
+        for shape in ((features, hidden), (hidden,), (2 * hidden,)):
+            arrays.append(np.memmap(path, "<i2", "r", offset, shape))
+            offset += 2 * int(np.prod(shape))
+        self.feature_weights = arrays[0]
+        self.feature_bias = arrays[1]
+        self.output_weights = arrays[2]
+        # Widened once: QA * 2**15 * 2 * hidden overflows int32 for wide nets.
+        self._output_weights = self.output_weights.astype(np.int64)
+
+    def refresh(self, position: Position) -> np.ndarray:
+        """Returns the (2, hidden) accumulators summed from every piece."""
+        white, black = position_features(position)
+        return (
+            self.feature_weights[[white, black]].sum(axis=1, dtype=np.int16)
+            + self.feature_bias
+        )
+
+    def output(self, accumulator: np.ndarray, turn: int) -> int:
+        """Returns the score of accumulators for the side to move."""
+        clipped = np.clip(accumulator[[turn, turn ^ 1]], 0, QA).reshape(-1)
+        total = int(clipped.astype(np.int64) @ self._output_weights)
+        return (total + self.output_bias) * self.scale // (QA * QB)
+
+
+def write_network(
+    path: str,
+    feature_weights: np.ndarray,
+    feature_bias: np.ndarray,
+    output_weights: np.ndarray,
+    output_bias: int = 0,
+    scale: int = DEFAULT_SCALE,
+) -> None:
+    """Writes quantized weights in the weight file format."""
+    with open(path, "wb") as weights:
+        weights.write(
+            HEADER.pack(MAGIC, FEATURES, len(feature_bias), scale, output_bias)
+        )
+        for array in (feature_weights, feature_bias, output_weights):
+            weights.write(np.ascontiguousarray(array, dtype="<i2").tobytes())
+
+
+def random_network(path: str, hidden: int = 128, seed: int = 0) -> None:
+    """Writes a network with small random weights, e.g. to benchmark."""
+    rng = np.random.default_rng(seed)
+    write_network(
+        path,
+        rng.integers(-8, 9, (FEATURES, hidden)),
+        rng.integers(0, 64, hidden),
+        rng.integers(-QB, QB + 1, 2 * hidden),
+    )
+
+
+class NNUEEvaluator:
+    """Network evaluation for the side to move with incremental updates.
+
+    Instances are callables suitable as ``Searcher(evaluator=...)``.
+    """
+
+    def __init__(self, network: Network | str, entries: int = CACHE_ENTRIES):
+        """Initializes an empty accumulator cache.
+
+        Args:
+            network: A ``Network`` or the path of a weight file.
+            entries: Accumulators cached, rounded down to a power of two.
+        """
+        self.network = network if isinstance(network, Network) else Network(network)
+        self.size = 1 << (max(1, entries).bit_length() - 1)
+        self.mask = self.size - 1
+        self.keys: list[int] = [-1] * self.size
+        self.accumulators = np.zeros((self.size, 2, self.network.hidden), np.int16)
+        self.refreshes = 0
+        self.updates = 0
+
+    def accumulator(self, position: Position) -> np.ndarray:
+        """Returns the accumulators of a position, from the cache if possible."""
+        index = position.key & self.mask
+        if self.keys[index] == position.key:
+            return self.accumulators[index]
+
+        history = position.history
+        added, removed = [], []
+        us = position.turn
+        base = None
+        for ply in range(1, min(MAX_REPLAY, len(history)) + 1):
+            us ^= 1
+            undo = history[-ply]
+            move_added, move_removed = move_changes(undo, us)
+            added += move_added
+            removed += move_removed
+            parent = undo.key & self.mask
+            if self.keys[parent] == undo.key:
+                base = self.accumulators[parent]
+                break
+
+        if base is None:
+            self.refreshes += 1
+            accumulator = self.network.refresh(position)
+            if history:
+                # Undoing the last move gives the parent, so the siblings
+                # searched next are updated instead of refreshed.
+                undo = history[-1]
+                move_added, move_removed = move_changes(undo, position.turn ^ 1)
+                parent = undo.key & self.mask
+                self.keys[parent] = undo.key
+                self.accumulators[parent] = (
+                    accumulator - self.rows(move_added) + self.rows(move_removed)
+                )
+        else:
+            self.updates += 1
+            # Changes of later moves may cancel earlier ones; the sum is
+            # the same either way.
+            accumulator = base + self.rows(added) - self.rows(removed)
+        self.keys[index] = position.key
+        self.accumulators[index] = accumulator
+        return accumulator
+
+    def rows(self, pieces: list[tuple[int, int, int]]) -> np.ndarray:
+        """Returns the summed weight rows of pieces for both perspectives."""
+        indices = [
+            [feature(WHITE, *piece) for piece in pieces],
+            [feature(BLACK, *piece) for piece in pieces],
+        ]
+        return self.network.feature_weights[indices].sum(axis=1, dtype=np.int16)
+
+    def __call__(self, position: Position) -> int:
+        """Returns the score from the side to move's point of view."""
+        return self.network.output(self.accumulator(position), position.turn)
+
+    def clear(self) -> None:
+        """Empties the accumulator cache."""
+        self.keys = [-1] * self.size
+
+
+def evaluate_batch(network: Network, positions: Sequence[Position]) -> np.ndarray:
+    """Returns the scores of many positions with dense matrix products.
+
+    The scores equal those of ``NNUEEvaluator``, int16 accumulator
+    wraparound included.
+    """
+    # Float64 products use BLAS and are exact: every sum stays far below
+    # 2**53. The accumulators are then wrapped to int16 like refresh does.
+    inputs = np.zeros((len(positions), 2, FEATURES), dtype=np.float64)
+    for index, position in enumerate(positions):
+        white, black = position_features(position)
+        inputs[index, 0, white] = 1
+        inputs[index, 1, black] = 1
+    sums = inputs @ network.feature_weights.astype(np.float64)
+    accumulators = sums.astype(np.int64).astype(np.int16) + network.feature_bias
+    turns = np.array([position.turn for position in positions])
+    rows = np.arange(len(positions))
+    clipped = np.clip(
+        np.concatenate(
+            (accumulators[rows, turns], accumulators[rows, turns ^ 1]), axis=1
+        ),
+        0,
+        QA,
+    )
+    totals = (clipped @ network.output_weights.astype(np.float64)).astype(np.int64)
+    return (totals + network.output_bias) * network.scale // (QA * QB)
+
+
+def benchmark(network: Network, depth: int) -> None:
+    """Prints search speed with the classical and the network evaluators,
+    then the cost of one network evaluation by each path.
+    """
+    positions = [Position.from_fen(fen) for fen, _ in STANDARD_POSITIONS.values()]
+    nnue = NNUEEvaluator(network)
+    for name, evaluator in (("classical", Evaluator()), ("nnue", nnue)):
+        nodes = 0
+        start = time.perf_counter()
+        for position in positions:
+            searcher = Searcher(evaluator=evaluator)
+            nodes += searcher.search(position, SearchLimits(depth=depth)).nodes
+        seconds = time.perf_counter() - start
+        print(
+            f"{name:12s} {nodes:8d} nodes  {seconds:6.2f}s  {nodes / seconds:8.0f} nps"
+        )
+    print(f"nnue cache   {nnue.updates} incremental, {nnue.refreshes} refreshes")
+
+    children = []
+    for position in positions:
+        for move in legal_moves(position):
+            child = position.copy()
+            child.make_move(move)
+            children.append(child)
+    timings = {
+        "refresh": lambda: [
+            network.output(network.refresh(child), child.turn) for child in children
+        ],
+        "incremental": lambda: [nnue(child) for child in children],
+        "batch": lambda: evaluate_batch(network, children),
+    }
+    for name, function in timings.items():
+        nnue.clear()
+        for position in positions:
+            nnue(position)
+        start = time.perf_counter()
+        function()
+        per_call = (time.perf_counter() - start) / len(children)
+        print(f"{name:12s} {per_call * 1e6:8.1f}us per position")
+
+
+def main(argv: list[str] | None = None) -> None:
+    parser = argparse.ArgumentParser(description="NNUE weights and benchmark.")
+    parser.add_argument("network", help="weight file")
+    parser.add_argument(
+        "--write", action="store_true", help="write random weights to the file first"
+    )
+    parser.add_argument("--hidden", type=int, default=128)
+    parser.add_argument("--depth", type=int, default=4)
+    args = parser.parse_args(argv)
+
+    if args.write:
+        random_network(args.network, args.hidden)
+    benchmark(Network(args.network), args.depth)
+
+
+if __name__ == "__main__":
+    main()
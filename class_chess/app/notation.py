@@ -0,0 +1,101 @@
+"""Standard algebraic notation (SAN) for moves of ``movegen``."""
+
+from __future__ import annotations
+
+import re
+
+from movegen import PROMOTION_SYMBOLS, legal_moves, is_check
+from position import KING, PAWN, PIECE_SYMBOLS, Position, square_name
+
+SAN_PATTERN = re.compile(
+    r"^([NBRQK])?([a-h])?([1-8])?x?([a-h][1-8])(?:=?([nbrqNBRQ]))?[+#]?[!?]*$"
+)
+CASTLING_PATTERN = re.compile(r"^([O0])-\1(-\1)?[+#]?[!?]*$")
+
+
+def san(position: Position, move: int, moves: list[int] | None = None) -> str:
+    """Returns the SAN of a legal move, including any check suffix.
+
+    Pass the legal moves of the position if already generated.
+    """
+    if moves is None:
+        moves = legal_moves(position)
+    from_sq, to_sq, promotion = move & 63, move >> 6 & 63, move >> 12
+    _, piece_type = position.mailbox[from_sq]
+
+    if piece_type == KING and abs(to_sq - from_sq) == 2:
+        text = "O-O" if to_sq > from_sq else "O-O-O"
+    else:
+        capture = position.mailbox[to_sq] is not None or (
+            piece_type == PAWN and (from_sq ^ to_sq) & 7
+        )
+        if piece_type == PAWN:
+            text = square_name(from_sq)[0] + "x" if capture else ""
+        else:
+            text = PIECE_SYMBOLS[piece_type].upper()
+            rivals = [
+                other & 63
+                for other in moves
+                if other >> 6 & 63 == to_sq
+                and other & 63 != from_sq
+                and position.mailbox[other & 63][1] == piece_type
+            ]
+            if rivals:
+                if all((rival ^ from_sq) & 7 for rival in rivals):
+                    text += square_name(from_sq)[0]
+                elif all((rival ^ from_sq) >> 3 for rival in rivals):
+                    text += square_name(from_sq)[1]
+                else:
+                    text += square_name(from_sq)
+            if capture:
+                text += "x"
+        text += square_name(to_sq)
+        if promotion:
+            text += "=" + PROMOTION_SYMBOLS[promotion].upper()
+
+    position.make_move(move)
+    try:
+        if is_check(position):
+            text += "+" if legal_moves(position) else "#"
+    finally:
+        position.unmake_move()
+    return text
+
+
+def parse_san(position: Position, text: str, moves: list[int] | None = None) -> int:
+    """Returns the legal move a SAN string denotes in the position."""
+    if moves is None:
+        moves = legal_moves(position)
+    castling = CASTLING_PATTERN.match(text)
+    if castling:
+        king = position.king_square(position.turn)
+        to_sq = king - 2 if castling.group(2) else king + 2
+        for move in moves:
+            if move & 63 == king and move >> 6 & 63 == to_sq:
+                return move
+        raise ValueError(f"Illegal castling in this position: {text}")
+
+    match = SAN_PATTERN.match(text)
+    if not match:
+        raise ValueError(f"Invalid SAN move: {text}")
+    piece, from_file, from_rank, to_name, promotion = match.groups()
+    piece_type = PIECE_SYMBOLS.index(piece.lower()) if piece else PAWN
+    to_sq = (ord(to_name[0]) - 97) | (ord(to_name[1]) - 49) << 3
+    promotion_type = PIECE_SYMBOLS.index(promotion.lower()) if promotion else 0
+
+    found = None
+    for move in moves:
+        from_sq = move & 63
+        if (
+            move >> 6 & 63 == to_sq
+            and move >> 12 == promotion_type
+            and position.mailbox[from_sq][1] == piece_type
+            and (from_file is None or from_sq & 7 == ord(from_file) - 97)
+            and (from_rank is None or from_sq >> 3 == ord(from_rank) - 49)
+        ):
+            if found is not None:
+                raise ValueError(f"Ambiguous SAN move: {text}")
+            found = move
+    if found is None:
+        raise ValueError(f"Illegal SAN move in this position: {text}")
+    return found
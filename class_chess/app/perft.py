@@ -0,0 +1,158 @@
+"""Perft node counting for move generation correctness and speed.
+
+Usage::
+
+    python app/perft.py --depth 4 --position kiwipete --divide
+"""
+
+from __future__ import annotations
+
+import argparse
+import sys
+import time
+from dataclasses import dataclass
+
+from movegen import legal_moves, move_uci
+from position import STARTING_FEN, Position
+
+# Reference node counts per depth, starting at depth 1.
+STANDARD_POSITIONS: dict[str, tuple[str, tuple[int, ...]]] = {
+    "start": (
+        STARTING_FEN,
+        (20, 400, 8902, 197281, 4865609, 119060324),
+    ),
+    "kiwipete": (
+        "r3k2r/p1ppqpb1/bn2pnp1/3PN3/1p2P3/2N2Q1p/PPPBBPPP/R3K2R w KQkq - 0 1",
+        (48, 2039, 97862, 4085603, 193690690),
+    ),
+    "position3": (
+        "8/2p5/3p4/KP5r/1R3p1k/8/4P1P1/8 w - - 0 1",
+        (14, 191, 2812, 43238, 674624, 11030083),
+    ),
+    "position4": (
+        "r3k2r/Pppp1ppp/1b3nbN/nP6/BBP1P3/q4N2/Pp1P2PP/R2Q1RK1 w kq - 0 1",
+        (6, 264, 9467, 422333, 15833292),
+    ),
+    "position5": (
+        "rnbq1k1r/pp1Pbppp/2p5/8/2B5/8/PPP1NnPP/RNBQK2R w KQ - 1 8",
+        (44, 1486, 62379, 2103487, 89941194),
+    ),
+    "position6": (
+        "r4rk1/1pp1qppp/p1np1n2/2b1p1B1/2B1P1b1/P1NP1N2/1PP1QPPP/R4RK1 w - - 0 10",
+        (46, 2079, 89890, 3894594, 164075551),
+    ),
+}
+
+
+@dataclass
+class PerftResult:
+    name: str
+    depth: int
+    nodes: int
+    expected: int | None
+    seconds: float
+
+    @property
+    def nps(self) -> float:
+        """Returns the nodes searched per second."""
+        return self.nodes / self.seconds if self.seconds else 0.0
+
+    @property
+    def passed(self) -> bool:
+        """Returns whether the count matches the reference, if there is one."""
+        return self.expected is None or self.nodes == self.expected
+
+    def __str__(self):
+        status = "ok" if self.passed else f"MISMATCH (expected {self.expected})"
+        return (
+            f"{self.name} depth {self.depth}: {self.nodes} nodes "
+            f"in {self.seconds:.3f}s ({self.nps:.0f} nps) {status}"
+        )
+
+
+def perft(position: Position, depth: int) -> int:
+    """Returns the number of leaf nodes of the legal move tree."""
+    moves = legal_moves(position)
+    if depth <= 1:
+        return len(moves) if depth == 1 else 1
+    nodes = 0
+    for move in moves:
+        position.make_move(move)
+        nodes += perft(position, depth - 1)
+        position.unmake_move()
+    return nodes
+
+
+def divide(position: Position, depth: int) -> dict[str, int]:
+    """Returns the perft count below each root move, keyed by UCI move."""
+    counts = {}
+    for move in legal_moves(position):
+        position.make_move(move)
+        counts[move_uci(move)] = perft(position, depth - 1)
+        position.unmake_move()
+    return counts
+
+
+def run(name: str, fen: str, depth: int, expected: int | None = None) -> PerftResult:
+    """Runs perft on a position and times it."""
+    position = Position.from_fen(fen)
+    start = time.perf_counter()
+    nodes = perft(position, depth)
+    return PerftResult(name, depth, nodes, expected, time.perf_counter() - start)
+
+
+def run_standard(name: str, depth: int) -> PerftResult:
+    """Runs perft on one of the standard positions."""
+    fen, counts = STANDARD_POSITIONS[name]
+    if not 1 <= depth <= len(counts):
+        raise ValueError(f"No reference count for {name} at depth {depth}")
+    return run(name, fen, depth, counts[depth - 1])
+
+
+def main(argv: list[str] | None = None) -> int:
+    parser = argparse.ArgumentParser(description="Count perft nodes.")
+    parser.add_argument("--depth", type=int, default=3)
+    parser.add_argument(
+        "--position",
+        choices=[*STANDARD_POSITIONS, "all"],
+        default="all",
+        help="standard position to run",
+    )
+    parser.add_argument("--fen", help="run a custom position instead")
+    parser.add_argument(
+        "--divide", action="store_true", help="print counts per root move"
+    )
+    args = parser.parse_args(argv)
+    if args.depth < 1:
+        parser.error("--depth must be at least 1")
+
+    if args.fen:
+        positions = [("fen", args.fen, None)]
+    else:
+        names = STANDARD_POSITIONS if args.position == "all" else [args.position]
+        positions = []
+        for name in names:
+            fen, counts = STANDARD_POSITIONS[name]
+            expected = counts[args.depth - 1] if args.depth <= len(counts) else None
+            positions.append((name, fen, expected))
+
+    failed = False
+    for name, fen, expected in positions:
+        if args.divide:
+            start = time.perf_counter()
+            counts = divide(Position.from_fen(fen), args.depth)
+            seconds = time.perf_counter() - start
+            for move, nodes in sorted(counts.items()):
+                print(f"{move}: {nodes}")
+            result = PerftResult(
+                name, args.depth, sum(counts.values()), expected, seconds
+            )
+        else:
+            result = run(name, fen, args.depth, expected)
+        print(result)
+        failed |= not result.passed
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,214 @@
+"""Streaming PGN reading and writing.
+
+``read_games`` walks a PGN file in large binary chunks and yields one
+``Game`` per record without ever holding more than a chunk and the game
+being assembled. Headers are decoded eagerly, but the movetext is kept as
+raw text and only turned into moves when ``Game.moves`` is first used, so
+filtering a database by its headers never touches the move generator.
+With ``headers_only`` the movetext is not even kept.
+"""
+
+from __future__ import annotations
+
+import re
+from dataclasses import dataclass, field
+from typing import BinaryIO, Iterator
+
+from movegen import legal_moves
+from notation import parse_san, san
+from position import STARTING_FEN, WHITE, Position
+
+CHUNK_SIZE = 1 << 20
+SEVEN_TAG_ROSTER = ("Event", "Site", "Date", "Round", "White", "Black", "Result")
+LINE_LENGTH = 80
+
+TAG_PATTERN = re.compile(r'^\[\s*(\w+)\s+"((?:[^"\\]|\\.)*)"\s*\]')
+# Comments, NAGs, move numbers and results; variations are dropped after.
+MOVETEXT_NOISE = re.compile(
+    r"\{[^}]*\}|;[^\n]*|\$\d+|\d+\.+|(?:1-0|0-1|1/2-1/2|\*)(?=\s|$)"
+)
+
+
+@dataclass
+class Game:
+    headers: dict[str, str] = field(default_factory=dict)
+    movetext: str | None = ""
+    _moves: list[int] | None = field(default=None, init=False, repr=False)
+
+    @classmethod
+    def from_moves(
+        cls,
+        moves: list[int],
+        headers: dict[str, str] | None = None,
+        position: Position | None = None,
+    ) -> Game:
+        """Returns a game of moves played from a position, the start by default."""
+        headers = dict(headers or {})
+        if position is not None and position.fen() != STARTING_FEN:
+            headers.setdefault("SetUp", "1")
+            headers.setdefault("FEN", position.fen())
+        game = cls(headers, None)
+        game._moves = list(moves)
+        return game
+
+    def starting_position(self) -> Position:
+        """Returns the position the game starts from."""
+        if "FEN" in self.headers:
+            return Position.from_fen(self.headers["FEN"])
+        return Position.starting()
+
+    @property
+    def moves(self) -> list[int]:
+        """Returns the mainline moves, parsing the movetext on first use."""
+        if self._moves is None:
+            if self.movetext is None:
+                raise ValueError("Game was read without its movetext")
+            position = self.starting_position()
+            moves = []
+            for token in san_tokens(self.movetext):
+                move = parse_san(position, token)
+                position.make_move(move)
+                moves.append(move)
+            self._moves = moves
+        return self._moves
+
+    def positions(self) -> Iterator[Position]:
+        """Yields the position before every move and the final one.
+
+        The same Position object is updated in place; copy it to keep one.
+        """
+        position = self.starting_position()
+        yield position
+        for move in self.moves:
+            position.make_move(move)
+            yield position
+
+    def end_position(self) -> Position:
+        """Returns the position after the last move."""
+        position = self.starting_position()
+        for move in self.moves:
+            position.make_move(move)
+        return position
+
+    def pgn(self) -> str:
+        """Returns the game in PGN export format."""
+        headers = {tag: self.headers.get(tag, "?") for tag in SEVEN_TAG_ROSTER}
+        headers["Date"] = self.headers.get("Date", "????.??.??")
+        headers["Result"] = self.headers.get("Result", "*")
+        headers.update(self.headers)
+        lines = []
+        for tag, value in headers.items():
+            value = value.replace("\\", "\\\\").replace('"', '\\"')
+            lines.append(f'[{tag} "{value}"]')
+        lines.append("")
+
+        position = self.starting_position()
+        tokens = []
+        for move in self.moves:
+            if position.turn == WHITE:
+                tokens.append(f"{position.fullmove_number}.")
+            elif not tokens:
+                tokens.append(f"{position.fullmove_number}...")
+            tokens.append(san(position, move, legal_moves(position)))
+            position.make_move(move)
+        tokens.append(headers["Result"])
+
+        line = ""
+        for token in tokens:
+            if line and len(line) + 1 + len(token) > LINE_LENGTH:
+                lines.append(line)
+                line = token
+            else:
+                line = f"{line} {token}" if line else token
+        lines.append(line)
+        return "\n".join(lines) + "\n"
+
+
+def san_tokens(movetext: str) -> list[str]:
+    """Returns the mainline SAN moves of a movetext, skipping variations."""
+    text = MOVETEXT_NOISE.sub(" ", movetext)
+    if "(" in text:
+        depth = 0
+        mainline = []
+        for char in text:
+            if char == "(":
+                depth += 1
+            elif char == ")":
+                depth -= 1
+            elif not depth:
+                mainline.append(char)
+        text = "".join(mainline)
+    return text.split()
+
+
+def _decode(line: bytes) -> str:
+    """Decodes a line as UTF-8, falling back to Latin-1 like most databases."""
+    try:
+        return line.decode("utf-8")
+    except UnicodeDecodeError:
+        return line.decode("latin-1")
+
+
+def _lines(stream: BinaryIO, chunk_size: int) -> Iterator[bytes]:
+    """Yields the stripped lines of a binary stream read in chunks."""
+    tail = b""
+    while True:
+        chunk = stream.read(chunk_size)
+        if not chunk:
+            break
+        lines = (tail + chunk).split(b"\n")
+        tail = lines.pop()
+        for line in lines:
+            yield line.strip()
+    if tail.strip():
+        yield tail.strip()
+
+
+def iter_games(
+    stream: BinaryIO, headers_only: bool = False, chunk_size: int = CHUNK_SIZE
+) -> Iterator[Game]:
+    """Yields the games of a binary PGN stream.
+
+    A game ends where a tag line follows movetext, so records need not be
+    separated by blank lines.
+    """
+    headers: dict[str, str] = {}
+    movetext: list[bytes] = []
+    in_movetext = False
+    for line in _lines(stream, chunk_size):
+        if not line or line.startswith(b"%"):
+            continue
+        if line.startswith(b"["):
+            match = TAG_PATTERN.match(_decode(line))
+            if match:
+                if in_movetext:
+                    yield _game(headers, movetext, headers_only)
+                    headers, movetext, in_movetext = {}, [], False
+                headers[match.group(1)] = re.sub(r"\\(.)", r"\1", match.group(2))
+                continue
+        in_movetext = True
+        if not headers_only:
+            movetext.append(line)
+    if headers or in_movetext:
+        yield _game(headers, movetext, headers_only)
+
+
+def _game(headers: dict[str, str], movetext: list[bytes], headers_only: bool) -> Game:
+    """Returns a game read from its headers and raw movetext lines."""
+    return Game(headers, None if headers_only else _decode(b"\n".join(movetext)))
+
+
+def read_games(
+    filename: str, headers_only: bool = False, chunk_size: int = CHUNK_SIZE
+) -> Iterator[Game]:
+    """Yields the games of a PGN file."""
+    with open(filename, "rb", buffering=0) as stream:
+        yield from iter_games(stream, headers_only, chunk_size)
+
+
+def write_games(filename: str, games) -> None:
+    """Writes games to a PGN file, separated by blank lines."""
+    with open(filename, "w", encoding="utf-8") as output:
+        for game in games:
+            output.write(game.pgn())
+            output.write("\n")
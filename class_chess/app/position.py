@@ -0,0 +1,478 @@
+"""Headless chess position backed by 64-bit bitboards.
+
+Squares are numbered 0 (a1) to 63 (h8), rank by rank. The UI grid uses
+``grid[x][y]`` with ``y == 0`` at the top of the board (rank 8), so
+``square_at(x, y)`` converts between the two.
+"""
+
+from __future__ import annotations
+
+from typing import Iterator, NamedTuple
+
+from psqt import PAWN_KEYS, PSQT, compute_pawn_key, compute_psqt
+from zobrist import (
+    BLACK_TO_MOVE_KEY,
+    CASTLING_KEYS,
+    EP_KEYS,
+    PIECE_KEYS,
+    compute_key,
+)
+
+WHITE, BLACK = 0, 1
+COLOR_NAMES = ("white", "black")
+
+PAWN, KNIGHT, BISHOP, ROOK, QUEEN, KING = range(6)
+PIECE_NAMES = ("pawn", "knight", "bishop", "rook", "queen", "king")
+PIECE_SYMBOLS = "pnbrqk"
+
+WHITE_KINGSIDE, WHITE_QUEENSIDE, BLACK_KINGSIDE, BLACK_QUEENSIDE = 1, 2, 4, 8
+CASTLING_SYMBOLS = {
+    "K": WHITE_KINGSIDE,
+    "Q": WHITE_QUEENSIDE,
+    "k": BLACK_KINGSIDE,
+    "q": BLACK_QUEENSIDE,
+}
+
+STARTING_FEN = "rnbqkbnr/pppppppp/8/8/8/8/PPPPPPPP/RNBQKBNR w KQkq - 0 1"
+
+FULL_BOARD = (1 << 64) - 1
+BLACK_SQUARES = 0xAA55AA55AA55AA55
+
+# Castling rights kept when a move touches a square, indexed by square.
+CASTLING_MASKS = [15] * 64
+CASTLING_MASKS[0] &= ~WHITE_QUEENSIDE
+CASTLING_MASKS[7] &= ~WHITE_KINGSIDE
+CASTLING_MASKS[4] &= ~(WHITE_KINGSIDE | WHITE_QUEENSIDE)
+CASTLING_MASKS[56] &= ~BLACK_QUEENSIDE
+CASTLING_MASKS[63] &= ~BLACK_KINGSIDE
+CASTLING_MASKS[60] &= ~(BLACK_KINGSIDE | BLACK_QUEENSIDE)
+
+# Rook origin and destination of a castling king move, keyed by king target.
+CASTLING_ROOKS = {6: (7, 5), 2: (0, 3), 62: (63, 61), 58: (56, 59)}
+
+# Interned (color, piece type) pairs so the mailbox never allocates.
+PIECES = tuple(
+    tuple((color, piece_type) for piece_type in range(6)) for color in range(2)
+)
+
+
+def square(file: int, rank: int) -> int:
+    """Returns the square index of a file and rank."""
+    return rank * 8 + file
+
+
+def square_file(sq: int) -> int:
+    """Returns the file (0-7) of a square."""
+    return sq & 7
+
+
+def square_rank(sq: int) -> int:
+    """Returns the rank (0-7) of a square."""
+    return sq >> 3
+
+
+def square_at(x: int, y: int) -> int:
+    """Returns the square index of a UI grid coordinate."""
+    return (7 - y) * 8 + x
+
+
+def square_name(sq: int) -> str:
+    """Returns the algebraic name of a square, e.g. ``e4``."""
+    return f"{chr(97 + (sq & 7))}{(sq >> 3) + 1}"
+
+
+def parse_square(name: str) -> int:
+    """Returns the square index of an algebraic square name."""
+    if len(name) != 2 or name[0] not in "abcdefgh" or name[1] not in "12345678":
+        raise ValueError(f"Invalid square name: {name}")
+    return square(ord(name[0]) - 97, int(name[1]) - 1)
+
+
+def iter_bits(bitboard: int) -> Iterator[int]:
+    """Yields the square index of every set bit, lowest first."""
+    while bitboard:
+        lowest = bitboard & -bitboard
+        yield lowest.bit_length() - 1
+        bitboard ^= lowest
+
+
+def popcount(bitboard: int) -> int:
+    """Returns the number of set bits of a bitboard."""
+    return bitboard.bit_count()
+
+
+def _split_operations(text: str) -> list[str]:
+    """Splits EPD operations on semicolons outside quoted strings."""
+    operations = []
+    current = ""
+    quoted = False
+    for char in text:
+        if char == '"':
+            quoted = not quoted
+        if char == ";" and not quoted:
+            operations.append(current)
+            current = ""
+        else:
+            current += char
+    if current.strip():
+        operations.append(current)
+    return operations
+
+
+class Undo(NamedTuple):
+    """State needed to take back a move, pushed by ``make_move``."""
+
+    move: int
+    captured: tuple[int, int] | None
+    castling: int
+    ep_square: int | None
+    halfmove_clock: int
+    key: int
+    # Type of the moved piece, so evaluators can replay a move's changes.
+    piece: int
+
+
+class Position:
+    """Represents a chess position without any rendering state.
+
+    ``pieces[color][piece_type]`` holds one bitboard per piece kind and
+    ``occupied[color]`` the union per side. ``mailbox`` mirrors the
+    bitboards per square for constant time piece lookups. ``key`` is the
+    Zobrist hash, kept up to date by every piece and state change, and
+    ``psqt`` and ``pawn_key`` the packed material and piece-square score
+    and the pawn-only hash the evaluation reads (see ``psqt``).
+
+    ``make_move`` and ``unmake_move`` change the position in place and
+    keep a stack of ``Undo`` records, so no copies are made while walking
+    a move tree. The en passant square is only recorded when an enemy
+    pawn could capture on it, so transpositions hash identically.
+    """
+
+    __slots__ = (
+        "pieces",
+        "occupied",
+        "mailbox",
+        "turn",
+        "castling",
+        "ep_square",
+        "halfmove_clock",
+        "fullmove_number",
+        "key",
+        "psqt",
+        "pawn_key",
+        "history",
+    )
+
+    def __init__(self) -> None:
+        """Initializes an empty position with white to move."""
+        self.pieces: list[list[int]] = [[0] * 6, [0] * 6]
+        self.occupied: list[int] = [0, 0]
+        self.mailbox: list[tuple[int, int] | None] = [None] * 64
+        self.turn = WHITE
+        self.castling = 0
+        self.ep_square: int | None = None
+        self.halfmove_clock = 0
+        self.fullmove_number = 1
+        self.key = compute_key(self)
+        self.psqt = 0
+        self.pawn_key = 0
+        self.history: list[Undo] = []
+
+    @classmethod
+    def starting(cls) -> Position:
+        """Returns the standard starting position."""
+        return cls.from_fen(STARTING_FEN)
+
+    @classmethod
+    def from_fen(cls, fen: str) -> Position:
+        """Returns the position described by a FEN string."""
+        fields = fen.split()
+        if len(fields) < 4:
+            raise ValueError(f"Invalid FEN: {fen}")
+        placement, turn, castling, ep_square = fields[:4]
+
+        position = cls()
+        ranks = placement.split("/")
+        if len(ranks) != 8:
+            raise ValueError(f"Invalid FEN placement: {placement}")
+        for rank_index, row in enumerate(ranks):
+            rank = 7 - rank_index
+            file = 0
+            for char in row:
+                if char.isdigit():
+                    file += int(char)
+                    continue
+                piece_type = PIECE_SYMBOLS.find(char.lower())
+                if piece_type < 0 or file > 7:
+                    raise ValueError(f"Invalid FEN placement: {placement}")
+                color = WHITE if char.isupper() else BLACK
+                position.set_piece(square(file, rank), color, piece_type)
+                file += 1
+            if file != 8:
+                raise ValueError(f"Invalid FEN placement: {placement}")
+
+        if turn not in ("w", "b"):
+            raise ValueError(f"Invalid FEN side to move: {turn}")
+        position.turn = WHITE if turn == "w" else BLACK
+
+        if castling != "-":
+            for char in castling:
+                if char not in CASTLING_SYMBOLS:
+                    raise ValueError(f"Invalid FEN castling rights: {castling}")
+                position.castling |= CASTLING_SYMBOLS[char]
+
+        if ep_square != "-":
+            sq = parse_square(ep_square)
+            pawn_sq = sq - 8 if position.turn == WHITE else sq + 8
+            position._set_ep_square(sq, pawn_sq, position.turn)
+
+        if len(fields) > 4:
+            position.halfmove_clock = int(fields[4])
+        if len(fields) > 5:
+            position.fullmove_number = int(fields[5])
+        position.key = compute_key(position)
+        position.psqt = compute_psqt(position)
+        position.pawn_key = compute_pawn_key(position)
+        return position
+
+    @classmethod
+    def from_epd(cls, epd: str) -> tuple[Position, dict[str, str]]:
+        """Returns the position and the operations of an EPD line.
+
+        Operations map an opcode to its operand text, with one pair of
+        surrounding quotes removed, e.g. ``{"bm": "Nf3", "id": "test 1"}``.
+        """
+        fields = epd.split(maxsplit=4)
+        position = cls.from_fen(" ".join(fields[:4]))
+        operations = {}
+        if len(fields) > 4:
+            for operation in _split_operations(fields[4]):
+                opcode, _, operand = operation.strip().partition(" ")
+                if opcode:
+                    operand = operand.strip()
+                    if len(operand) > 1 and operand[0] == operand[-1] == '"':
+                        operand = operand[1:-1]
+                    operations[opcode] = operand
+        if "hmvc" in operations:
+            position.halfmove_clock = int(operations["hmvc"])
+        if "fmvn" in operations:
+            position.fullmove_number = int(operations["fmvn"])
+        return position, operations
+
+    def fen(self) -> str:
+        """Returns the FEN string of the position."""
+        return f"{self.epd()} {self.halfmove_clock} {self.fullmove_number}"
+
+    def epd(self, operations: dict[str, str] | None = None) -> str:
+        """Returns the EPD string of the position with optional operations."""
+        rows = []
+        for rank in range(7, -1, -1):
+            row = ""
+            empty = 0
+            for file in range(8):
+                piece = self.mailbox[square(file, rank)]
+                if piece is None:
+                    empty += 1
+                    continue
+                if empty:
+                    row += str(empty)
+                    empty = 0
+                symbol = PIECE_SYMBOLS[piece[1]]
+                row += symbol.upper() if piece[0] == WHITE else symbol
+            rows.append(row + str(empty) if empty else row)
+        castling = "".join(
+            symbol
+            for symbol, right in CASTLING_SYMBOLS.items()
+            if self.castling & right
+        )
+        epd = " ".join(
+            (
+                "/".join(rows),
+                "w" if self.turn == WHITE else "b",
+                castling or "-",
+                "-" if self.ep_square is None else square_name(self.ep_square),
+            )
+        )
+        for opcode, operand in (operations or {}).items():
+            if " " in operand or ";" in operand:
+                operand = f'"{operand}"'
+            epd += f" {opcode} {operand};" if operand else f" {opcode};"
+        return epd
+
+    @property
+    def occupancy(self) -> int:
+        """Returns the bitboard of all occupied squares."""
+        return self.occupied[WHITE] | self.occupied[BLACK]
+
+    def piece_at(self, sq: int) -> tuple[int, int] | None:
+        """Returns the (color, piece type) on a square, if any."""
+        return self.mailbox[sq]
+
+    def king_square(self, color: int) -> int:
+        """Returns the square of a side's king."""
+        return self.pieces[color][KING].bit_length() - 1
+
+    def set_piece(self, sq: int, color: int, piece_type: int) -> None:
+        """Places a piece on an empty square."""
+        mask = 1 << sq
+        self.pieces[color][piece_type] |= mask
+        self.occupied[color] |= mask
+        self.mailbox[sq] = PIECES[color][piece_type]
+        self.key ^= PIECE_KEYS[color][piece_type][sq]
+        self.psqt += PSQT[color][piece_type][sq]
+        self.pawn_key ^= PAWN_KEYS[color][piece_type][sq]
+
+    def remove_piece(self, sq: int) -> tuple[int, int] | None:
+        """Removes and returns the piece on a square, if any."""
+        piece = self.mailbox[sq]
+        if piece:
+            color, piece_type = piece
+            mask = ~(1 << sq)
+            self.pieces[color][piece_type] &= mask
+            self.occupied[color] &= mask
+            self.mailbox[sq] = None
+            self.key ^= PIECE_KEYS[color][piece_type][sq]
+            self.psqt -= PSQT[color][piece_type][sq]
+            self.pawn_key ^= PAWN_KEYS[color][piece_type][sq]
+        return piece
+
+    def make_move(self, move: int) -> None:
+        """Plays a legal move (see ``movegen``) in place."""
+        from_sq, to_sq, promotion = move & 63, move >> 6 & 63, move >> 12
+        us = self.turn
+        them = us ^ 1
+        _, piece_type = self.mailbox[from_sq]
+
+        key = self.key
+        captured = self.remove_piece(to_sq)
+        self.history.append(
+            Undo(
+                move,
+                captured,
+                self.castling,
+                self.ep_square,
+                self.halfmove_clock,
+                key,
+                piece_type,
+            )
+        )
+        self.remove_piece(from_sq)
+        self.halfmove_clock += 1
+        if captured or piece_type == PAWN:
+            self.halfmove_clock = 0
+
+        ep_square = self.ep_square
+        if ep_square is not None:
+            self.key ^= EP_KEYS[ep_square & 7]
+            self.ep_square = None
+        if piece_type == PAWN:
+            if to_sq == ep_square:
+                self.remove_piece(to_sq - 8 if us == WHITE else to_sq + 8)
+            elif abs(to_sq - from_sq) == 16:
+                self._set_ep_square((from_sq + to_sq) // 2, to_sq, them)
+            if promotion:
+                piece_type = promotion
+        elif piece_type == KING and abs(to_sq - from_sq) == 2:
+            rook_from, rook_to = CASTLING_ROOKS[to_sq]
+            self.remove_piece(rook_from)
+            self.set_piece(rook_to, us, ROOK)
+        self.set_piece(to_sq, us, piece_type)
+
+        castling = self.castling & CASTLING_MASKS[from_sq] & CASTLING_MASKS[to_sq]
+        if castling != self.castling:
+            self.key ^= CASTLING_KEYS[self.castling] ^ CASTLING_KEYS[castling]
+            self.castling = castling
+        if us == BLACK:
+            self.fullmove_number += 1
+        self.turn = them
+        self.key ^= BLACK_TO_MOVE_KEY
+
+    def unmake_move(self) -> int:
+        """Takes back the last move made and returns it."""
+        move, captured, castling, ep_square, halfmove_clock, key, _ = self.history.pop()
+        from_sq, to_sq, promotion = move & 63, move >> 6 & 63, move >> 12
+        them = self.turn
+        us = them ^ 1
+
+        _, piece_type = self.remove_piece(to_sq)
+        if promotion:
+            piece_type = PAWN
+        self.set_piece(from_sq, us, piece_type)
+        if captured:
+            self.set_piece(to_sq, *captured)
+        elif piece_type == PAWN and to_sq == ep_square:
+            self.set_piece(to_sq - 8 if us == WHITE else to_sq + 8, them, PAWN)
+        elif piece_type == KING and abs(to_sq - from_sq) == 2:
+            rook_from, rook_to = CASTLING_ROOKS[to_sq]
+            self.remove_piece(rook_to)
+            self.set_piece(rook_from, us, ROOK)
+
+        self.turn = us
+        self.castling = castling
+        self.ep_square = ep_square
+        self.halfmove_clock = halfmove_clock
+        if us == BLACK:
+            self.fullmove_number -= 1
+        self.key = key
+        return move
+
+    def repetitions(self) -> int:
+        """Returns how often the current position occurred before.
+
+        Only positions since the last capture or pawn move can repeat, so
+        the scan stops at the halfmove clock.
+        """
+        count = 0
+        history = self.history
+        limit = min(self.halfmove_clock, len(history))
+        for ply in range(2, limit + 1, 2):
+            if history[-ply].key == self.key:
+                count += 1
+        return count
+
+    def is_repetition(self, count: int = 3) -> bool:
+        """Returns whether the position occurred at least count times."""
+        return self.repetitions() + 1 >= count
+
+    def _set_ep_square(self, ep_square: int, pawn_sq: int, them: int) -> None:
+        """Records an en passant square only if an enemy pawn can capture."""
+        file = pawn_sq & 7
+        neighbours = 0
+        if file > 0:
+            neighbours |= 1 << (pawn_sq - 1)
+        if file < 7:
+            neighbours |= 1 << (pawn_sq + 1)
+        if self.pieces[them][PAWN] & neighbours:
+            self.ep_square = ep_square
+            self.key ^= EP_KEYS[ep_square & 7]
+
+    def copy(self) -> Position:
+        """Returns an independent copy of the position."""
+        position = Position.__new__(Position)
+        position.pieces = [self.pieces[WHITE][:], self.pieces[BLACK][:]]
+        position.occupied = self.occupied[:]
+        position.mailbox = self.mailbox[:]
+        position.turn = self.turn
+        position.castling = self.castling
+        position.ep_square = self.ep_square
+        position.halfmove_clock = self.halfmove_clock
+        position.fullmove_number = self.fullmove_number
+        position.key = self.key
+        position.psqt = self.psqt
+        position.pawn_key = self.pawn_key
+        position.history = self.history[:]
+        return position
+
+    def __str__(self) -> str:
+        rows = []
+        for rank in range(7, -1, -1):
+            row = []
+            for file in range(8):
+                piece = self.mailbox[square(file, rank)]
+                if piece is None:
+                    row.append(".")
+                else:
+                    symbol = PIECE_SYMBOLS[piece[1]]
+                    row.append(symbol.upper() if piece[0] == WHITE else symbol)
+            rows.append(" ".join(row))
+        return "\n".join(rows)
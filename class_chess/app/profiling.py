@@ -0,0 +1,146 @@
+"""Runs any entry point under a profiler and with metrics exported.
+
+Usage::
+
+    python app/profiling.py --cprofile uci.prof app/uci.py
+    python app/profiling.py --sample server.folded app/server.py --port 9000
+    python app/profiling.py --metrics stats.prom --http 9100 app/chess_game.py
+
+``--cprofile`` writes ``pstats`` data for ``python -m pstats`` or
+snakeviz; it traces the main thread only. ``--sample`` uses a sampling
+profiler instead, whose cost does not grow with the number of calls and
+which also sees worker threads such as the UCI search, and writes
+collapsed stacks (``frame;frame;frame count``) for flamegraph.pl
+or speedscope. ``--metrics`` dumps ``metrics.METRICS`` to a file
+every ``--interval`` seconds and when the program ends, and ``--http``
+serves it to a Prometheus scraper.
+"""
+
+from __future__ import annotations
+
+import argparse
+import cProfile
+import os
+import runpy
+import sys
+import threading
+from collections import Counter
+from contextlib import contextmanager
+from typing import Iterator
+
+from metrics import Exporter, serve_http
+
+DEFAULT_SAMPLE_INTERVAL = 0.005
+
+
+class SamplingProfiler:
+    """Counts the call stacks of every thread seen at a fixed interval.
+
+    Samples are taken by a background thread reading each thread's
+    current frame, so threads blocked in C code or waiting on a selector
+    do not hide the others.
+    """
+
+    def __init__(self, interval: float = DEFAULT_SAMPLE_INTERVAL):
+        self.interval = interval
+        self.stacks: Counter[str] = Counter()
+        self._stopped = threading.Event()
+        self._thread = threading.Thread(target=self._run, daemon=True)
+
+    def _run(self) -> None:
+        own = threading.get_ident()
+        while not self._stopped.wait(self.interval):
+            # pylint: disable-next=protected-access
+            for ident, frame in sys._current_frames().items():
+                if ident != own:
+                    self.stacks[self._stack(frame)] += 1
+
+    @staticmethod
+    def _stack(frame) -> str:
+        """Returns the collapsed stack of a frame, outermost call first."""
+        names = []
+        while frame is not None:
+            code = frame.f_code
+            names.append(
+                f"{code.co_name} ({os.path.basename(code.co_filename)}:"
+                f"{frame.f_lineno})"
+            )
+            frame = frame.f_back
+        return ";".join(reversed(names))
+
+    def start(self) -> None:
+        """Starts sampling."""
+        self._thread.start()
+
+    def stop(self) -> None:
+        """Stops sampling."""
+        self._stopped.set()
+        self._thread.join()
+
+    def write(self, path: str) -> None:
+        """Writes the samples as collapsed stacks, most frequent first."""
+        with open(path, "w", encoding="utf-8") as output:
+            for stack, count in self.stacks.most_common():
+                output.write(f"{stack} {count}\n")
+
+
+@contextmanager
+def profiled(
+    cprofile_path: str | None = None,
+    sample_path: str | None = None,
+    sample_interval: float = DEFAULT_SAMPLE_INTERVAL,
+) -> Iterator[None]:
+    """Profiles the body of a ``with`` statement and writes the results,
+    even when it exits with an exception.
+    """
+    profile = cProfile.Profile() if cprofile_path else None
+    sampler = SamplingProfiler(sample_interval) if sample_path else None
+    if profile:
+        profile.enable()
+    if sampler:
+        sampler.start()
+    try:
+        yield
+    finally:
+        if sampler:
+            sampler.stop()
+            sampler.write(sample_path)
+        if profile:
+            profile.disable()
+            profile.dump_stats(cprofile_path)
+
+
+def main(argv: list[str] | None = None) -> None:
+    parser = argparse.ArgumentParser(
+        description="Run a script with profiling and metrics export."
+    )
+    parser.add_argument("--cprofile", help="pstats output file")
+    parser.add_argument("--sample", help="collapsed stacks output file")
+    parser.add_argument(
+        "--sample-interval", type=float, default=DEFAULT_SAMPLE_INTERVAL
+    )
+    parser.add_argument("--metrics", help="metrics file, .prom for Prometheus")
+    parser.add_argument("--interval", type=float, default=10.0, help="seconds")
+    parser.add_argument("--http", type=int, help="port serving the metrics")
+    parser.add_argument("script")
+    parser.add_argument("arguments", nargs=argparse.REMAINDER)
+    args = parser.parse_args(argv)
+
+    exporter = Exporter(args.metrics, args.interval).start() if args.metrics else None
+    server = serve_http(args.http) if args.http else None
+    sys.argv = [args.script, *args.arguments]
+    sys.path.insert(0, os.path.dirname(os.path.abspath(args.script)))
+    try:
+        with profiled(args.cprofile, args.sample, args.sample_interval):
+            runpy.run_path(args.script, run_name="__main__")
+    except SystemExit:
+        pass
+    finally:
+        if exporter:
+            exporter.stop()
+        if server:
+            server.shutdown()
+
+
+if __name__ == "__main__":
+    main()
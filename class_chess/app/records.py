@@ -0,0 +1,178 @@
+"""Fixed-size training records and the shard files that hold them.
+
+Every record stores a position as packed bitboards plus the state the
+encoder needs, a sparse policy target (the most likely moves and their
+probabilities) and the game outcome from the side to move's point of view.
+
+Two shard formats are written:
+
+* ``.bin``: a 16-byte header (``MAGIC`` and a little-endian uint64 record
+  count) followed by the raw records, so shards can be memory-mapped.
+* ``.npz``: the same record array compressed with ``np.savez_compressed``.
+
+``ShardReader`` reads blocks of either format without loading the shard:
+``.bin`` shards are memory-mapped and ``.npz`` shards are decompressed as a
+stream, one block at a time.
+"""
+
+from __future__ import annotations
+
+import os
+import struct
+import zipfile
+
+import numpy as np
+
+from position import BLACK, WHITE, Position
+
+MAGIC = b"TCSHARD1"
+SHARD_EXTENSIONS = (".bin", ".npz")
+HEADER = struct.Struct("<8sQ")
+NPZ_MEMBER = "records.npy"
+NPY_HEADER_READERS = {
+    (1, 0): np.lib.format.read_array_header_1_0,
+    (2, 0): np.lib.format.read_array_header_2_0,
+}
+SKIP_CHUNK = 1 << 20
+POLICY_SLOTS = 16
+
+RECORD_DTYPE = np.dtype(
+    [
+        ("bitboards", "<u8", (12,)),
+        ("turn", "u1"),
+        ("castling", "u1"),
+        ("ep_square", "i1"),
+        ("repetitions", "u1"),
+        ("halfmove_clock", "u1"),
+        ("outcome", "i1"),
+        ("policy_moves", "<u2", (POLICY_SLOTS,)),
+        ("policy_probs", "<f2", (POLICY_SLOTS,)),
+    ]
+)
+
+
+def make_record(
+    position: Position, moves: list[int], probabilities, outcome: int = 0
+) -> np.void:
+    """Returns the record of a position and its policy target.
+
+    Only the POLICY_SLOTS most likely moves are kept; probabilities are
+    renormalized over them.
+    """
+    record = np.zeros((), dtype=RECORD_DTYPE)
+    record["bitboards"] = position.pieces[WHITE] + position.pieces[BLACK]
+    record["turn"] = position.turn
+    record["castling"] = position.castling
+    record["ep_square"] = -1 if position.ep_square is None else position.ep_square
+    record["repetitions"] = min(position.repetitions(), 2)
+    record["halfmove_clock"] = min(position.halfmove_clock, 255)
+    record["outcome"] = outcome
+    probabilities = np.asarray(probabilities, dtype=np.float32)
+    order = np.argsort(-probabilities, kind="stable")[:POLICY_SLOTS]
+    kept = probabilities[order]
+    total = kept.sum()
+    record["policy_moves"][: len(order)] = np.asarray(moves)[order]
+    record["policy_probs"][: len(order)] = kept / total if total else kept
+    return record
+
+
+def write_shard(path: str, records: np.ndarray) -> None:
+    """Writes records atomically to a ``.bin`` or ``.npz`` shard.
+
+    The data goes to a temporary file that is renamed into place, so a
+    crash never leaves a partial shard under the final name.
+    """
+    records = np.asarray(records, dtype=RECORD_DTYPE)
+    temporary = f"{path}.tmp"
+    with open(temporary, "wb") as shard:
+        if path.endswith(".npz"):
+            np.savez_compressed(shard, records=records)
+        else:
+            shard.write(HEADER.pack(MAGIC, len(records)))
+            shard.write(records.tobytes())
+        shard.flush()
+        os.fsync(shard.fileno())
+    os.replace(temporary, path)
+
+
+def read_shard(path: str, mmap: bool = True) -> np.ndarray:
+    """Returns the records of a shard, memory-mapped for ``.bin`` files."""
+    if path.endswith(".npz"):
+        with np.load(path) as shard:
+            return shard["records"]
+    with open(path, "rb") as shard:
+        magic, count = HEADER.unpack(shard.read(HEADER.size))
+    if magic != MAGIC:
+        raise ValueError(f"Not a record shard: {path}")
+    if not count:
+        return np.zeros(0, dtype=RECORD_DTYPE)
+    if mmap:
+        return np.memmap(
+            path, dtype=RECORD_DTYPE, mode="r", offset=HEADER.size, shape=(count,)
+        )
+    return np.fromfile(path, dtype=RECORD_DTYPE, count=count, offset=HEADER.size)
+
+
+class ShardReader:
+    """Reads blocks of records from a shard without loading it whole.
+
+    Only the header is read when the reader is created. ``.bin`` shards are
+    memory-mapped on the first read; ``.npz`` shards keep one decompression
+    stream open, so reading a block before the previous one restarts it.
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        self.compressed = path.endswith(".npz")
+        self._records = None
+        self._archive = None
+        self._stream = None
+        if self.compressed:
+            with zipfile.ZipFile(path) as archive, archive.open(NPZ_MEMBER) as stream:
+                version = np.lib.format.read_magic(stream)
+                if version not in NPY_HEADER_READERS:
+                    raise ValueError(f"Unsupported array version in {path}")
+                shape, fortran_order, dtype = NPY_HEADER_READERS[version](stream)
+                if dtype != RECORD_DTYPE or fortran_order or len(shape) != 1:
+                    raise ValueError(f"Not a record shard: {path}")
+                self.count = shape[0]
+                self._offset = stream.tell()
+        else:
+            with open(path, "rb") as shard:
+                magic, self.count = HEADER.unpack(shard.read(HEADER.size))
+            if magic != MAGIC:
+                raise ValueError(f"Not a record shard: {path}")
+
+    def __len__(self) -> int:
+        return self.count
+
+    def read(self, start: int, count: int) -> np.ndarray:
+        """Returns up to count records from index start on."""
+        count = max(0, min(count, self.count - start))
+        if not self.compressed:
+            if self._records is None:
+                self._records = read_shard(self.path)
+            return self._records[start : start + count]
+
+        position = self._offset + start * RECORD_DTYPE.itemsize
+        if self._stream is None or self._stream.tell() > position:
+            self.close()
+            self._archive = zipfile.ZipFile(self.path)
+            self._stream = self._archive.open(NPZ_MEMBER)
+        skip = position - self._stream.tell()
+        while skip:
+            chunk = self._stream.read(min(skip, SKIP_CHUNK))
+            if not chunk:
+                raise ValueError(f"Truncated shard: {self.path}")
+            skip -= len(chunk)
+        data = self._stream.read(count * RECORD_DTYPE.itemsize)
+        if len(data) != count * RECORD_DTYPE.itemsize:
+            raise ValueError(f"Truncated shard: {self.path}")
+        return np.frombuffer(data, dtype=RECORD_DTYPE)
+
+    def close(self) -> None:
+        """Releases the memory map or decompression stream, if any."""
+        if self._stream is not None:
+            self._stream.close()
+            self._archive.close()
+        self._records = self._archive = self._stream = None
@@ -0,0 +1,156 @@
+"""Headless rendering of board diagrams from FENs.
+
+Usage::
+
+    python app/render.py --output diagrams/ --size 64 positions.fen
+
+No window is opened: the SDL dummy video driver provides the tiny display
+surface sprite conversion needs. The empty board is drawn once and every
+diagram starts as a copy of it, with the cached piece sprites blitted on
+the occupied squares only. Batches are split across a process pool whose
+workers each keep their own renderer.
+"""
+
+from __future__ import annotations
+
+import argparse
+import os
+from concurrent.futures import ProcessPoolExecutor
+from types import SimpleNamespace
+
+os.environ.setdefault("SDL_VIDEODRIVER", "dummy")
+
+# pylint: disable=wrong-import-position
+import pygame
+
+from position import COLOR_NAMES, PIECE_NAMES, Position
+from spritesheet import get_atlas
+
+LIGHT_COLOR = (255, 255, 255)
+DARK_COLOR = (0, 0, 0)
+
+# State each pool process keeps between jobs.
+_WORKER = SimpleNamespace(renderer=None)
+
+
+def init_headless() -> None:
+    """Initializes pygame with a 1x1 display for sprite conversion."""
+    if not pygame.display.get_init():
+        pygame.display.init()
+    if pygame.display.get_surface() is None:
+        pygame.display.set_mode((1, 1))
+
+
+class BoardRenderer:
+    """Renders positions onto copies of a cached empty board."""
+
+    def __init__(self, square_size: int = 64):
+        init_headless()
+        self.square_size = square_size
+        self.background = pygame.Surface((square_size * 8, square_size * 8))
+        for y in range(8):
+            for x in range(8):
+                self.background.fill(
+                    LIGHT_COLOR if (x + y) % 2 == 0 else DARK_COLOR,
+                    (x * square_size, y * square_size, square_size, square_size),
+                )
+        atlas = get_atlas()
+        self.sprites = {
+            (color, ptype): atlas.sprite(
+                COLOR_NAMES[color], PIECE_NAMES[ptype], square_size
+            )
+            for color in range(2)
+            for ptype in range(6)
+        }
+
+    def render(self, position: Position | str) -> pygame.Surface:
+        """Returns the diagram of a position or FEN, white at the bottom."""
+        if isinstance(position, str):
+            position = Position.from_fen(position)
+        surface = self.background.copy()
+        size = self.square_size
+        for square, occupant in enumerate(position.mailbox):
+            if occupant:
+                sprite = self.sprites[occupant]
+                center = (
+                    (square & 7) * size + size // 2,
+                    (7 - (square >> 3)) * size + size // 2,
+                )
+                surface.blit(sprite, sprite.get_rect(center=center))
+        return surface
+
+    def render_bytes(self, position: Position | str) -> bytes:
+        """Returns the diagram as raw RGB bytes, row by row."""
+        return pygame.image.tostring(self.render(position), "RGB")
+
+    def save(self, position: Position | str, filename: str) -> None:
+        """Writes the diagram to an image file, PNG by extension."""
+        pygame.image.save(self.render(position), filename)
+
+
+def _worker_renderer(square_size: int) -> BoardRenderer:
+    """Returns the renderer of this process, created on first use."""
+    renderer = _WORKER.renderer
+    if renderer is None or renderer.square_size != square_size:
+        renderer = _WORKER.renderer = BoardRenderer(square_size)
+    return renderer
+
+
+def _render_job(job: tuple[str, int, str | None]) -> bytes | str:
+    """Renders one FEN to a file if given one, else to raw RGB bytes."""
+    fen, square_size, filename = job
+    renderer = _worker_renderer(square_size)
+    if filename is None:
+        return renderer.render_bytes(fen)
+    renderer.save(fen, filename)
+    return filename
+
+
+def render_batch(
+    fens: list[str],
+    output_dir: str | None = None,
+    square_size: int = 64,
+    workers: int = os.cpu_count() or 1,
+    chunksize: int = 64,
+) -> list[bytes] | list[str]:
+    """Renders FENs across a process pool.
+
+    With an output directory each diagram is written as ``<index>.png`` and
+    the paths are returned; otherwise the raw RGB buffers are, each
+    ``(8 * square_size) ** 2 * 3`` bytes.
+    """
+    if output_dir is not None:
+        os.makedirs(output_dir, exist_ok=True)
+    jobs = [
+        (
+            fen,
+            square_size,
+            (
+                None
+                if output_dir is None
+                else os.path.join(output_dir, f"{index:06d}.png")
+            ),
+        )
+        for index, fen in enumerate(fens)
+    ]
+    if workers <= 1:
+        return [_render_job(job) for job in jobs]
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        return list(pool.map(_render_job, jobs, chunksize=chunksize))
+
+
+def main(argv: list[str] | None = None) -> None:
+    parser = argparse.ArgumentParser(description="Render FENs to PNG diagrams.")
+    parser.add_argument("fens", help="file with one FEN per line")
+    parser.add_argument("--output", required=True, help="image directory")
+    parser.add_argument("--size", type=int, default=64, help="square size")
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 1)
+    args = parser.parse_args(argv)
+
+    with open(args.fens, encoding="utf-8") as lines:
+        fens = [line.strip() for line in lines if line.strip()]
+    render_batch(fens, args.output, args.size, args.workers)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,554 @@
+"""Alpha-beta search with iterative deepening and a transposition table.
+
+The searcher walks the tree with ``Position.make_move``/``unmake_move`` and
+caches results by Zobrist key in a fixed-size transposition table that
+keeps the deeper of two colliding entries. Moves are ordered by the table
+move, MVV-LVA for captures, two killer moves per ply and a history table.
+Depth, node and time limits are checked while searching, and the best move
+of the last completed iteration is returned when a limit is hit.
+"""
+
+from __future__ import annotations
+
+import time
+from array import array
+from dataclasses import dataclass, field
+from typing import TYPE_CHECKING, Callable
+
+from evaluation import Evaluator
+from metrics import METRICS
+from movegen import checkers, legal_moves, move_uci
+from position import BISHOP, KING, KNIGHT, PAWN, QUEEN, ROOK, Position
+
+if TYPE_CHECKING:
+    from book import PolyglotBook
+    from tablebase import Tablebase
+
+INFINITY = 1_000_000
+MATE_SCORE = 100_000
+# Scores beyond this bound encode a forced mate.
+MATE_BOUND = MATE_SCORE - 1000
+# Tablebase wins score below every mate and above every evaluation.
+TABLEBASE_SCORE = MATE_BOUND - 1000
+MAX_PLY = 128
+
+EXACT, LOWER, UPPER = 0, 1, 2
+
+PIECE_VALUES = {PAWN: 100, KNIGHT: 320, BISHOP: 330, ROOK: 500, QUEEN: 900, KING: 0}
+
+# Bytes per transposition table entry: two uint64 words.
+ENTRY_SIZE = 16
+# Added to scores so they pack as unsigned integers.
+SCORE_OFFSET = 1 << 31
+
+
+def evaluate(position: Position) -> int:
+    """Returns the material balance from the side to move's point of view."""
+    ours, theirs = position.pieces[position.turn], position.pieces[position.turn ^ 1]
+    return sum(
+        value * (ours[piece_type].bit_count() - theirs[piece_type].bit_count())
+        for piece_type, value in PIECE_VALUES.items()
+    )
+
+
+class SearchAborted(Exception):
+    """Raised inside the search when a limit is reached."""
+
+
+class TranspositionTable:
+    """Fixed-size hash table of search results keyed by Zobrist key.
+
+    Each slot holds one entry. A new result replaces the stored one when
+    it was searched at least as deep or belongs to a different position.
+    Slots are two uint64 words in a flat array, ``key ^ data`` and
+    ``data``, where data packs the move (bits 0-15), depth (16-23), flag
+    (24-25) and the score plus ``SCORE_OFFSET`` (32-63), so an entry
+    costs exactly ``ENTRY_SIZE`` bytes.
+    """
+
+    def __init__(self, size_mb: int = 16):
+        """Initializes a table holding a power of two number of entries."""
+        entries = max(1, size_mb * 2**20 // ENTRY_SIZE)
+        self.size = 1 << (entries.bit_length() - 1)
+        self.mask = self.size - 1
+        self.words = self._allocate()
+
+    def _allocate(self):
+        """Returns zeroed words for every slot."""
+        return array("Q", bytes(self.size * ENTRY_SIZE))
+
+    def probe(self, key: int) -> tuple[int, int, int, int] | None:
+        """Returns the stored (depth, score, flag, move) of a key, if any."""
+        index = (key & self.mask) << 1
+        data = self.words[index + 1]
+        if self.words[index] ^ data != key or not data:
+            return None
+        return (
+            data >> 16 & 0xFF,
+            (data >> 32) - SCORE_OFFSET,
+            data >> 24 & 3,
+            data & 0xFFFF,
+        )
+
+    def store(self, key: int, depth: int, score: int, flag: int, move: int) -> None:
+        """Stores a search result, replacing shallower entries."""
+        index = (key & self.mask) << 1
+        data = self.words[index + 1]
+        same = self.words[index] ^ data == key and data
+        if same and depth < data >> 16 & 0xFF:
+            return
+        if not move and same:
+            move = data & 0xFFFF
+        data = (
+            move
+            | min(max(depth, 0), 0xFF) << 16
+            | flag << 24
+            | score + SCORE_OFFSET << 32
+        )
+        self.words[index] = key ^ data
+        self.words[index + 1] = data
+
+    def clear(self) -> None:
+        """Removes all entries."""
+        self.words = self._allocate()
+
+    def hashfull(self) -> int:
+        """Returns the permille of used entries in the first thousand slots."""
+        sample = min(1000, self.size)
+        return (
+            sum(self.words[2 * index + 1] != 0 for index in range(sample))
+            * 1000
+            // sample
+        )
+
+
+@dataclass
+class SearchLimits:
+    depth: int | None = None
+    nodes: int | None = None
+    movetime: float | None = None
+    multipv: int = 1
+    searchmoves: list[int] | None = None
+
+
+@dataclass
+class SearchResult:
+    move: int | None
+    score: int
+    depth: int
+    nodes: int
+    seconds: float
+    pv: list[int] = field(default_factory=list)
+    multipv: int = 1
+
+    @property
+    def nps(self) -> float:
+        """Returns the nodes searched per second."""
+        return self.nodes / self.seconds if self.seconds else 0.0
+
+    def __str__(self):
+        pv = " ".join(move_uci(move) for move in self.pv)
+        return (
+            f"depth {self.depth} score {self.score} nodes {self.nodes} "
+            f"nps {self.nps:.0f} pv {pv}"
+        )
+
+
+def score_to_tt(score: int, ply: int) -> int:
+    """Converts a mate score relative to the root into one relative to ply."""
+    if score > MATE_BOUND:
+        return score + ply
+    if score < -MATE_BOUND:
+        return score - ply
+    return score
+
+
+def score_from_tt(score: int, ply: int) -> int:
+    """Converts a stored mate score back to one relative to the root."""
+    if score > MATE_BOUND:
+        return score - ply
+    if score < -MATE_BOUND:
+        return score + ply
+    return score
+
+
+def tablebase_score(value: int, ply: int) -> int:
+    """Converts a tablebase result at ply into a search score."""
+    if value > 0:
+        return TABLEBASE_SCORE - ply
+    if value < 0:
+        return -TABLEBASE_SCORE + ply
+    return 0
+
+
+class Searcher:
+    """Searches positions for the best move within the given limits."""
+
+    def __init__(
+        self,
+        tt: TranspositionTable | None = None,
+        evaluator: Callable[[Position], int] | None = None,
+        book: PolyglotBook | None = None,
+        tablebase: Tablebase | None = None,
+    ):
+        """Initializes the searcher.
+
+        Args:
+            tt: Transposition table, a new 16 MB one by default.
+            evaluator: Static evaluation for the side to move, a classical
+                ``Evaluator`` with its own pawn cache by default.
+            book: Opening book consulted before searching the root.
+            tablebase: Endgame tables probed at the root and inside the tree.
+        """
+        self.tt = tt or TranspositionTable()
+        self.evaluate = evaluator or Evaluator()
+        self.book = book
+        self.tablebase = tablebase
+        self.nodes = 0
+        # Per-search counters, added to ``metrics.METRICS`` when it ends.
+        self.tt_probes = 0
+        self.tt_hits = 0
+        self.movegen_calls = 0
+        self.evaluations = 0
+        self.stopped = False
+        self.killers: list[list[int]] = [[0, 0] for _ in range(MAX_PLY)]
+        self.history: list[int] = [0] * (2 * 64 * 64)
+        self.limits = SearchLimits()
+        self.node_limit = INFINITY
+        self.deadline: float | None = None
+        self.root_move = 0
+        self.root_moves: list[int] = []
+        self.restricted = False
+        # Set by parallel search: helpers start deeper and share a stop flag.
+        self.start_depth = 1
+        self.stop_event = None
+
+    def stop(self) -> None:
+        """Asks a running search to return as soon as possible."""
+        self.stopped = True
+
+    def search(
+        self,
+        position: Position,
+        limits: SearchLimits | None = None,
+        on_iteration: Callable[[SearchResult], None] | None = None,
+    ) -> SearchResult:
+        """Runs an iterative deepening search and returns the best result.
+
+        The position is searched in place and restored before returning.
+        """
+        self.limits = limits or SearchLimits()
+        self.node_limit = self.limits.nodes or INFINITY
+        self.nodes = 0
+        self.tt_probes = self.tt_hits = 0
+        self.movegen_calls = self.evaluations = 0
+        self.stopped = False
+        self.killers = [[0, 0] for _ in range(MAX_PLY)]
+        self.history = [0] * (2 * 64 * 64)
+        start = time.perf_counter()
+        self.deadline = (
+            start + self.limits.movetime if self.limits.movetime is not None else None
+        )
+        try:
+            max_depth = min(self.limits.depth or MAX_PLY - 1, MAX_PLY - 1)
+            root_ply = len(position.history)
+
+            moves = legal_moves(position)
+            result = SearchResult(moves[0] if moves else None, 0, 0, 0, 0.0)
+            if not moves:
+                result.score = -MATE_SCORE if checkers(position) else 0
+                return result
+            known = self.probe_root(position)
+            if known is not None:
+                known.seconds = time.perf_counter() - start
+                return known
+
+            searchmoves = [
+                move for move in moves if move in (self.limits.searchmoves or moves)
+            ] or moves
+            lines = max(1, min(self.limits.multipv, len(searchmoves)))
+            for depth in range(min(self.start_depth, max_depth), max_depth + 1):
+                results = []
+                try:
+                    # Each further line searches the root without the moves of
+                    # the lines above it.
+                    for line in range(lines):
+                        self.root_moves = [
+                            move
+                            for move in searchmoves
+                            if move not in [found.move for found in results]
+                        ]
+                        self.restricted = len(self.root_moves) < len(moves)
+                        score = self.negamax(position, depth, -INFINITY, INFINITY, 0)
+                        position.make_move(self.root_move)
+                        pv = [self.root_move]
+                        pv += self.principal_variation(position, depth - 1)
+                        position.unmake_move()
+                        results.append(
+                            SearchResult(
+                                self.root_move,
+                                score,
+                                depth,
+                                self.nodes,
+                                time.perf_counter() - start,
+                                pv,
+                                line + 1,
+                            )
+                        )
+                except SearchAborted:
+                    while len(position.history) > root_ply:
+                        position.unmake_move()
+                    break
+                result = results[0]
+                if on_iteration:
+                    for line_result in results:
+                        on_iteration(line_result)
+                if (
+                    lines == 1
+                    and abs(result.score) > MATE_BOUND
+                    or self.out_of_time(soft=True)
+                ):
+                    break
+
+            result.nodes = self.nodes
+            result.seconds = time.perf_counter() - start
+            return result
+        finally:
+            self.publish_stats(time.perf_counter() - start)
+
+    def publish_stats(self, seconds: float) -> None:
+        """Adds the counters of the last search to the process metrics."""
+        METRICS.increment("search_nodes_total", self.nodes)
+        METRICS.increment("tt_probes_total", self.tt_probes)
+        METRICS.increment("tt_hits_total", self.tt_hits)
+        METRICS.increment("movegen_calls_total", self.movegen_calls)
+        METRICS.increment("eval_calls_total", self.evaluations)
+        METRICS.observe("search", seconds)
+
+    def probe_root(self, position: Position) -> SearchResult | None:
+        """Returns the book or tablebase answer for the root, if any."""
+        if self.book is not None:
+            move = self.book.choose(position)
+            if move is not None:
+                return SearchResult(move, 0, 0, 0, 0.0, [move])
+        if self.tablebase is not None:
+            found = self.tablebase.best_move(position)
+            if found is not None:
+                move, value = found
+                return SearchResult(move, tablebase_score(value, 0), 0, 0, 0.0, [move])
+        return None
+
+    def out_of_time(self, soft: bool = False) -> bool:
+        """Returns whether the time budget is spent.
+
+        The soft check between iterations stops early when the next
+        iteration is unlikely to finish in the remaining time.
+        """
+        if self.deadline is None:
+            return False
+        remaining = self.deadline - time.perf_counter()
+        if soft:
+            return remaining < self.limits.movetime / 2
+        return remaining <= 0
+
+    def check_limits(self) -> None:
+        """Aborts the search when stopped or out of nodes or time."""
+        if (
+            self.stopped
+            or self.nodes >= self.node_limit
+            or self.out_of_time()
+            or self.stop_event is not None
+            and self.stop_event.is_set()
+        ):
+            raise SearchAborted
+
+    def negamax(
+        self, position: Position, depth: int, alpha: int, beta: int, ply: int
+    ) -> int:
+        """Returns the score of a position searched to depth plies."""
+        self.nodes += 1
+        if self.nodes >= self.node_limit or not self.nodes & 1023:
+            self.check_limits()
+
+        if ply and (position.halfmove_clock >= 100 or position.repetitions()):
+            return 0
+        if (
+            ply
+            and self.tablebase is not None
+            and position.occupancy.bit_count() <= self.tablebase.max_pieces
+        ):
+            value = self.tablebase.probe(position)
+            if value is not None:
+                return tablebase_score(value, ply)
+
+        in_check = checkers(position)
+        if in_check:
+            depth += 1
+        if depth <= 0:
+            return self.quiescence(position, alpha, beta, ply)
+
+        key = position.key
+        tt_move = 0
+        entry = self.tt.probe(key)
+        self.tt_probes += 1
+        if entry is not None:
+            self.tt_hits += 1
+            tt_depth, tt_score, tt_flag, tt_move = entry
+            if ply and tt_depth >= depth:
+                tt_score = score_from_tt(tt_score, ply)
+                if (
+                    tt_flag == EXACT
+                    or tt_flag == LOWER
+                    and tt_score >= beta
+                    or tt_flag == UPPER
+                    and tt_score <= alpha
+                ):
+                    return tt_score
+
+        if ply:
+            moves = legal_moves(position)
+            self.movegen_calls += 1
+        else:
+            moves = self.root_moves
+        if not moves:
+            return -MATE_SCORE + ply if in_check else 0
+        if ply >= MAX_PLY - 1:
+            self.evaluations += 1
+            return self.evaluate(position)
+
+        original_alpha = alpha
+        best_score = -INFINITY
+        best_found = 0
+        for move in self.order_moves(position, moves, tt_move, ply):
+            position.make_move(move)
+            score = -self.negamax(position, depth - 1, -beta, -alpha, ply + 1)
+            position.unmake_move()
+
+            if score > best_score:
+                best_score = score
+                best_found = move
+                if not ply:
+                    self.root_move = move
+                if score > alpha:
+                    alpha = score
+                    if alpha >= beta:
+                        if not self.is_capture(position, move):
+                            self.update_quiet(position.turn, move, depth, ply)
+                        break
+
+        if best_score <= original_alpha:
+            flag = UPPER
+        elif best_score >= beta:
+            flag = LOWER
+        else:
+            flag = EXACT
+        if ply or not self.restricted:
+            self.tt.store(key, depth, score_to_tt(best_score, ply), flag, best_found)
+        return best_score
+
+    def quiescence(self, position: Position, alpha: int, beta: int, ply: int) -> int:
+        """Returns the score of a position after resolving captures.
+
+        A side in check cannot stand pat: every evasion is searched and a
+        position without one is scored as mate.
+        """
+        self.nodes += 1
+        if self.nodes >= self.node_limit or not self.nodes & 1023:
+            self.check_limits()
+
+        in_check = checkers(position)
+        if ply >= MAX_PLY - 1 or not in_check:
+            stand_pat = self.evaluate(position)
+            self.evaluations += 1
+            if stand_pat >= beta or ply >= MAX_PLY - 1:
+                return stand_pat
+            alpha = max(alpha, stand_pat)
+
+        self.movegen_calls += 1
+        moves = legal_moves(position)
+        if in_check:
+            if not moves:
+                return -MATE_SCORE + ply
+        else:
+            moves = [
+                move for move in moves if self.is_capture(position, move) or move >> 12
+            ]
+        for move in self.order_moves(position, moves, 0, ply):
+            position.make_move(move)
+            score = -self.quiescence(position, -beta, -alpha, ply + 1)
+            position.unmake_move()
+            if score >= beta:
+                return score
+            alpha = max(alpha, score)
+        return alpha
+
+    @staticmethod
+    def is_capture(position: Position, move: int) -> bool:
+        """Returns whether a move captures, including en passant."""
+        to_sq = move >> 6 & 63
+        return position.mailbox[to_sq] is not None or (
+            to_sq == position.ep_square and position.mailbox[move & 63][1] == PAWN
+        )
+
+    def order_moves(
+        self, position: Position, moves: list[int], tt_move: int, ply: int
+    ) -> list[int]:
+        """Returns moves sorted by their likelihood of causing a cutoff."""
+        mailbox = position.mailbox
+        killers = self.killers[ply]
+        history = self.history
+        side = position.turn * 4096
+        scored = []
+        for move in moves:
+            if move == tt_move:
+                score = 1 << 30
+            else:
+                victim = mailbox[move >> 6 & 63]
+                if victim is not None:
+                    attacker = mailbox[move & 63][1]
+                    score = (1 << 28) + PIECE_VALUES[victim[1]] * 16 - attacker
+                elif move >> 12:
+                    score = (1 << 28) + PIECE_VALUES[move >> 12]
+                elif move == killers[0]:
+                    score = 1 << 27
+                elif move == killers[1]:
+                    score = (1 << 27) - 1
+                else:
+                    score = history[side + (move & 4095)]
+            scored.append((score, move))
+        scored.sort(reverse=True)
+        return [move for _, move in scored]
+
+    def update_quiet(self, turn: int, move: int, depth: int, ply: int) -> None:
+        """Records a quiet move that caused a beta cutoff."""
+        killers = self.killers[ply]
+        if killers[0] != move:
+            killers[1] = killers[0]
+            killers[0] = move
+        index = turn * 4096 + (move & 4095)
+        self.history[index] = min(self.history[index] + depth * depth, 1 << 26)
+
+    def principal_variation(self, position: Position, depth: int) -> list[int]:
+        """Returns the best line found by following table moves."""
+        pv: list[int] = []
+        seen = set()
+        while len(pv) < depth and position.key not in seen:
+            seen.add(position.key)
+            entry = self.tt.probe(position.key)
+            if entry is None or not entry[3] or entry[3] not in legal_moves(position):
+                break
+            pv.append(entry[3])
+            position.make_move(entry[3])
+        for _ in pv:
+            position.unmake_move()
+        return pv
+
+
+def best_move(
+    position: Position,
+    depth: int | None = None,
+    nodes: int | None = None,
+    movetime: float | None = None,
+) -> int | None:
+    """Returns the best move found within the given limits."""
+    return Searcher().search(position, SearchLimits(depth, nodes, movetime)).move
@@ -0,0 +1,311 @@
+"""Headless engine-vs-engine self-play that writes training shards.
+
+Usage::
+
+    python app/selfplay.py --output data/ --games 10000 --workers 32
+
+Games are grouped into shards of ``games_per_shard``; each shard is played
+by one worker process from its own seed and written atomically as
+``shard-<index>.bin`` (or ``.npz``). Shards already on disk are skipped, so
+an interrupted run resumes where it stopped, and a crashed worker only
+costs the shard it was playing, which is resubmitted.
+"""
+
+from __future__ import annotations
+
+import argparse
+import functools
+import logging
+import os
+import random
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from concurrent.futures.process import BrokenProcessPool
+from dataclasses import dataclass, field
+
+import numpy as np
+
+from encoder import BoardEncoder
+from inference import Evaluation, MLPModel, Model
+from mcts import MCTS
+from movegen import game_result, legal_moves, parse_uci
+from position import STARTING_FEN, WHITE, Position
+from records import RECORD_DTYPE, make_record, write_shard
+from search import Searcher, SearchLimits, TranspositionTable
+
+logger = logging.getLogger(__name__)
+
+RESULT_SCORES = {"1-0": 1, "0-1": -1, "1/2-1/2": 0}
+
+
+@dataclass
+class SelfPlayConfig:
+    output_dir: str
+    games: int
+    workers: int = os.cpu_count() or 1
+    games_per_shard: int = 16
+    engine: str = "search"
+    nodes: int = 2000
+    hash_mb: int = 16
+    simulations: int = 200
+    model_path: str | None = None
+    random_plies: int = 4
+    max_plies: int = 300
+    openings: list[str] = field(default_factory=lambda: [STARTING_FEN])
+    shard_format: str = "bin"
+    seed: int = 0
+    max_retries: int = 3
+
+    @property
+    def shards(self) -> int:
+        """Returns the number of shards the games are split into."""
+        return -(-self.games // self.games_per_shard)
+
+    def shard_path(self, index: int) -> str:
+        """Returns the file name of a shard."""
+        return os.path.join(self.output_dir, f"shard-{index:06d}.{self.shard_format}")
+
+
+def load_openings(filename: str) -> list[str]:
+    """Reads openings, one FEN, EPD line or UCI move list per line."""
+    with open(filename, encoding="utf-8") as openings:
+        return [line.strip() for line in openings if line.strip()]
+
+
+def opening_position(opening: str) -> Position:
+    """Returns the position an opening line describes.
+
+    Lines with a ``/`` are FENs, or EPD lines when anything but the move
+    counters follows the four position fields; EPD operations such as
+    ``bm`` or ``id`` are ignored, except the ``hmvc`` and ``fmvn`` counters.
+    """
+    if "/" in opening:
+        fields = opening.split()
+        if len(fields) <= 6 and all(field.isdigit() for field in fields[4:]):
+            return Position.from_fen(opening)
+        return Position.from_epd(opening)[0]
+    position = Position.starting()
+    for uci in opening.split():
+        move = parse_uci(uci)
+        if move not in legal_moves(position):
+            raise ValueError(f"Illegal opening move {uci} in: {opening}")
+        position.make_move(move)
+    return position
+
+
+@functools.lru_cache(maxsize=1)
+def worker_searcher(hash_mb: int) -> Searcher:
+    """Returns the searcher this process reuses for every game."""
+    return Searcher(TranspositionTable(hash_mb))
+
+
+class SearchPlayer:
+    """Chooses moves with alpha-beta search; the policy target is one-hot."""
+
+    def __init__(self, config: SelfPlayConfig):
+        self.searcher = worker_searcher(config.hash_mb)
+        self.limits = SearchLimits(nodes=config.nodes)
+
+    def new_game(self) -> None:
+        """Forgets the previous game's table entries."""
+        self.searcher.tt.clear()
+
+    def choose(self, position: Position) -> tuple[int, list[int], list[float]]:
+        """Returns the move to play and the policy target."""
+        move = self.searcher.search(position, self.limits).move
+        return move, [move], [1.0]
+
+    def played(self, move: int, position: Position) -> None:
+        """Notifies the player of the move just played."""
+
+
+class MCTSPlayer:
+    """Chooses moves with MCTS; the policy target is the visit distribution."""
+
+    def __init__(self, config: SelfPlayConfig, model: Model, rng: random.Random):
+        self.simulations = config.simulations
+        self.rng = rng
+        self.model = model
+        self.encoder = BoardEncoder(1)
+        self.mcts = MCTS(self.evaluate, noise_fraction=0.25, seed=rng.getrandbits(32))
+
+    def new_game(self) -> None:
+        """Discards the previous game's tree."""
+        self.mcts.reset()
+
+    def evaluate(self, position: Position) -> Evaluation:
+        """Evaluates a single position with the model."""
+        logits, values = self.model.predict(self.encoder.encode([position]))
+        return Evaluation(logits[0], float(values[0]))
+
+    def choose(self, position: Position) -> tuple[int, list[int], list[float]]:
+        """Returns the move to play and the policy target."""
+        self.mcts.search(position, self.simulations)
+        moves, probabilities = self.mcts.policy(temperature=1.0)
+        move = self.rng.choices(moves, weights=probabilities.tolist())[0]
+        return move, moves, probabilities.tolist()
+
+    def played(self, move: int, position: Position) -> None:
+        """Keeps the searched subtree below the move just played."""
+        self.mcts.advance(move, position)
+
+
+def play_game(config: SelfPlayConfig, player, rng: random.Random) -> np.ndarray:
+    """Plays one game and returns its records with outcomes filled in."""
+    player.new_game()
+    position = opening_position(rng.choice(config.openings))
+    for _ in range(config.random_plies):
+        moves = legal_moves(position)
+        if not moves:
+            break
+        position.make_move(rng.choice(moves))
+
+    records = []
+    turns = []
+    result = game_result(position)
+    plies = 0
+    while result is None and plies < config.max_plies:
+        move, moves, probabilities = player.choose(position)
+        records.append(make_record(position, moves, probabilities))
+        turns.append(position.turn)
+        position.make_move(move)
+        player.played(move, position)
+        plies += 1
+        result = game_result(position)
+
+    score = RESULT_SCORES.get(result, 0)
+    array = np.array(records, dtype=RECORD_DTYPE)
+    if len(array):
+        array["outcome"] = [score if turn == WHITE else -score for turn in turns]
+    return array
+
+
+def generate_shard(config: SelfPlayConfig, index: int) -> str:
+    """Plays the games of one shard and writes it; returns its path."""
+    rng = random.Random(config.seed * 1_000_003 + index)
+    model = None
+    if config.engine == "mcts":
+        model = MLPModel.load(config.model_path) if config.model_path else MLPModel()
+
+    games = min(config.games_per_shard, config.games - index * config.games_per_shard)
+    records = [np.zeros(0, dtype=RECORD_DTYPE)]
+    player = MCTSPlayer(config, model, rng) if model else SearchPlayer(config)
+    for _ in range(games):
+        records.append(play_game(config, player, rng))
+    path = config.shard_path(index)
+    write_shard(path, np.concatenate(records))
+    return path
+
+
+def _run_shards(
+    config: SelfPlayConfig, indices: list[int], workers: int
+) -> tuple[list[str], list[int], list[int]]:
+    """Generates shards in a fresh process pool.
+
+    Returns the paths written, the shards that raised and, when a worker
+    process died, the shards left unfinished.
+    """
+    written, failed = [], []
+    try:
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            futures = {
+                pool.submit(generate_shard, config, index): index for index in indices
+            }
+            for future in as_completed(futures):
+                index = futures[future]
+                try:
+                    written.append(future.result())
+                    logger.info("wrote %s", config.shard_path(index))
+                except BrokenProcessPool:
+                    raise
+                except Exception:  # pylint: disable=broad-except
+                    logger.exception("shard %d failed", index)
+                    failed.append(index)
+    except BrokenProcessPool:
+        # Shards are written atomically, so one on disk whose result was
+        # lost with the pool is complete.
+        unfinished = []
+        for index in indices:
+            path = config.shard_path(index)
+            if index in failed or path in written:
+                continue
+            if os.path.exists(path):
+                written.append(path)
+            else:
+                unfinished.append(index)
+        return written, failed, unfinished
+    return written, failed, []
+
+
+def run(config: SelfPlayConfig) -> list[str]:
+    """Generates every missing shard across a process pool."""
+    os.makedirs(config.output_dir, exist_ok=True)
+    pending = [
+        index
+        for index in range(config.shards)
+        if not os.path.exists(config.shard_path(index))
+    ]
+    attempts = dict.fromkeys(pending, 0)
+    written = []
+    while pending:
+        done, failed, unfinished = _run_shards(config, pending, config.workers)
+        written += done
+        if unfinished:
+            # A dead worker fails every unfinished shard; running each one
+            # alone charges a retry only to the shard that crashes.
+            logger.warning("a worker process died, retrying shards one at a time")
+            for index in unfinished:
+                done, isolated_failed, crashed = _run_shards(config, [index], 1)
+                written += done
+                failed += isolated_failed + crashed
+
+        pending = []
+        for index in failed:
+            attempts[index] += 1
+            if attempts[index] > config.max_retries:
+                logger.error("giving up on shard %d", index)
+            else:
+                pending.append(index)
+    return written
+
+
+def main(argv: list[str] | None = None) -> None:
+    parser = argparse.ArgumentParser(description="Generate self-play data.")
+    parser.add_argument("--output", required=True, help="shard directory")
+    parser.add_argument("--games", type=int, default=100)
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 1)
+    parser.add_argument("--games-per-shard", type=int, default=16)
+    parser.add_argument("--engine", choices=["search", "mcts"], default="search")
+    parser.add_argument("--nodes", type=int, default=2000)
+    parser.add_argument("--hash", type=int, default=16, help="table size in MB")
+    parser.add_argument("--simulations", type=int, default=200)
+    parser.add_argument("--model", help="MLP weights (.npz) for --engine mcts")
+    parser.add_argument("--openings", help="file of FENs or UCI move lines")
+    parser.add_argument("--random-plies", type=int, default=4)
+    parser.add_argument("--max-plies", type=int, default=300)
+    parser.add_argument("--format", choices=["bin", "npz"], default="bin")
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args(argv)
+
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s %(message)s")
+    config = SelfPlayConfig(
+        output_dir=args.output,
+        games=args.games,
+        workers=args.workers,
+        games_per_shard=args.games_per_shard,
+        engine=args.engine,
+        nodes=args.nodes,
+        hash_mb=args.hash,
+        simulations=args.simulations,
+        model_path=args.model,
+        random_plies=args.random_plies,
+        max_plies=args.max_plies,
+        shard_format=args.format,
+        seed=args.seed,
+    )
+    if args.openings:
+        config.openings = load_openings(args.openings)
+    run(config)
+
+
+if __name__ == "__main__":
+    main()
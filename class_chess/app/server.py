@@ -0,0 +1,239 @@
+"""Game server hosting many concurrent games in one asyncio process.
+
+Usage::
+
+    python app/server.py --port 8765 --workers 4 --movetime 0.5
+    python app/server.py --unix /tmp/tensorchess.sock
+
+Clients speak JSON lines over TCP or a Unix socket: each request is one
+JSON object with an ``op`` and each gets exactly one JSON reply, in order.
+
+* ``{"op": "new", "fen": ..., "engine": "black"}`` starts a game, from
+  the starting position when ``fen`` is omitted; ``engine`` names the side
+  the engine plays, if any.
+* ``{"op": "move", "game": 1, "move": "e2e4"}`` plays a UCI move and, when
+  the engine is to move next, its reply.
+* ``{"op": "state", "game": 1}`` returns the game without changing it.
+* ``{"op": "pgn", "game": 1}`` returns the moves played as PGN.
+* ``{"op": "close", "game": 1}`` forgets a game.
+
+Replies carry the game id, the FEN, the legal moves and the result once
+the game is over, or ``{"error": ...}`` for a rejected request. A game is a
+headless ``Position`` rather than a pygame window, so thousands fit in one
+process; engine replies are searched in a process pool so the event loop
+keeps serving other games meanwhile.
+"""
+
+from __future__ import annotations
+
+import argparse
+import asyncio
+import itertools
+import json
+import os
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import dataclass
+from types import SimpleNamespace
+
+from movegen import game_result, legal_moves, move_uci, parse_uci
+from pgn import Game
+from position import COLOR_NAMES, Position
+from search import Searcher, SearchLimits, TranspositionTable
+
+# Longest request line accepted from a client.
+LINE_LIMIT = 1 << 16
+# Pending connections the listening socket queues before refusing more.
+BACKLOG = 4096
+
+
+@dataclass
+class ServerGame:
+    position: Position
+    engine: int | None = None
+    thinking: bool = False
+
+
+# State each pool process keeps between jobs.
+_WORKER = SimpleNamespace(searcher=None)
+
+
+def _init_worker(size_mb: int) -> None:
+    """Creates the searcher every job of a pool process reuses."""
+    _WORKER.searcher = Searcher(TranspositionTable(size_mb))
+
+
+def _engine_move(position: Position, limits: SearchLimits) -> int | None:
+    """Returns the engine's move in a position."""
+    return _WORKER.searcher.search(position, limits).move
+
+
+class GameServer:
+    """Holds the games and answers client requests."""
+
+    def __init__(
+        self,
+        limits: SearchLimits | None = None,
+        workers: int | None = None,
+        size_mb: int = 16,
+    ):
+        """Initializes an empty server.
+
+        Args:
+            limits: Search limits of every engine reply.
+            workers: Engine processes, one per core by default.
+            size_mb: Transposition table size of each engine process.
+        """
+        self.limits = limits or SearchLimits(movetime=0.5)
+        self.games: dict[int, ServerGame] = {}
+        self._ids = itertools.count(1)
+        self.pool = ProcessPoolExecutor(
+            max_workers=workers, initializer=_init_worker, initargs=(size_mb,)
+        )
+
+    def state(self, game_id: int) -> dict:
+        """Returns the reply describing a game."""
+        game = self.games[game_id]
+        position = game.position
+        return {
+            "game": game_id,
+            "fen": position.fen(),
+            "turn": COLOR_NAMES[position.turn],
+            "legal": [move_uci(move) for move in legal_moves(position)],
+            "result": game_result(position),
+        }
+
+    async def handle(self, request: dict) -> dict:
+        """Returns the reply to one request."""
+        op = request.get("op")
+        if op == "new":
+            return await self.new_game(request.get("fen"), request.get("engine"))
+        game_id = request.get("game")
+        if game_id not in self.games:
+            raise ValueError(f"Unknown game: {game_id}")
+        if op == "move":
+            return await self.play(game_id, str(request.get("move", "")))
+        if op == "state":
+            return self.state(game_id)
+        if op == "pgn":
+            return {"game": game_id, "pgn": self.pgn(game_id)}
+        if op == "close":
+            del self.games[game_id]
+            return {"game": game_id, "closed": True}
+        raise ValueError(f"Unknown op: {op}")
+
+    async def new_game(self, fen: str | None, engine: str | None) -> dict:
+        """Starts a game and plays the engine's first move if it is to move."""
+        if engine not in (None, *COLOR_NAMES):
+            raise ValueError(f"Unknown engine side: {engine}")
+        position = Position.from_fen(fen) if fen else Position.starting()
+        game_id = next(self._ids)
+        self.games[game_id] = ServerGame(
+            position, None if engine is None else COLOR_NAMES.index(engine)
+        )
+        reply = self.state(game_id)
+        return await self.reply_if_engine(game_id, reply)
+
+    async def play(self, game_id: int, uci: str) -> dict:
+        """Plays a client move, then the engine's reply if it is to move."""
+        game = self.games[game_id]
+        if game.thinking or game.position.turn == game.engine:
+            raise ValueError("The engine is to move")
+        if game_result(game.position):
+            raise ValueError("The game is over")
+        try:
+            move = parse_uci(uci)
+        except (ValueError, IndexError, KeyError) as error:
+            raise ValueError(f"Invalid move: {uci}") from error
+        if move not in legal_moves(game.position):
+            raise ValueError(f"Illegal move: {uci}")
+        game.position.make_move(move)
+        return await self.reply_if_engine(game_id, self.state(game_id))
+
+    async def reply_if_engine(self, game_id: int, reply: dict) -> dict:
+        """Adds the engine's move to a reply when the engine is to move."""
+        game = self.games[game_id]
+        if game.position.turn != game.engine or reply["result"]:
+            return reply
+        game.thinking = True
+        try:
+            move = await asyncio.get_running_loop().run_in_executor(
+                self.pool, _engine_move, game.position.copy(), self.limits
+            )
+        finally:
+            game.thinking = False
+        if game_id not in self.games or move is None:
+            return reply
+        game.position.make_move(move)
+        return {**self.state(game_id), "engine_move": move_uci(move)}
+
+    def pgn(self, game_id: int) -> str:
+        """Returns the moves of a game as PGN."""
+        position = self.games[game_id].position.copy()
+        moves = []
+        while position.history:
+            moves.append(position.unmake_move())
+        moves.reverse()
+        headers = {
+            "Event": "TensorChess server game",
+            "Result": game_result(self.games[game_id].position) or "*",
+        }
+        return Game.from_moves(moves, headers, position).pgn()
+
+    async def serve_client(
+        self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter
+    ) -> None:
+        """Answers the requests of one connection until it closes."""
+        try:
+            while line := await reader.readline():
+                try:
+                    reply = await self.handle(json.loads(line))
+                except (ValueError, TypeError, AttributeError) as error:
+                    reply = {"error": str(error)}
+                writer.write(json.dumps(reply).encode() + b"\n")
+                await writer.drain()
+        except (ConnectionError, ValueError):
+            # Dropped connection, or a line longer than LINE_LIMIT.
+            pass
+        finally:
+            writer.close()
+
+    async def serve(
+        self, host: str = "127.0.0.1", port: int = 8765, unix: str | None = None
+    ) -> None:
+        """Accepts connections until cancelled."""
+        if unix:
+            server = await asyncio.start_unix_server(
+                self.serve_client, unix, limit=LINE_LIMIT, backlog=BACKLOG
+            )
+        else:
+            server = await asyncio.start_server(
+                self.serve_client, host, port, limit=LINE_LIMIT, backlog=BACKLOG
+            )
+        try:
+            async with server:
+                await server.serve_forever()
+        finally:
+            self.pool.shutdown(cancel_futures=True)
+
+
+def main(argv: list[str] | None = None) -> None:
+    parser = argparse.ArgumentParser(description="Host games over a socket.")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--unix", help="Unix socket path instead of TCP")
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 1)
+    parser.add_argument("--hash", type=int, default=16, help="table size in MB")
+    parser.add_argument("--depth", type=int)
+    parser.add_argument("--movetime", type=float, default=0.5, help="seconds")
+    args = parser.parse_args(argv)
+
+    limits = SearchLimits(depth=args.depth, movetime=args.movetime)
+    server = GameServer(limits, args.workers, args.hash)
+    try:
+        asyncio.run(server.serve(args.host, args.port, args.unix))
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == "__main__":
+    main()
@@ -4,3 +4,6 @@ class Settings:
         self.bg_color = (225, 225, 225)
         self.square_size = 128
         self.board_pos = (10, 10)
+        self.engine_movetime = 1.0
+        self.highlight_color = (70, 130, 180)
+        self.drag_fps = 60
@@ -0,0 +1,266 @@
+"""Lazy SMP: parallel search over a transposition table in shared memory.
+
+Usage::
+
+    python app/smp.py --threads 1 2 4 8 --depth 5
+
+Helper processes search the same root as the main searcher, half of them
+one ply deeper, and only communicate through the shared table: whatever
+one of them stores, the others find as a cutoff or a table move. The main
+searcher's result is the one returned; helpers are stopped when it ends,
+and a helper that dies, or does not stop in time, is dropped.
+
+Processes rather than threads are used because the interpreter lock
+would serialize threads. The table is lock-free: each slot holds the
+entry's data word and its key XORed with that word, so a slot torn by two
+concurrent writers fails the key check instead of returning a corrupt
+entry.
+"""
+
+from __future__ import annotations
+
+import argparse
+import multiprocessing
+import os
+import queue
+import time
+from multiprocessing import shared_memory
+from typing import Callable
+
+from perft import STANDARD_POSITIONS
+from position import Position
+from search import (
+    ENTRY_SIZE,
+    Searcher,
+    SearchLimits,
+    SearchResult,
+    TranspositionTable,
+)
+
+# Seconds between checks that the helpers being waited for are alive.
+HELPER_POLL_SECONDS = 0.1
+# Seconds stopped helpers get to finish their searches before being killed.
+HELPER_STOP_SECONDS = 5.0
+
+
+class SharedTranspositionTable(TranspositionTable):
+    """A ``TranspositionTable`` stored in a shared memory block.
+
+    The slot layout is the same; only the words live in a block other
+    processes can attach to by name.
+    """
+
+    def __init__(self, size_mb: int = 16, name: str | None = None):
+        """Creates a table, or attaches to the named one of another process."""
+        self.owner = name is None
+        self.memory: shared_memory.SharedMemory | None = None
+        self._attach_to = name
+        super().__init__(size_mb)
+
+    def _allocate(self):
+        """Creates or attaches to the shared block and returns its words."""
+        self.memory = shared_memory.SharedMemory(
+            name=self._attach_to, create=self.owner, size=self.size * ENTRY_SIZE
+        )
+        if self.owner:
+            self.memory.buf[:] = bytes(len(self.memory.buf))
+        return self.memory.buf.cast("Q")
+
+    @property
+    def name(self) -> str:
+        """Returns the name other processes attach with."""
+        return self.memory.name
+
+    def clear(self) -> None:
+        """Removes all entries."""
+        self.memory.buf[:] = bytes(len(self.memory.buf))
+
+    def close(self) -> None:
+        """Detaches from the table, freeing it if this process created it."""
+        self.words.release()
+        self.memory.close()
+        if self.owner:
+            self.memory.unlink()
+
+
+def _helper(
+    table_name: str, size_mb: int, evaluator_factory, jobs, done, stop_event
+) -> None:
+    """Runs helper searches until it receives None.
+
+    Each finished search is reported by putting the process id on done.
+    """
+    searcher = Searcher(SharedTranspositionTable(size_mb, table_name))
+    if evaluator_factory is not None:
+        searcher.evaluate = evaluator_factory()
+    searcher.stop_event = stop_event
+    while True:
+        job = jobs.get()
+        if job is None:
+            break
+        position, limits, start_depth = job
+        searcher.start_depth = start_depth
+        searcher.search(position, limits)
+        done.put(os.getpid())
+    searcher.tt.close()
+
+
+class ParallelSearcher(Searcher):
+    """A Searcher that runs Lazy SMP helpers alongside its own search."""
+
+    def __init__(
+        self,
+        threads: int = 1,
+        size_mb: int = 16,
+        evaluator_factory: Callable[[], Callable[[Position], int]] | None = None,
+        **kwargs,
+    ):
+        """Starts threads - 1 helper processes sharing a new table.
+
+        Args:
+            threads: Main search plus helper processes.
+            size_mb: Size of the shared table.
+            evaluator_factory: Picklable callable returning the static
+                evaluation; the main search and each helper call it once,
+                so every table entry is scored the same way. By default
+                they all use the ``Searcher`` default.
+            kwargs: Other ``Searcher`` arguments, used by the main search.
+        """
+        if "evaluator" in kwargs:
+            raise ValueError("Pass evaluator_factory so helpers evaluate alike")
+        super().__init__(SharedTranspositionTable(size_mb), **kwargs)
+        if evaluator_factory is not None:
+            self.evaluate = evaluator_factory()
+        context = multiprocessing.get_context()
+        self.stop_event = context.Event()
+        self._main_stop = self.stop_event
+        self._done = context.Queue()
+        # Each helper has its own job queue, so a dead helper's job is not
+        # picked up by another one.
+        self._jobs = [context.Queue() for _ in range(threads - 1)]
+        self.helpers = [
+            context.Process(
+                target=_helper,
+                args=(
+                    self.tt.name,
+                    size_mb,
+                    evaluator_factory,
+                    jobs,
+                    self._done,
+                    self.stop_event,
+                ),
+                daemon=True,
+            )
+            for jobs in self._jobs
+        ]
+        for helper in self.helpers:
+            helper.start()
+
+    def search(
+        self, position: Position, limits: SearchLimits | None = None, on_iteration=None
+    ) -> SearchResult:
+        """Searches with every helper and returns the main search's result."""
+        limits = limits or SearchLimits()
+        self._main_stop.clear()
+        # Helpers must not stop on the main search's limits, only when told.
+        helper_limits = SearchLimits(
+            depth=limits.depth + 1 if limits.depth else None,
+            searchmoves=limits.searchmoves,
+        )
+        # The queue pickles in a background thread, so hand it a copy the
+        # main search will not be changing.
+        for index, jobs in enumerate(self._jobs):
+            jobs.put((position.copy(), helper_limits, 1 + index % 2))
+        # The main search watches its own stop flag, not the helpers' one.
+        self.stop_event = None
+        try:
+            return super().search(position, limits, on_iteration)
+        finally:
+            self.stop_event = self._main_stop
+            self._main_stop.set()
+            self._wait_for_helpers()
+
+    def _wait_for_helpers(self) -> None:
+        """Waits for every helper to finish its search.
+
+        Helpers that die, or are still searching ``HELPER_STOP_SECONDS``
+        after being stopped, are dropped so the next search runs without
+        them.
+        """
+        waiting = {helper.pid for helper in self.helpers}
+        deadline = time.perf_counter() + HELPER_STOP_SECONDS
+        while waiting:
+            try:
+                waiting.discard(self._done.get(timeout=HELPER_POLL_SECONDS))
+            except queue.Empty:
+                timed_out = time.perf_counter() > deadline
+                for helper in list(self.helpers):
+                    if helper.pid in waiting and (timed_out or not helper.is_alive()):
+                        waiting.discard(helper.pid)
+                        self._drop(helper)
+
+    def _drop(self, helper: multiprocessing.Process) -> None:
+        """Kills a helper and forgets it."""
+        index = self.helpers.index(helper)
+        helper.kill()
+        helper.join()
+        del self.helpers[index]
+        self._jobs.pop(index).close()
+
+    def stop(self) -> None:
+        """Asks the main search and the helpers to return."""
+        super().stop()
+        self._main_stop.set()
+
+    def close(self) -> None:
+        """Stops the helper processes and frees the shared table."""
+        self._main_stop.set()
+        for jobs in self._jobs:
+            jobs.put(None)
+        for helper in self.helpers:
+            helper.join()
+        self.helpers = []
+        self.tt.close()
+
+    def __enter__(self) -> ParallelSearcher:
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        self.close()
+
+
+def benchmark(threads: int, depth: int, size_mb: int = 64) -> tuple[float, int]:
+    """Returns the time and main-search nodes to reach depth on the
+    standard perft positions.
+    """
+    seconds = 0.0
+    nodes = 0
+    with ParallelSearcher(threads, size_mb) as searcher:
+        for fen, _ in STANDARD_POSITIONS.values():
+            searcher.tt.clear()
+            start = time.perf_counter()
+            result = searcher.search(Position.from_fen(fen), SearchLimits(depth=depth))
+            seconds += time.perf_counter() - start
+            nodes += result.nodes
+    return seconds, nodes
+
+
+def main(argv: list[str] | None = None) -> None:
+    parser = argparse.ArgumentParser(description="Measure Lazy SMP scaling.")
+    parser.add_argument("--threads", type=int, nargs="+", default=[1, 2, 4])
+    parser.add_argument("--depth", type=int, default=5)
+    parser.add_argument("--hash", type=int, default=64, help="table size in MB")
+    args = parser.parse_args(argv)
+
+    baseline = None
+    for threads in args.threads:
+        seconds, nodes = benchmark(threads, args.depth, args.hash)
+        baseline = baseline or seconds
+        print(
+            f"threads {threads:3d}  time {seconds:8.2f}s  "
+            f"main nodes {nodes:9d}  speedup {baseline / seconds:5.2f}x"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -1,7 +1,16 @@
+from functools import lru_cache
+from itertools import product
+
 import pygame
 from pygame import base
 from pygame import constants
 
+PIECES_FILENAME = "graphics/chess_pieces.bmp"
+PIECE_COLORS = ["black", "white"]
+PIECE_NAMES = ["king", "queen", "rook", "bishop", "knight", "pawn"]
+# Fraction of a square the longer side of a sprite scaled for diagrams spans.
+PIECE_SCALE = 0.75
+
 
 class SpriteSheet:
     def __init__(self, filename):
@@ -19,7 +28,7 @@ class SpriteSheet:
         image = pygame.Surface(rect.size).convert()
         image.blit(self.sheet, (0, 0), rect)
         if colorkey is not None:
-            if colorkey is -1:
+            if colorkey == -1:
                 colorkey = image.get_at((0, 0))
             image.set_colorkey(colorkey, constants.RLEACCEL)
         return image
@@ -67,3 +76,52 @@ class SpriteSheet:
         ]
 
         return self.images_at(rects, colorkey=(255, 0, 255))
+
+
+class SpriteAtlas:
+    """Piece sprites sliced from one sheet, cached per (color, name, size).
+
+    The sheet is read and converted on the first request only. A size of
+    None returns the sprite at its native size; any other size returns it
+    scaled to fit squares of that many pixels.
+    """
+
+    def __init__(self, filename: str = PIECES_FILENAME):
+        self.filename = filename
+        self._sprites: dict[tuple[str, str, int], pygame.Surface] = {}
+
+    def _load(self) -> None:
+        """Slices every sprite from the sheet."""
+        sheet = SpriteSheet(self.filename)
+        self._sprites.update(
+            (key + (None,), image)
+            for key, image in zip(
+                product(PIECE_COLORS, PIECE_NAMES),
+                sheet.load_grid_images(2, 6, 64, 72, 68, 48),
+            )
+        )
+
+    def sprite(self, color: str, name: str, size: int = None) -> pygame.Surface:
+        """Returns the sprite of a piece, scaled for squares of size pixels."""
+        key = (color, name, size)
+        image = self._sprites.get(key)
+        if image is None:
+            if (color, name, None) not in self._sprites:
+                self._load()
+            image = self._sprites[(color, name, None)]
+            if size is not None:
+                width, height = image.get_size()
+                factor = size * PIECE_SCALE / max(width, height)
+                scaled = pygame.transform.scale(
+                    image, (round(width * factor), round(height * factor))
+                )
+                scaled.set_colorkey(image.get_colorkey(), constants.RLEACCEL)
+                image = scaled
+            self._sprites[key] = image
+        return image
+
+
+@lru_cache(maxsize=None)
+def get_atlas(filename: str = PIECES_FILENAME) -> SpriteAtlas:
+    """Returns the process-wide atlas of a sprite sheet."""
+    return SpriteAtlas(filename)
@@ -0,0 +1,151 @@
+"""Syzygy endgame tablebase probing.
+
+The WDL (``.rtbw``) and DTZ (``.rtbz``) files of local Syzygy directories
+are probed through python-chess, which is only imported when a Tablebase
+is opened. WDL values are, for the side to move, 2 for a win, 1 for a win
+that the 50-move rule turns into a draw, 0 for a draw, -1 for a loss saved
+by the 50-move rule and -2 for a loss. DTZ values count the plies to the
+next capture or pawn move under optimal play, negative when losing, and
+may overstate the distance by one ply.
+
+Converting a position for python-chess costs far more than a search
+node, so probe results are kept in an LRU cache keyed by the position's
+Zobrist key, and positions with more pieces than the largest table (or
+with castling rights, which Syzygy tables exclude) are answered without
+probing at all.
+"""
+
+from __future__ import annotations
+
+import glob
+import os
+from collections import OrderedDict
+
+from movegen import checkers, legal_moves
+from position import Position
+
+WDL_EXTENSION = ".rtbw"
+DTZ_EXTENSION = ".rtbz"
+# Halfmove clock at which either side may claim a draw.
+FIFTY_MOVE_PLIES = 100
+
+
+class Tablebase:
+    """Probes the Syzygy tables of directories through an LRU result cache."""
+
+    def __init__(self, *directories: str, cache_size: int = 65536):
+        """Opens the table files of the directories.
+
+        Args:
+            directories: Directories searched for ``.rtbw`` and ``.rtbz``
+                files.
+            cache_size: WDL and DTZ probe results kept in memory.
+
+        Raises:
+            ValueError: A directory holds no WDL tables.
+        """
+        # pylint: disable-next=import-outside-toplevel
+        import chess.syzygy
+
+        self.tables = chess.syzygy.Tablebase()
+        # Positions with more pieces are not covered by any table.
+        self.max_pieces = 0
+        for directory in directories:
+            paths = glob.glob(os.path.join(directory, "*" + WDL_EXTENSION))
+            if not paths:
+                raise ValueError(f"{directory} holds no Syzygy tables")
+            self.tables.add_directory(directory)
+            for path in paths:
+                name = os.path.basename(path)[: -len(WDL_EXTENSION)]
+                self.max_pieces = max(self.max_pieces, len(name.replace("v", "")))
+        self.cache_size = cache_size
+        self.hits = 0
+        self.misses = 0
+        self._cache: OrderedDict[tuple[int, bool], int | None] = OrderedDict()
+
+    def close(self) -> None:
+        """Closes the table files."""
+        self.tables.close()
+
+    def _probe(self, position: Position, dtz: bool) -> int | None:
+        """Returns a WDL or DTZ value, going through the result cache."""
+        if position.castling or position.occupancy.bit_count() > self.max_pieces:
+            return None
+        key = (position.key, dtz)
+        if key in self._cache:
+            self.hits += 1
+            self._cache.move_to_end(key)
+            return self._cache[key]
+        self.misses += 1
+        # pylint: disable-next=import-outside-toplevel
+        import chess
+
+        board = chess.Board(position.fen())
+        value = self.tables.get_dtz(board) if dtz else self.tables.get_wdl(board)
+        self._cache[key] = value
+        if len(self._cache) > self.cache_size:
+            self._cache.popitem(last=False)
+        return value
+
+    def probe_wdl(self, position: Position) -> int | None:
+        """Returns the WDL value of a position, None if not covered."""
+        return self._probe(position, False)
+
+    def probe_dtz(self, position: Position) -> int | None:
+        """Returns the DTZ value of a position, None if not covered."""
+        return self._probe(position, True)
+
+    def probe(self, position: Position) -> int | None:
+        """Returns 2 for a win, 0 for a draw and -2 for a loss, or None.
+
+        Unlike ``probe_wdl`` this counts the halfmove clock: a win or loss
+        whose next capture or pawn move may come after the clock reaches
+        ``FIFTY_MOVE_PLIES`` is None, as the rounding of DTZ values leaves
+        the result unknown.
+        """
+        wdl = self.probe_wdl(position)
+        if wdl is None or abs(wdl) < 2:
+            return None if wdl is None else 0
+        if position.halfmove_clock:
+            dtz = self.probe_dtz(position)
+            if dtz is None or position.halfmove_clock + abs(dtz) > FIFTY_MOVE_PLIES:
+                return None
+        return wdl
+
+    def best_move(self, position: Position) -> tuple[int, int] | None:
+        """Returns the move that best keeps the result, and the result.
+
+        Wins go for the nearest capture, pawn move or mate, and losses
+        for the farthest one, so the result is reached before the 50-move
+        rule can change it. Returns None unless every move is covered.
+        """
+        best = None
+        for move in legal_moves(position):
+            position.make_move(move)
+            try:
+                rank = self._rank(position)
+            finally:
+                position.unmake_move()
+            if rank is None:
+                return None
+            if best is None or rank > best[1]:
+                best = (move, rank)
+        return None if best is None else (best[0], best[1][0])
+
+    def _rank(self, position: Position) -> tuple[int, int] | None:
+        """Returns the result and ordering of the move just played.
+
+        Among wins the mates come first, then the moves that zero the
+        halfmove clock, then the ones with the shortest DTZ; losses are
+        ordered the other way round.
+        """
+        value = self.probe(position)
+        if value is None or not value:
+            return value if value is None else (0, 0)
+        if checkers(position) and not legal_moves(position):
+            distance = -1
+        elif not position.halfmove_clock:
+            distance = 0
+        else:
+            distance = abs(self.probe_dtz(position))
+        return (-value, -distance) if value < 0 else (-value, distance)
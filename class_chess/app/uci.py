@@ -0,0 +1,311 @@
+"""Universal Chess Interface (UCI) front end for the engine.
+
+Usage::
+
+    python app/uci.py
+
+Commands are read from stdin by an asyncio loop while searches run in a
+worker thread, so ``isready`` and ``stop`` are answered at once even in
+the middle of a search. Each completed iteration is reported as an
+``info`` line per principal variation.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import sys
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+from book import PolyglotBook
+from movegen import legal_moves, move_uci, parse_uci
+from position import WHITE, Position
+from search import (
+    MATE_BOUND,
+    MATE_SCORE,
+    Searcher,
+    SearchLimits,
+    SearchResult,
+    TranspositionTable,
+)
+from smp import ParallelSearcher
+from tablebase import Tablebase
+
+ENGINE_NAME = "TensorChess"
+ENGINE_AUTHOR = "Antonio Zea Jr"
+# Seconds kept in reserve so the move reaches the GUI before the flag falls.
+MOVE_OVERHEAD = 0.05
+DEFAULT_MOVES_TO_GO = 30
+# ``go`` parameters followed by an integer.
+GO_VALUES = (
+    "wtime",
+    "btime",
+    "winc",
+    "binc",
+    "movestogo",
+    "depth",
+    "nodes",
+    "mate",
+    "movetime",
+)
+
+
+class UCIEngine:
+    """Keeps the engine state driven by UCI commands."""
+
+    def __init__(self, output=None):
+        """Initializes the engine with default options.
+
+        Args:
+            output: Text stream the engine writes to, stdout by default.
+        """
+        self.output = output or sys.stdout
+        self.options = {
+            "Hash": 16,
+            "Threads": 1,
+            "MultiPV": 1,
+            "BookFile": "",
+            "TablebasePath": "",
+        }
+        self.position = Position.starting()
+        self.searcher = self.make_searcher()
+        self.executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="search")
+        self.search_task: asyncio.Future | None = None
+        self.infinite = False
+        self.released = asyncio.Event()
+        self._write_lock = threading.Lock()
+
+    def make_searcher(self) -> Searcher:
+        """Returns a searcher for the Hash and Threads options."""
+        if self.options["Threads"] > 1:
+            return ParallelSearcher(self.options["Threads"], self.options["Hash"])
+        return Searcher(TranspositionTable(self.options["Hash"]))
+
+    def close_searcher(self) -> None:
+        """Releases the helper processes of a parallel searcher."""
+        if isinstance(self.searcher, ParallelSearcher):
+            self.searcher.close()
+
+    def send(self, line: str) -> None:
+        """Writes one line to the GUI."""
+        with self._write_lock:
+            self.output.write(line + "\n")
+            self.output.flush()
+
+    async def run(self, reader: asyncio.StreamReader) -> None:
+        """Handles commands until ``quit`` or end of input."""
+        while True:
+            line = await reader.readline()
+            if not line:
+                break
+            if not await self.handle(line.decode().strip()):
+                break
+        await self.stop()
+        self.executor.shutdown()
+        self.close_searcher()
+
+    async def handle(self, line: str) -> bool:
+        """Handles one command; returns False on ``quit``.
+
+        Malformed arguments and unreadable files are reported with an
+        ``info string`` line and the command is ignored.
+        """
+        try:
+            return await self.dispatch(line)
+        except (ValueError, OSError) as error:
+            self.send(f"info string error: {error}")
+            return True
+
+    async def dispatch(self, line: str) -> bool:
+        """Runs one command; returns False on ``quit``."""
+        command, _, arguments = line.partition(" ")
+        if command == "uci":
+            self.send(f"id name {ENGINE_NAME}")
+            self.send(f"id author {ENGINE_AUTHOR}")
+            self.send("option name Hash type spin default 16 min 1 max 65536")
+            self.send("option name Threads type spin default 1 min 1 max 512")
+            self.send("option name MultiPV type spin default 1 min 1 max 256")
+            self.send("option name BookFile type string default <empty>")
+            self.send("option name TablebasePath type string default <empty>")
+            self.send("uciok")
+        elif command == "isready":
+            self.send("readyok")
+        elif command == "setoption":
+            await self.stop()
+            self.set_option(arguments)
+        elif command == "ucinewgame":
+            await self.stop()
+            self.searcher.tt.clear()
+        elif command == "position":
+            await self.stop()
+            self.set_position(arguments)
+        elif command == "go":
+            await self.stop()
+            self.go(arguments)
+        elif command == "stop":
+            await self.stop()
+        elif command == "quit":
+            return False
+        return True
+
+    def set_option(self, arguments: str) -> None:
+        """Applies ``name <name> [value <value>]``."""
+        name, _, value = arguments.removeprefix("name ").partition(" value ")
+        name, value = name.strip(), value.strip()
+        if name not in self.options:
+            self.send(f"info string unknown option {name}")
+            return
+        if isinstance(self.options[name], int):
+            value = max(1, int(value))
+        elif value == "<empty>":
+            value = ""
+        # Files are opened before the option changes, so a bad path keeps
+        # the previous value.
+        if name == "BookFile":
+            self.searcher.book = PolyglotBook(value) if value else None
+        elif name == "TablebasePath":
+            self.searcher.tablebase = Tablebase(*value.split(":")) if value else None
+        self.options[name] = value
+        if name in ("Hash", "Threads"):
+            book, tablebase = self.searcher.book, self.searcher.tablebase
+            self.close_searcher()
+            self.searcher = self.make_searcher()
+            self.searcher.book, self.searcher.tablebase = book, tablebase
+
+    def set_position(self, arguments: str) -> None:
+        """Applies ``startpos|fen <fen> [moves <move>...]``."""
+        setup, _, moves = arguments.partition(" moves ")
+        if setup.startswith("fen "):
+            self.position = Position.from_fen(setup[4:])
+        else:
+            self.position = Position.starting()
+        for uci in moves.split():
+            move = parse_uci(uci)
+            if move not in legal_moves(self.position):
+                self.send(f"info string illegal move {uci}")
+                break
+            self.position.make_move(move)
+
+    def limits(self, arguments: str) -> SearchLimits:
+        """Returns the search limits of ``go`` arguments."""
+        tokens = arguments.split()
+        values: dict[str, int] = {}
+        searchmoves: list[int] = []
+        self.infinite = False
+        index = 0
+        while index < len(tokens):
+            token = tokens[index]
+            if token == "infinite":
+                self.infinite = True
+            elif token == "searchmoves":
+                while index + 1 < len(tokens) and tokens[index + 1][0] in "abcdefgh":
+                    index += 1
+                    searchmoves.append(parse_uci(tokens[index]))
+            elif token in GO_VALUES:
+                if (
+                    index + 1 == len(tokens)
+                    or not tokens[index + 1].lstrip("-").isdigit()
+                ):
+                    raise ValueError(f"Invalid go {token} value")
+                index += 1
+                values[token] = int(tokens[index])
+            index += 1
+
+        movetime = values["movetime"] / 1000 if "movetime" in values else None
+        us = "w" if self.position.turn == WHITE else "b"
+        if movetime is None and f"{us}time" in values and not self.infinite:
+            remaining = values[f"{us}time"] / 1000
+            increment = values.get(f"{us}inc", 0) / 1000
+            moves_to_go = values.get("movestogo", DEFAULT_MOVES_TO_GO)
+            movetime = remaining / moves_to_go + increment * 0.75
+            movetime = max(0.01, min(movetime, remaining - MOVE_OVERHEAD))
+        depth = values.get("depth")
+        if "mate" in values:
+            # A mate in N moves is found within 2N - 1 plies.
+            mate_depth = max(1, 2 * values["mate"] - 1)
+            depth = min(depth, mate_depth) if depth else mate_depth
+        return SearchLimits(
+            depth=depth,
+            nodes=values.get("nodes"),
+            movetime=movetime,
+            multipv=self.options["MultiPV"],
+            searchmoves=searchmoves or None,
+        )
+
+    def go(self, arguments: str) -> None:
+        """Starts a search in the worker thread."""
+        limits = self.limits(arguments)
+        self.released.clear()
+        self.search_task = asyncio.create_task(
+            self.search(self.position.copy(), limits)
+        )
+
+    async def search(self, position: Position, limits: SearchLimits) -> None:
+        """Searches and sends the best move, after ``stop`` if infinite."""
+        loop = asyncio.get_running_loop()
+        result: SearchResult = await loop.run_in_executor(
+            self.executor, self.searcher.search, position, limits, self.report
+        )
+        if self.infinite:
+            await self.released.wait()
+        if result.move is None:
+            self.send("bestmove 0000")
+        elif len(result.pv) > 1:
+            self.send(
+                f"bestmove {move_uci(result.move)} ponder {move_uci(result.pv[1])}"
+            )
+        else:
+            self.send(f"bestmove {move_uci(result.move)}")
+
+    async def stop(self) -> None:
+        """Stops a running search and waits for its best move to be sent."""
+        task = self.search_task
+        if task is None:
+            return
+        self.released.set()
+        # The flag is cleared when a search starts, so repeat it until the
+        # worker thread has picked the search up and returned.
+        while not task.done():
+            self.searcher.stop()
+            await asyncio.wait([task], timeout=0.01)
+        self.search_task = None
+
+    def report(self, result: SearchResult) -> None:
+        """Sends the ``info`` line of a finished iteration."""
+        if abs(result.score) > MATE_BOUND:
+            plies = MATE_SCORE - abs(result.score)
+            moves = (plies + 1) // 2
+            score = f"mate {moves if result.score > 0 else -moves}"
+        else:
+            score = f"cp {result.score}"
+        self.send(
+            f"info depth {result.depth} multipv {result.multipv} score {score} "
+            f"nodes {result.nodes} nps {result.nps:.0f} "
+            f"time {int(result.seconds * 1000)} "
+            f"hashfull {self.searcher.tt.hashfull()} "
+            f"pv {' '.join(move_uci(move) for move in result.pv)}"
+        )
+
+
+async def stdin_reader() -> asyncio.StreamReader:
+    """Returns an asyncio reader over stdin."""
+    loop = asyncio.get_running_loop()
+    reader = asyncio.StreamReader()
+    await loop.connect_read_pipe(
+        lambda: asyncio.StreamReaderProtocol(reader), sys.stdin
+    )
+    return reader
+
+
+async def serve() -> None:
+    """Runs the engine over stdin and stdout."""
+    engine = UCIEngine()
+    await engine.run(await stdin_reader())
+
+
+def main() -> None:
+    asyncio.run(serve())
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,41 @@
+"""Zobrist hashing keys for positions.
+
+Keys are drawn from a fixed seed so hashes are stable across processes and
+runs, which lets them be stored on disk and shared between workers.
+"""
+
+from __future__ import annotations
+
+import random
+from typing import TYPE_CHECKING
+
+if TYPE_CHECKING:
+    from position import Position
+
+_random = random.Random(0x7E4502C4E55)
+
+# PIECE_KEYS[color][piece_type][square]
+PIECE_KEYS = [
+    [[_random.getrandbits(64) for _ in range(64)] for _ in range(6)] for _ in range(2)
+]
+# Indexed by the full 4-bit castling rights mask.
+CASTLING_KEYS = [_random.getrandbits(64) for _ in range(16)]
+# Indexed by the file of the en passant square.
+EP_KEYS = [_random.getrandbits(64) for _ in range(8)]
+BLACK_TO_MOVE_KEY = _random.getrandbits(64)
+
+del _random
+
+
+def compute_key(position: Position) -> int:
+    """Computes the Zobrist key of a position from scratch."""
+    key = 0
+    for sq, piece in enumerate(position.mailbox):
+        if piece:
+            key ^= PIECE_KEYS[piece[0]][piece[1]][sq]
+    key ^= CASTLING_KEYS[position.castling]
+    if position.ep_square is not None:
+        key ^= EP_KEYS[position.ep_square & 7]
+    if position.turn:
+        key ^= BLACK_TO_MOVE_KEY
+    return key
@@ -0,0 +1,7 @@
+def pytest_addoption(parser):
+    parser.addoption(
+        "--perft-depth",
+        type=int,
+        default=3,
+        help="maximum perft depth checked against the reference counts",
+    )
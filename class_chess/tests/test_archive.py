@@ -0,0 +1,97 @@
+import pytest
+
+from archive import Archive, ArchiveWriter, decode_moves, encode_moves, write_archive
+from movegen import parse_uci
+from perft import STANDARD_POSITIONS
+from pgn import Game
+from position import Position
+
+KIWIPETE_FEN = STANDARD_POSITIONS["kiwipete"][0]
+
+
+def uci_game(line, headers, fen=None):
+    start = Position.from_fen(fen) if fen else Position.starting()
+    return Game.from_moves([parse_uci(uci) for uci in line.split()], headers, start)
+
+
+GAMES = [
+    uci_game(
+        "e2e4 e7e5 g1f3 b8c6 f1b5 a7a6 b5a4 g8f6 e1g1 f8e7",
+        {"White": "Ruy", "Black": "López", "Result": "1-0"},
+    ),
+    uci_game("e1g1 a6e2 d5e6 e2f1", {"Event": "Kiwipete", "Result": "*"}, KIWIPETE_FEN),
+    uci_game("", {"Result": "1/2-1/2"}),
+    uci_game("e7e8q", {"Result": "0-1"}, "7k/4P3/8/8/8/8/8/K7 w - - 0 1"),
+]
+
+
+def test_move_bytes_round_trip():
+    position = Position.from_fen(KIWIPETE_FEN)
+    moves = GAMES[1].moves
+    data = encode_moves(position, moves)
+    assert len(data) == len(moves)
+    assert decode_moves(position, data) == moves
+    assert position.fen() == KIWIPETE_FEN
+
+
+def test_archive_round_trip(tmp_path):
+    path = str(tmp_path / "games.tca")
+    write_archive(path, GAMES)
+    with Archive(path) as archive:
+        assert len(archive) == len(GAMES)
+        for index, game in enumerate(GAMES):
+            assert archive.plies(index) == len(game.moves)
+            assert archive.moves(index) == game.moves
+            assert archive.headers(index) == game.headers
+            assert archive[index].pgn() == game.pgn()
+        assert [game.moves for game in archive] == [game.moves for game in GAMES]
+
+
+def test_archive_random_access(tmp_path):
+    path = str(tmp_path / "games.tca")
+    write_archive(path, GAMES)
+    with Archive(path) as archive:
+        assert archive.moves(0, plies=3) == GAMES[0].moves[:3]
+        expected = Position.starting()
+        for move in GAMES[0].moves[:4]:
+            expected.make_move(move)
+        assert archive.position(0, 4).fen() == expected.fen()
+        assert archive.position(1, 0).fen() == KIWIPETE_FEN
+
+
+@pytest.mark.parametrize("index", [-1, len(GAMES), len(GAMES) + 5])
+def test_archive_rejects_bad_index(tmp_path, index):
+    path = str(tmp_path / "games.tca")
+    write_archive(path, GAMES)
+    with Archive(path) as archive:
+        for read in (
+            archive.headers,
+            archive.moves,
+            archive.plies,
+            archive.__getitem__,
+        ):
+            with pytest.raises(IndexError, match="out of range"):
+                read(index)
+
+
+def test_tags_with_separators_round_trip(tmp_path):
+    headers = {
+        "Event": "Split\tby a tab",
+        "Annotator": "Line one\nline two\r",
+        "Site": "C:\\games\\new",
+        "Result": "1-0",
+    }
+    path = str(tmp_path / "games.tca")
+    write_archive(path, [uci_game("e2e4", headers), GAMES[0]])
+    with Archive(path) as archive:
+        assert archive.headers(0) == headers
+        assert archive.headers(1) == GAMES[0].headers
+
+
+def test_failed_write_leaves_no_archive(tmp_path):
+    path = tmp_path / "games.tca"
+    with pytest.raises(RuntimeError):
+        with ArchiveWriter(str(path)) as writer:
+            writer.add(GAMES[0])
+            raise RuntimeError("import failed")
+    assert list(tmp_path.iterdir()) == []
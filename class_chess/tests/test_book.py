@@ -0,0 +1,80 @@
+import random
+
+import pytest
+
+from book import ENTRY, PolyglotBook, polyglot_key
+from movegen import move_uci, parse_uci
+from perft import STANDARD_POSITIONS
+from position import Position
+
+KIWIPETE_FEN = STANDARD_POSITIONS["kiwipete"][0]
+
+# Reference hashes from the Polyglot book format specification.
+REFERENCE_KEYS = [
+    ("", 0x463B96181691FC9C),
+    ("e2e4", 0x823C9B50FD114196),
+    ("e2e4 d7d5", 0x0756B94461C50FB0),
+    ("e2e4 d7d5 e4e5", 0x662FAFB965DB29D4),
+    ("e2e4 d7d5 e4e5 f7f5", 0x22A48B5A8E47FF78),
+    ("e2e4 d7d5 e4e5 f7f5 e1e2", 0x652A607CA3F242C1),
+    ("e2e4 d7d5 e4e5 f7f5 e1e2 e8f7", 0x00FDD303C946BDD9),
+    ("a2a4 b7b5 h2h4 b5b4 c2c4", 0x3C8123EA7B067637),
+    ("a2a4 b7b5 h2h4 b5b4 c2c4 b4c3 a1a3", 0x5C3F9B829B279560),
+]
+
+
+def book_move(uci):
+    """Returns the Polyglot encoding of a UCI move (no promotion)."""
+    move = parse_uci(uci)
+    return (move & 63) << 6 | move >> 6 & 63
+
+
+@pytest.mark.parametrize("line, key", REFERENCE_KEYS)
+def test_polyglot_key(line, key):
+    position = Position.starting()
+    for uci in line.split():
+        position.make_move(parse_uci(uci))
+    assert polyglot_key(position) == key
+
+
+@pytest.fixture
+def book(tmp_path):
+    kiwipete = polyglot_key(Position.from_fen(KIWIPETE_FEN))
+    start = polyglot_key(Position.starting())
+    entries = sorted(
+        [
+            (start, book_move("e2e4"), 10, 0),
+            (start, book_move("d2d4"), 5, 0),
+            (start, book_move("e2e5"), 50, 0),  # illegal, skipped
+            (start, book_move("a2a3"), 0, 0),  # never chosen
+            # Castling is stored as the king taking its own rook.
+            (kiwipete, book_move("e1h1"), 1, 0),
+        ]
+    )
+    path = tmp_path / "book.bin"
+    path.write_bytes(b"".join(ENTRY.pack(*entry) for entry in entries))
+    with PolyglotBook(str(path)) as book:
+        yield book
+
+
+def test_book_entries(book):
+    entries = book.entries(Position.starting())
+    assert [(move_uci(entry.move), entry.weight) for entry in entries] == [
+        ("e2e4", 10),
+        ("d2d4", 5),
+        ("a2a3", 0),
+    ]
+    assert move_uci(book.choose(Position.starting())) == "e2e4"
+    picks = {
+        move_uci(book.choose(Position.starting(), random.Random(seed)))
+        for seed in range(50)
+    }
+    assert picks == {"e2e4", "d2d4"}
+
+
+def test_book_castling_and_misses(book):
+    assert move_uci(book.choose(Position.from_fen(KIWIPETE_FEN))) == "e1g1"
+    position = Position.starting()
+    position.make_move(parse_uci("g1f3"))
+    assert book.entries(position) == []
+    assert book.choose(position) is None
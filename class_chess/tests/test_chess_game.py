@@ -0,0 +1,68 @@
+import os
+
+os.environ.setdefault("SDL_VIDEODRIVER", "dummy")
+
+# pylint: disable=wrong-import-position
+import pytest
+from pygame import constants, display, event
+
+from chess_game import ENGINE_DONE, ChessGame
+from movegen import parse_uci
+
+
+@pytest.fixture
+def game():
+    game = ChessGame()
+    game.settings.engine_movetime = 0.2
+    yield game
+    game._stop_engine()
+    game.executor.shutdown()
+
+
+def press(game, key):
+    game._check_events([event.Event(constants.KEYDOWN, key=key)])
+
+
+def wait_for_engine(game):
+    """Handles events until the engine search has been applied."""
+    while game.engine_search is not None:
+        game._check_events([event.wait(1000)])
+
+
+def test_engine_move_does_not_block_events(game):
+    press(game, constants.K_e)
+    assert game.engine_search is not None
+    assert not game.chess_board.position.history
+    wait_for_engine(game)
+    assert len(game.chess_board.position.history) == 1
+
+
+def test_engine_move_is_dropped_after_undo(game):
+    press(game, constants.K_e)
+    wait_for_engine(game)
+    press(game, constants.K_e)
+    press(game, constants.K_u)
+    wait_for_engine(game)
+    assert not game.chess_board.position.history
+    assert ENGINE_DONE not in [pending.type for pending in event.get()]
+
+
+def test_event_redraws_only_affected_squares(game, monkeypatch):
+    game.chess_board.play_move(parse_uci("e2e4"))
+    game._update_screen()
+    updated = []
+    monkeypatch.setattr(display, "update", updated.append)
+    event.clear()
+
+    # With nothing to redraw the loop sleeps until this event arrives.
+    event.post(event.Event(constants.KEYDOWN, key=constants.K_u))
+    game._check_events(game._wait_for_events())
+    game._update_screen()
+
+    board = game.chess_board
+    expected = [board.grid[4][6].rect, board.grid[4][4].rect]
+    assert len(updated) == 1
+    assert sorted(map(tuple, updated[0])) == sorted(
+        tuple(rect.move(board.board_pos)) for rect in expected
+    )
+    assert not game.dirty_rects and not board.dirty_squares
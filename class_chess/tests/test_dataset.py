@@ -0,0 +1,105 @@
+import itertools
+import tracemalloc
+
+import numpy as np
+import pytest
+
+from dataset import ShardDataset, shard_paths
+from movegen import legal_moves
+from position import Position
+from records import RECORD_DTYPE, ShardReader, make_record, read_shard, write_shard
+
+
+def sample_records(count):
+    position = Position.starting()
+    moves = legal_moves(position)
+    return np.array(
+        [make_record(position, moves, np.ones(len(moves)), 1) for _ in range(count)]
+    )
+
+
+@pytest.mark.parametrize("extension", ["bin", "npz"])
+def test_shard_round_trip(tmp_path, extension):
+    records = sample_records(5)
+    path = str(tmp_path / f"shard-000000.{extension}")
+    write_shard(path, records)
+    np.testing.assert_array_equal(read_shard(path), records)
+
+
+def test_directory_includes_every_shard_format(tmp_path):
+    write_shard(str(tmp_path / "shard-000000.bin"), sample_records(3))
+    write_shard(str(tmp_path / "shard-000001.npz"), sample_records(4))
+    assert len(shard_paths(str(tmp_path))) == 2
+    dataset = ShardDataset(str(tmp_path), batch_size=2, block_size=2)
+    assert len(dataset) == 7
+    assert sum(len(batch.value) for batch in dataset) == 7
+
+
+def test_empty_directory_raises(tmp_path):
+    with pytest.raises(ValueError):
+        ShardDataset(str(tmp_path))
+
+
+@pytest.mark.parametrize("extension", ["bin", "npz"])
+def test_reader_blocks_match_shard(tmp_path, extension):
+    records = sample_records(10)
+    records["halfmove_clock"] = np.arange(10)
+    path = str(tmp_path / f"shard-000000.{extension}")
+    write_shard(path, records)
+    reader = ShardReader(path)
+    assert len(reader) == 10
+    for start in [4, 8, 0, 6]:
+        np.testing.assert_array_equal(reader.read(start, 3), records[start : start + 3])
+    reader.close()
+
+
+def test_shards_are_not_loaded_up_front(tmp_path):
+    shard_size = 60000
+    for index in range(4):
+        extension = "npz" if index % 2 else "bin"
+        path = str(tmp_path / f"shard-{index:06d}.{extension}")
+        write_shard(path, np.repeat(sample_records(1), shard_size))
+    data_size = 4 * shard_size * RECORD_DTYPE.itemsize
+    tracemalloc.start()
+    try:
+        dataset = ShardDataset(
+            str(tmp_path), batch_size=64, shuffle_window=1024, block_size=512
+        )
+        _, opened = tracemalloc.get_traced_memory()
+        tracemalloc.reset_peak()
+        records = sum(len(batch.value) for batch in dataset)
+        _, iterated = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+    assert records == len(dataset) == 4 * shard_size
+    assert opened < data_size / 16
+    assert iterated < data_size / 4
+
+
+def test_compressed_shards_are_read_forward(tmp_path, monkeypatch):
+    for index, extension in enumerate(["bin", "npz", "bin", "npz"]):
+        records = sample_records(400)
+        records["halfmove_clock"] = np.arange(400) % 256
+        write_shard(str(tmp_path / f"shard-{index:06d}.{extension}"), records)
+    reads = []
+    read = ShardReader.read
+
+    def recording_read(self, start, count):
+        reads.append((self.path, start))
+        return read(self, start, count)
+
+    monkeypatch.setattr(ShardReader, "read", recording_read)
+    dataset = ShardDataset(str(tmp_path), shuffle_window=64, block_size=16)
+    assert sum(len(batch.value) for batch in dataset) == 1600
+
+    # Each shard is read in one run, and npz shards only move forward.
+    paths = [path for path, _ in reads]
+    runs = [path for path, _ in itertools.groupby(paths)]
+    assert sorted(runs) == sorted(set(paths)) and len(runs) == 4
+    for path in set(paths):
+        starts = [start for read_path, start in reads if read_path == path]
+        assert sorted(starts) == list(range(0, 400, 16))
+        if path.endswith(".npz"):
+            assert starts == sorted(starts)
+        else:
+            assert starts != sorted(starts)
@@ -0,0 +1,125 @@
+import numpy as np
+import pytest
+
+from encoder import (
+    CASTLING_PLANE,
+    EP_PLANE,
+    PLANES,
+    REPETITION_PLANE,
+    TURN_PLANE,
+    BoardEncoder,
+)
+from movegen import parse_uci
+from perft import STANDARD_POSITIONS
+from position import BLACK, KING, PAWN, QUEEN, ROOK, WHITE, Position
+
+FENS = [fen for fen, _ in STANDARD_POSITIONS.values()]
+
+
+def reference_planes(position):
+    """Returns the planes of a position built square by square."""
+    planes = np.zeros((PLANES, 8, 8), dtype=np.float32)
+    for sq in range(64):
+        piece = position.piece_at(sq)
+        if piece is not None:
+            color, piece_type = piece
+            planes[6 * color + piece_type, sq >> 3, sq & 7] = 1
+    planes[TURN_PLANE] = position.turn == WHITE
+    for right in range(4):
+        planes[CASTLING_PLANE + right] = position.castling >> right & 1
+    if position.ep_square is not None:
+        planes[EP_PLANE, position.ep_square >> 3, position.ep_square & 7] = 1
+    repetitions = position.repetitions()
+    planes[REPETITION_PLANE] = repetitions >= 1
+    planes[REPETITION_PLANE + 1] = repetitions >= 2
+    return planes
+
+
+def play(position, *moves):
+    for move in moves:
+        position.make_move(parse_uci(move))
+    return position
+
+
+def test_starting_planes():
+    planes = BoardEncoder().encode([Position.starting()])[0]
+    assert planes.shape == (PLANES, 8, 8)
+    assert planes[PAWN, 1].tolist() == [1] * 8
+    assert planes[6 + PAWN, 6].tolist() == [1] * 8
+    assert planes[ROOK, 0].tolist() == [1, 0, 0, 0, 0, 0, 0, 1]
+    assert planes[QUEEN, 0, 3] == planes[6 + QUEEN, 7, 3] == 1
+    assert planes[KING, 0, 4] == planes[6 + KING, 7, 4] == 1
+    assert planes[:12].sum() == 32
+    assert planes[TURN_PLANE].all()
+    assert planes[CASTLING_PLANE:EP_PLANE].all()
+    assert not planes[EP_PLANE:].any()
+
+
+def test_black_to_move_keeps_white_at_the_bottom():
+    planes = BoardEncoder().encode([play(Position.starting(), "e2e4")])[0]
+    # The board is not flipped for black; only the turn plane changes.
+    assert planes[PAWN, 3, 4] == 1
+    assert planes[PAWN, 1, 4] == 0
+    assert planes[6 + PAWN, 6].tolist() == [1] * 8
+    assert not planes[TURN_PLANE].any()
+
+
+def test_castling_and_en_passant_planes():
+    position = Position.from_fen("r3k2r/8/8/3pP3/8/8/8/R3K2R w Kq d6 0 2")
+    planes = BoardEncoder().encode([position])[0]
+    rights = [planes[CASTLING_PLANE + right].all() for right in range(4)]
+    assert rights == [True, False, False, True]
+    assert planes[EP_PLANE].sum() == 1
+    assert planes[EP_PLANE, 5, 3] == 1
+
+
+def test_repetition_planes():
+    position = Position.starting()
+    shuffle = ("g1f3", "g8f6", "f3g1", "f6g8")
+    encoder = BoardEncoder()
+    assert not encoder.encode([position])[0, REPETITION_PLANE:].any()
+    play(position, *shuffle)
+    planes = encoder.encode([position])[0]
+    assert planes[REPETITION_PLANE].all()
+    assert not planes[REPETITION_PLANE + 1].any()
+    play(position, *shuffle)
+    assert encoder.encode([position])[0, REPETITION_PLANE:].all()
+
+
+@pytest.mark.parametrize("fen", FENS)
+def test_matches_reference(fen):
+    position = Position.from_fen(fen)
+    np.testing.assert_array_equal(
+        BoardEncoder().encode([position])[0], reference_planes(position)
+    )
+
+
+def test_encode_arrays_matches_encode():
+    positions = [Position.from_fen(fen) for fen in FENS]
+    positions.append(play(Position.starting(), "e2e4", "c7c5", "e4e5", "d7d5"))
+    expected = BoardEncoder(2).encode(positions).copy()
+    planes = BoardEncoder(2).encode_arrays(
+        np.array(
+            [position.pieces[WHITE] + position.pieces[BLACK] for position in positions],
+            dtype=np.uint64,
+        ),
+        np.array([position.turn for position in positions], dtype=np.uint8),
+        np.array([position.castling for position in positions], dtype=np.uint8),
+        np.array(
+            [
+                -1 if position.ep_square is None else position.ep_square
+                for position in positions
+            ],
+            dtype=np.int8,
+        ),
+        np.array([position.repetitions() for position in positions], dtype=np.uint8),
+    )
+    np.testing.assert_array_equal(planes, expected)
+
+
+def test_buffer_is_reused():
+    encoder = BoardEncoder(4)
+    first = encoder.encode([Position.starting()])
+    second = encoder.encode([play(Position.starting(), "e2e4")])
+    assert np.shares_memory(first, second)
+    assert not first[0, TURN_PLANE].any()
@@ -0,0 +1,49 @@
+import pytest
+
+from evaluation import Evaluator
+from movegen import legal_moves
+from perft import STANDARD_POSITIONS
+from position import Position
+from psqt import compute_pawn_key, compute_psqt
+
+EXTRA_FENS = [
+    "r1bqkb1r/pppp1ppp/2n2n2/4p2Q/2B1P3/8/PPPP1PPP/RNB1K1NR w KQkq - 4 4",
+    "8/5pk1/6p1/8/2P5/1P6/5PPP/6K1 b - - 0 40",
+    "4k3/8/8/3pP3/8/8/8/4K3 w - d6 0 1",
+]
+FENS = [fen for fen, _ in STANDARD_POSITIONS.values()] + EXTRA_FENS
+
+
+def mirror(fen):
+    """Returns the FEN of a position with colours and ranks swapped."""
+    board, turn, castling, ep, *clocks = fen.split()
+    board = "/".join(reversed(board.split("/"))).swapcase()
+    castling = "".join(sorted(castling.swapcase())) if castling != "-" else "-"
+    if ep != "-":
+        ep = ep[0] + str(9 - int(ep[1]))
+    return " ".join([board, "b" if turn == "w" else "w", castling, ep, *clocks])
+
+
+@pytest.mark.parametrize("fen", FENS)
+def test_evaluation_is_colour_symmetric(fen):
+    evaluate = Evaluator()
+    assert evaluate(Position.from_fen(fen)) == evaluate(Position.from_fen(mirror(fen)))
+
+
+@pytest.mark.parametrize("fen", FENS)
+def test_incremental_scores_match_recomputed(fen):
+    position = Position.from_fen(fen)
+    assert position.psqt == compute_psqt(position)
+    assert position.pawn_key == compute_pawn_key(position)
+    for move in legal_moves(position):
+        position.make_move(move)
+        assert position.psqt == compute_psqt(position)
+        assert position.pawn_key == compute_pawn_key(position)
+        for reply in legal_moves(position):
+            position.make_move(reply)
+            assert position.psqt == compute_psqt(position)
+            assert position.pawn_key == compute_pawn_key(position)
+            position.unmake_move()
+        position.unmake_move()
+    assert position.fen() == fen
+    assert position.psqt == compute_psqt(position)
@@ -0,0 +1,110 @@
+import os
+
+import pytest
+
+from explorer import MoveStats, PositionIndex
+from movegen import parse_uci
+from pgn import Game
+from position import Position
+
+LINES = [
+    ("e2e4 e7e5 g1f3", "1-0"),
+    ("e2e4 c7c5 g1f3", "1/2-1/2"),
+    ("d2d4 d7d5", "0-1"),
+    # Transposes into the first game after three plies.
+    ("g1f3 e7e5 e2e4", "1-0"),
+]
+
+
+def games():
+    return [
+        (
+            index,
+            Game.from_moves([parse_uci(uci) for uci in line.split()], {"Result": r}),
+        )
+        for index, (line, r) in enumerate(LINES)
+    ]
+
+
+def after(line):
+    position = Position.starting()
+    for uci in line.split():
+        position.make_move(parse_uci(uci))
+    return position
+
+
+def check_queries(index):
+    start = index.moves(Position.starting())
+    assert start[0] == MoveStats(parse_uci("e2e4"), 2, 1, 1, 0)
+    assert sorted(start[1:]) == sorted(
+        [
+            MoveStats(parse_uci("d2d4"), 1, 0, 0, 1),
+            MoveStats(parse_uci("g1f3"), 1, 1, 0, 0),
+        ]
+    )
+    assert sorted(index.moves(after("e2e4"))) == sorted(
+        [
+            MoveStats(parse_uci("e7e5"), 1, 1, 0, 0),
+            MoveStats(parse_uci("c7c5"), 1, 0, 1, 0),
+        ]
+    )
+    assert index.games(Position.starting()) == [0, 1, 2, 3]
+    assert index.games(after("e2e4")) == [0, 1]
+    assert index.games(after("e2e4 e7e5 g1f3")) == [0, 3]
+    assert index.games(after("e2e4").key, limit=1) == [0]
+    assert index.moves(after("a2a3")) == []
+    assert index.games(after("a2a3")) == []
+
+
+def test_empty_game_posts_its_start(tmp_path):
+    index = PositionIndex(str(tmp_path))
+    index.add([(7, Game.from_moves([], {"Result": "*"}))])
+    assert index.games(Position.starting()) == [7]
+    assert index.moves(Position.starting()) == []
+
+
+@pytest.fixture
+def index(tmp_path):
+    index = PositionIndex(str(tmp_path))
+    index.add(games()[:2])
+    index.add(games()[2:])
+    return index
+
+
+def test_queries_across_segments(index):
+    assert len(index.segments) == 2
+    check_queries(index)
+
+
+def test_compact_keeps_answers(index):
+    index.compact()
+    assert len(index.segments) == 1
+    assert len(os.listdir(index.directory)) == 1
+    check_queries(index)
+    check_queries(PositionIndex(index.directory))
+
+
+def test_interrupted_compaction_is_finished_on_open(index, monkeypatch):
+    def crash(path):
+        raise KeyboardInterrupt(path)
+
+    monkeypatch.setattr(os, "remove", crash)
+    with pytest.raises(KeyboardInterrupt):
+        index.compact()
+    monkeypatch.undo()
+    assert len(os.listdir(index.directory)) == 3
+
+    reopened = PositionIndex(index.directory)
+    assert len(reopened.segments) == 1
+    assert os.listdir(index.directory) == ["segment-000001.idx"]
+    check_queries(reopened)
+    reopened.add(games()[:1])
+    assert len(reopened.segments) == 2
+
+
+def test_max_plies(tmp_path):
+    index = PositionIndex(str(tmp_path))
+    index.add(games(), max_plies=1)
+    assert index.games(after("e2e4")) == [0, 1]
+    assert index.games(after("e2e4 e7e5")) == []
+    assert sum(stats.games for stats in index.moves(Position.starting())) == 4
@@ -0,0 +1,43 @@
+import subprocess
+import sys
+from pathlib import Path
+
+import pytest
+
+APP_DIR = Path(__file__).resolve().parents[1] / "app"
+
+# Modules short-lived workers and CLI tools import without drawing anything.
+HEADLESS_MODULES = [
+    "position",
+    "movegen",
+    "search",
+    "uci",
+    "server",
+    "chess_moves",
+    "chess_set",
+    "chess_board",
+]
+
+
+def run_python(code: str) -> str:
+    """Returns the output of code run in a fresh interpreter in app/."""
+    return subprocess.run(
+        [sys.executable, "-c", code],
+        cwd=APP_DIR,
+        check=True,
+        capture_output=True,
+        text=True,
+    ).stdout
+
+
+@pytest.mark.parametrize("module", HEADLESS_MODULES)
+def test_import_does_not_load_pygame(module):
+    output = run_python(f"import sys, {module}; print('pygame.base' in sys.modules)")
+    assert output.strip() == "False"
+
+
+@pytest.mark.parametrize("module", ["search", "uci", "chess_board"])
+def test_import_time(request, module):
+    pytest.importorskip("pytest_benchmark")
+    benchmark = request.getfixturevalue("benchmark")
+    benchmark.pedantic(run_python, args=(f"import {module}",), rounds=5)
@@ -0,0 +1,77 @@
+import asyncio
+import time
+from concurrent.futures import ThreadPoolExecutor, wait
+
+import numpy as np
+import pytest
+
+from encoder import BoardEncoder
+from inference import BatchEvaluator, MLPModel, Model
+from position import Position
+
+
+def test_batched_results_match_direct_prediction():
+    model = MLPModel(hidden=16)
+    position = Position.starting()
+    logits, values = model.predict(BoardEncoder(1).encode([position]))
+    with BatchEvaluator(model, batch_size=8, max_wait=0.05) as evaluator:
+        with ThreadPoolExecutor(8) as pool:
+            results = list(pool.map(evaluator.evaluate, [position] * 8))
+    assert evaluator.batches < 8
+    for result in results:
+        np.testing.assert_allclose(result.logits, logits[0], atol=1e-5)
+        assert result.value == pytest.approx(float(values[0]), abs=1e-5)
+
+
+def test_submit_after_close_raises():
+    evaluator = BatchEvaluator(MLPModel(hidden=16))
+    evaluator.close()
+    with pytest.raises(RuntimeError):
+        evaluator.submit(Position.starting())
+    evaluator.close()
+
+
+class FailingModel(Model):
+    def predict(self, planes):
+        raise ValueError("broken network")
+
+
+def test_partial_batch_is_flushed_after_max_wait():
+    with BatchEvaluator(MLPModel(hidden=16), batch_size=64, max_wait=0.05) as evaluator:
+        start = time.perf_counter()
+        futures = [evaluator.submit(Position.starting()) for _ in range(3)]
+        done, pending = wait(futures, timeout=5)
+        elapsed = time.perf_counter() - start
+    assert not pending and len(done) == 3
+    # The batch never fills, so it is only run once the deadline passes.
+    assert 0.04 <= elapsed < 5
+    assert evaluator.batches == 1
+    assert evaluator.average_batch_size == 3
+
+
+def test_model_error_reaches_every_future():
+    with BatchEvaluator(FailingModel(), batch_size=4, max_wait=0.05) as evaluator:
+        futures = [evaluator.submit(Position.starting()) for _ in range(4)]
+        for future in futures:
+            with pytest.raises(ValueError, match="broken network"):
+                future.result(timeout=5)
+    assert evaluator.batches == 0
+
+
+def test_evaluate_async_from_tasks():
+    model = MLPModel(hidden=16)
+    position = Position.starting()
+    _, values = model.predict(BoardEncoder(1).encode([position]))
+
+    async def evaluate_all(evaluator):
+        return await asyncio.gather(
+            *(evaluator.evaluate_async(position) for _ in range(6))
+        )
+
+    with BatchEvaluator(model, batch_size=6, max_wait=1.0) as evaluator:
+        results = asyncio.run(evaluate_all(evaluator))
+    assert len(results) == 6
+    for result in results:
+        assert result.value == pytest.approx(float(values[0]), abs=1e-5)
+    # All six tasks submit before the first one waits, filling one batch.
+    assert evaluator.batches == 1
@@ -0,0 +1,202 @@
+import math
+import shlex
+import sys
+import textwrap
+
+import pytest
+
+from match import (
+    DEFAULT_MOVETIME,
+    RESULT_SCORES,
+    SPRT,
+    Adjudication,
+    EngineConfig,
+    MatchConfig,
+    UCIPlayer,
+    adjudicate,
+    elo_estimate,
+    expected_score,
+    run,
+)
+from movegen import move_uci
+from pgn import read_games
+from position import Position
+from search import MATE_SCORE, SearchLimits
+from selfplay import load_openings, opening_position
+
+FAKE_ENGINE = """
+import sys
+
+for line in sys.stdin:
+    command = line.split()[0] if line.strip() else ""
+    if command == "uci":
+        print("id name fake")
+        print("uciok", flush=True)
+    elif command == "isready":
+        print("readyok", flush=True)
+    elif command == "go":
+        print("")
+        print("info depth 1 score cp 30")
+        print("")
+        print("info depth 2 score mate {mate} pv a1a8")
+        print("bestmove a1a8", flush=True)
+    elif command == "quit":
+        break
+"""
+
+
+def test_sprt_accepts_clear_results():
+    sprt = SPRT(elo0=0, elo1=5)
+    assert sprt.llr(0, 0, 0) == 0
+    assert sprt.llr(60, 30, 10) > 0 > sprt.llr(10, 30, 60)
+    assert sprt.llr(50, 0, 50) < 0
+    assert sprt.decision(1, 0, 1) is None
+    assert sprt.decision(3000, 2000, 1000) == "H1"
+    assert sprt.decision(1000, 2000, 3000) == "H0"
+
+
+def test_sprt_stops_one_sided_matches():
+    sprt = SPRT(elo0=0, elo1=5)
+    assert sprt.llr(4, 0, 0) > 0 > sprt.llr(0, 0, 4)
+    assert sprt.decision(4, 0, 0) is None
+    assert sprt.decision(30, 0, 0) == "H1"
+    assert sprt.decision(0, 0, 30) == "H0"
+
+
+def test_sprt_uses_the_raw_results():
+    sprt = SPRT(elo0=0, elo1=10)
+    wins, draws, losses = 120, 200, 80
+    games = wins + draws + losses
+    score = (wins + draws / 2) / games
+    variance = (wins + draws / 4) / games - score**2
+    score0, score1 = expected_score(0), expected_score(10)
+    expected = games * (score1 - score0) * (2 * score - score0 - score1)
+    assert sprt.llr(wins, draws, losses) == pytest.approx(expected / (2 * variance))
+
+
+def test_match_needs_an_even_number_of_games():
+    engine = EngineConfig("a", depth=1)
+    with pytest.raises(ValueError):
+        run(MatchConfig((engine, engine), games=3, workers=1))
+
+
+def test_elo_estimate():
+    assert elo_estimate(0, 0, 0) == (0.0, math.inf)
+    elo, margin = elo_estimate(30, 40, 30)
+    assert elo == pytest.approx(0, abs=1e-9)
+    assert 0 < margin < 100
+    elo, margin = elo_estimate(60, 20, 20)
+    assert elo > 0
+    assert elo - margin > 0
+    for results in [(4, 0, 0), (0, 4, 0), (0, 0, 4)]:
+        _, margin = elo_estimate(*results)
+        assert 0 < margin < math.inf
+
+
+def test_adjudicate_resign():
+    rules = Adjudication(resign_score=600, resign_moves=2)
+    position = Position.starting()
+    assert adjudicate(position, [700, 700, 700], rules, None) is None
+    assert adjudicate(position, [700] * 4, rules, None) == ("1-0", "resign")
+    assert adjudicate(position, [-700] * 4, rules, None) == ("0-1", "resign")
+    assert adjudicate(position, [700, 700, 500, 700], rules, None) is None
+
+
+def test_adjudicate_draw_and_max_plies():
+    rules = Adjudication(draw_score=10, draw_moves=2, draw_move_number=40)
+    early = Position.starting()
+    late = Position.from_fen("4k3/8/8/8/8/8/8/4K3 w - - 0 40")
+    assert adjudicate(early, [0] * 4, rules, None) is None
+    assert adjudicate(late, [0, 5, -10, 3], rules, None) == ("1/2-1/2", "draw")
+    assert adjudicate(late, [0, 5, -11, 3], rules, None) is None
+    assert adjudicate(late, [0, 5, 10], rules, None) is None
+    rules = Adjudication(max_plies=6)
+    assert adjudicate(early, [50] * 5, rules, None) is None
+    assert adjudicate(early, [50] * 6, rules, None) == ("1/2-1/2", "max plies")
+
+
+def test_engine_config_parse():
+    config = EngineConfig.parse("name=fast,depth=3,nodes=500,movetime=0.5,hash=8")
+    assert config == EngineConfig("fast", None, 3, 500, 0.5, 8)
+    assert config.limits.depth == 3
+    assert EngineConfig.parse("cmd=stockfish").name == "stockfish"
+    # Engines without a limit get a default move time instead of a bare go.
+    assert EngineConfig.parse("cmd=stockfish").limits == SearchLimits(
+        movetime=DEFAULT_MOVETIME
+    )
+    with pytest.raises(ValueError):
+        EngineConfig.parse("name=x,speed=9")
+
+
+@pytest.mark.parametrize("mate, score", [(1, MATE_SCORE - 1), (-2, -MATE_SCORE + 4)])
+def test_uci_player_reads_scores(tmp_path, mate, score):
+    script = tmp_path / "engine.py"
+    script.write_text(textwrap.dedent(FAKE_ENGINE.format(mate=mate)))
+    cmd = f"{shlex.quote(sys.executable)} {shlex.quote(str(script))}"
+    player = UCIPlayer(EngineConfig("fake", cmd, depth=2))
+    try:
+        position = Position.from_fen("6k1/5ppp/8/8/8/8/8/R5K1 w - - 0 1")
+        move, value = player.choose(position)
+    finally:
+        player.close()
+    assert move_uci(move) == "a1a8"
+    assert value == score
+    assert player.process.returncode == 0
+
+
+def test_run_writes_pgn(tmp_path):
+    path = tmp_path / "match.pgn"
+    engines = (EngineConfig("one", depth=1), EngineConfig("two", depth=1))
+    config = MatchConfig(
+        engines,
+        games=2,
+        adjudication=Adjudication(max_plies=20),
+        workers=1,
+        pgn_path=str(path),
+    )
+    wins, draws, losses, decision = run(config)
+    assert wins + draws + losses == 2
+    assert decision is None
+
+    games = list(read_games(str(path)))
+    assert len(games) == 2
+    tags = sorted(
+        (game.headers["Round"], game.headers["White"], game.headers["Black"])
+        for game in games
+    )
+    assert tags == [("1", "one", "two"), ("2", "two", "one")]
+    scores = [RESULT_SCORES[game.headers["Result"]] for game in games]
+    first = [
+        score if game.headers["White"] == "one" else 1 - score
+        for game, score in zip(games, scores)
+    ]
+    assert first.count(1) == wins
+    assert first.count(0.5) == draws
+    assert first.count(0) == losses
+
+
+def test_run_from_epd_suite(tmp_path):
+    suite = tmp_path / "suite.epd"
+    suite.write_text(
+        "r1bqkbnr/pppp1ppp/2n5/4p3/4P3/5N2/PPPP1PPP/RNBQKB1R w KQkq - "
+        'bm Bb5; id "ruy lopez";\n'
+        "6k1/5ppp/8/8/8/8/8/R5K1 w - - hmvc 7; fmvn 30;\n"
+        "8/8/8/3k4/8/8/8/KQ6 w - - 3 60\n",
+        encoding="utf-8",
+    )
+    openings = load_openings(str(suite))
+    assert [opening_position(opening).fen() for opening in openings] == [
+        "r1bqkbnr/pppp1ppp/2n5/4p3/4P3/5N2/PPPP1PPP/RNBQKB1R w KQkq - 0 1",
+        "6k1/5ppp/8/8/8/8/8/R5K1 w - - 7 30",
+        "8/8/8/3k4/8/8/8/KQ6 w - - 3 60",
+    ]
+    engines = (EngineConfig("one", depth=1), EngineConfig("two", depth=1))
+    config = MatchConfig(
+        engines,
+        games=2,
+        openings=openings[:1],
+        adjudication=Adjudication(max_plies=4),
+        workers=1,
+    )
+    wins, draws, losses, _ = run(config)
+    assert wins + draws + losses == 2
@@ -0,0 +1,66 @@
+import numpy as np
+import pytest
+
+from inference import POLICY_SIZE, Evaluation
+from mcts import MCTS
+from movegen import move_uci
+from position import Position
+
+MATE_IN_ONE_FEN = "6k1/5ppp/8/8/8/8/8/R5K1 w - - 0 1"
+
+
+def uniform(_position):
+    return Evaluation(np.zeros(POLICY_SIZE, dtype=np.float32), 0.0)
+
+
+def root_priors(mcts):
+    store = mcts.store
+    first = store.first_child[mcts.root]
+    return store.prior[first : first + store.child_count[mcts.root]].copy()
+
+
+@pytest.mark.parametrize("threads", [1, 4])
+def test_visits_add_up(threads):
+    mcts = MCTS(uniform)
+    mcts.search(Position.starting(), simulations=200, threads=threads)
+    _, visits = mcts.children()
+    assert mcts.store.visits[mcts.root] == 200
+    assert visits.sum() == 199
+    assert not mcts.store.virtual_loss[: mcts.store.size].any()
+
+
+def test_finds_mate_and_stores_terminal():
+    mcts = MCTS(uniform)
+    mcts.search(Position.from_fen(MATE_IN_ONE_FEN), simulations=400)
+    assert move_uci(mcts.best_move()) == "a1a8"
+    store = mcts.store
+    first = store.first_child[mcts.root]
+    moves, _ = mcts.children()
+    mate = first + [move_uci(move) for move in moves].index("a1a8")
+    assert store.terminal[mate] == -1.0
+    assert store.value_sum[mate] == store.visits[mate]
+    assert mcts.value() > 0
+
+
+def test_root_noise_applied_once_per_root():
+    mcts = MCTS(uniform, noise_fraction=0.25, seed=1)
+    position = Position.starting()
+    mcts.search(position, simulations=10)
+    noised = root_priors(mcts)
+    assert not np.allclose(noised, noised[0])
+    mcts.search(position, simulations=10)
+    np.testing.assert_array_equal(root_priors(mcts), noised)
+
+
+def test_failed_evaluation_removes_virtual_loss():
+    def failing(position):
+        if position.history:
+            raise RuntimeError("evaluator closed")
+        return uniform(position)
+
+    mcts = MCTS(failing)
+    position = Position.starting()
+    with pytest.raises(RuntimeError):
+        mcts.search(position, simulations=2)
+    assert not mcts.store.virtual_loss[: mcts.store.size].any()
+    assert position.key == Position.starting().key
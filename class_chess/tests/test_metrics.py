@@ -0,0 +1,69 @@
+import json
+import urllib.request
+
+from metrics import Metrics, serve_http
+from position import Position
+from search import Searcher, SearchLimits
+
+
+def test_counters_and_timers():
+    metrics = Metrics()
+    metrics.increment("nodes_total", 5)
+    metrics.increment("nodes_total")
+    metrics.observe("search", 0.5)
+    with metrics.timer("search"):
+        pass
+    snapshot = metrics.snapshot()
+    assert snapshot["counters"] == {"nodes_total": 6}
+    assert snapshot["timers"]["search"]["count"] == 2
+    assert snapshot["timers"]["search"]["max_seconds"] == 0.5
+    text = metrics.to_prometheus()
+    assert "tensorchess_nodes_total 6" in text
+    assert "tensorchess_search_seconds_count 2" in text
+    metrics.reset()
+    assert metrics.snapshot() == {"counters": {}, "timers": {}}
+
+
+def test_dump_formats(tmp_path):
+    metrics = Metrics()
+    metrics.increment("games_total", 3)
+    metrics.dump(str(tmp_path / "metrics.json"))
+    metrics.dump(str(tmp_path / "metrics.prom"))
+    data = json.loads((tmp_path / "metrics.json").read_text())
+    assert data["counters"] == {"games_total": 3}
+    assert (
+        "# TYPE tensorchess_games_total counter"
+        in (tmp_path / "metrics.prom").read_text()
+    )
+
+
+def test_search_publishes_stats(monkeypatch):
+    metrics = Metrics()
+    monkeypatch.setattr("search.METRICS", metrics)
+    result = Searcher().search(Position.starting(), SearchLimits(depth=2))
+    counters = metrics.snapshot()["counters"]
+    assert counters["search_nodes_total"] == result.nodes
+    assert counters["eval_calls_total"] > 0
+
+
+def test_search_without_moves_publishes_stats(monkeypatch):
+    metrics = Metrics()
+    monkeypatch.setattr("search.METRICS", metrics)
+    checkmated = Position.from_fen("R5k1/5ppp/8/8/8/8/8/6K1 b - - 0 1")
+    result = Searcher().search(checkmated, SearchLimits(depth=2))
+    assert result.move is None
+    assert metrics.snapshot()["timers"]["search"]["count"] == 1
+
+
+def test_http_exporter():
+    metrics = Metrics()
+    metrics.increment("requests_total", 2)
+    server = serve_http(0, metrics=metrics)
+    try:
+        url = f"http://127.0.0.1:{server.server_address[1]}"
+        with urllib.request.urlopen(f"{url}/metrics") as response:
+            assert "tensorchess_requests_total 2" in response.read().decode()
+        with urllib.request.urlopen(f"{url}/metrics.json") as response:
+            assert json.loads(response.read())["counters"] == {"requests_total": 2}
+    finally:
+        server.shutdown()
@@ -0,0 +1,100 @@
+import numpy as np
+import pytest
+
+from movegen import legal_moves
+from nnue import (
+    FEATURES,
+    QA,
+    QB,
+    NNUEEvaluator,
+    Network,
+    evaluate_batch,
+    random_network,
+    write_network,
+)
+from perft import STANDARD_POSITIONS
+from position import Position
+
+FENS = [fen for fen, _ in STANDARD_POSITIONS.values()]
+
+
+@pytest.fixture(scope="module")
+def network(tmp_path_factory):
+    path = str(tmp_path_factory.mktemp("nnue") / "random.nnue")
+    random_network(path, hidden=32)
+    return Network(path)
+
+
+def check(evaluator, position):
+    refreshed = evaluator.network.refresh(position)
+    np.testing.assert_array_equal(evaluator.accumulator(position), refreshed)
+    assert evaluator(position) == evaluator.network.output(refreshed, position.turn)
+
+
+@pytest.mark.parametrize("fen", FENS)
+def test_incremental_matches_refresh(network, fen):
+    evaluator = NNUEEvaluator(network, entries=256)
+    position = Position.from_fen(fen)
+    check(evaluator, position)
+    for move in legal_moves(position):
+        position.make_move(move)
+        check(evaluator, position)
+        for reply in legal_moves(position):
+            position.make_move(reply)
+            check(evaluator, position)
+            position.unmake_move()
+        position.unmake_move()
+    assert evaluator.updates > evaluator.refreshes
+
+
+def test_long_unevaluated_line(network):
+    evaluator = NNUEEvaluator(network)
+    position = Position.starting()
+    check(evaluator, position)
+    for ply in range(20):
+        moves = legal_moves(position)
+        position.make_move(moves[(ply * 5) % len(moves)])
+        if ply % 3 == 0:
+            check(evaluator, position)
+    check(evaluator, position)
+
+
+def test_batch_matches_single(network):
+    positions = [Position.from_fen(fen) for fen in FENS]
+    evaluator = NNUEEvaluator(network)
+    expected = [evaluator(position) for position in positions]
+    assert evaluate_batch(network, positions).tolist() == expected
+
+
+def test_batch_is_exact_for_large_weights(tmp_path):
+    # Wide enough that the output sums pass 2**24 and the int16
+    # accumulators wrap around.
+    rng = np.random.default_rng(1)
+    hidden = 512
+    path = str(tmp_path / "large.nnue")
+    write_network(
+        path,
+        rng.integers(-4000, 4001, (FEATURES, hidden)),
+        rng.integers(-4000, 4001, hidden),
+        rng.integers(-32767, 32768, 2 * hidden),
+        output_bias=12345,
+        scale=QA * QB,
+    )
+    network = Network(path)
+    positions = [Position.from_fen(fen) for fen in FENS]
+    for position in list(positions):
+        for move in legal_moves(position)[:5]:
+            child = position.copy()
+            child.make_move(move)
+            positions.append(child)
+    evaluator = NNUEEvaluator(network)
+    expected = [evaluator(position) for position in positions]
+    assert max(map(abs, expected)) > 2**24
+    assert evaluate_batch(network, positions).tolist() == expected
+
+
+def test_rejects_other_files(tmp_path):
+    path = tmp_path / "not.nnue"
+    path.write_bytes(b"\0" * 64)
+    with pytest.raises(ValueError):
+        Network(str(path))
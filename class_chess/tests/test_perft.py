@@ -0,0 +1,40 @@
+import pytest
+
+from perft import STANDARD_POSITIONS, divide, main, perft, run_standard
+from position import Position
+
+
+def standard_cases(max_depth):
+    return [
+        (name, depth)
+        for name, (_, counts) in STANDARD_POSITIONS.items()
+        for depth in range(1, min(max_depth, len(counts)) + 1)
+    ]
+
+
+def pytest_generate_tests(metafunc):
+    if "perft_case" in metafunc.fixturenames:
+        max_depth = metafunc.config.getoption("--perft-depth")
+        cases = standard_cases(max_depth)
+        metafunc.parametrize("perft_case", cases, ids=[f"{n}-{d}" for n, d in cases])
+
+
+def test_perft_counts(perft_case):
+    name, depth = perft_case
+    result = run_standard(name, depth)
+    assert result.passed, str(result)
+
+
+@pytest.mark.parametrize("name", STANDARD_POSITIONS)
+def test_divide_sums_to_perft(name):
+    position = Position.from_fen(STANDARD_POSITIONS[name][0])
+    assert sum(divide(position, 2).values()) == perft(position, 2)
+
+
+def test_perft_depth_zero_counts_root():
+    assert perft(Position.starting(), 0) == 1
+
+
+def test_main_rejects_depth_zero():
+    with pytest.raises(SystemExit):
+        main(["--depth", "0"])
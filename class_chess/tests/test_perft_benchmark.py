@@ -0,0 +1,15 @@
+import pytest
+
+from perft import STANDARD_POSITIONS, perft
+from position import Position
+
+pytest.importorskip("pytest_benchmark")
+
+
+@pytest.mark.parametrize("name", ["start", "kiwipete", "position3"])
+def test_perft_throughput(benchmark, name):
+    fen, counts = STANDARD_POSITIONS[name]
+    position = Position.from_fen(fen)
+    nodes = benchmark(perft, position, 3)
+    assert nodes == counts[2]
+    benchmark.extra_info["nodes"] = nodes
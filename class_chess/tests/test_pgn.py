@@ -0,0 +1,143 @@
+import io
+
+import pytest
+
+from chess_board import ChessBoard
+from movegen import game_result, legal_moves, move_uci, parse_uci
+from notation import parse_san, san
+from perft import STANDARD_POSITIONS
+from pgn import Game, iter_games, read_games, write_games
+from position import Position
+from render import init_headless
+
+KIWIPETE_FEN = STANDARD_POSITIONS["kiwipete"][0]
+
+
+def play_line(position, plies):
+    """Returns a reproducible line of legal moves played from position."""
+    moves = []
+    for ply in range(plies):
+        legal = legal_moves(position)
+        if not legal or game_result(position):
+            break
+        move = legal[(ply * 7) % len(legal)]
+        position.make_move(move)
+        moves.append(move)
+    return moves
+
+
+@pytest.mark.parametrize("name", STANDARD_POSITIONS)
+def test_san_round_trip(name):
+    position = Position.from_fen(STANDARD_POSITIONS[name][0])
+    moves = legal_moves(position)
+    texts = [san(position, move, moves) for move in moves]
+    assert len(set(texts)) == len(moves)
+    assert [parse_san(position, text, moves) for text in texts] == moves
+
+
+@pytest.mark.parametrize(
+    "fen, uci, expected",
+    [
+        (Position.starting().fen(), "g1f3", "Nf3"),
+        (KIWIPETE_FEN, "e1g1", "O-O"),
+        (KIWIPETE_FEN, "e1c1", "O-O-O"),
+        (KIWIPETE_FEN, "e5f7", "Nxf7"),
+        ("4k3/P7/8/8/8/8/8/4K3 w - - 0 1", "a7a8q", "a8=Q+"),
+        ("4k3/8/8/8/8/8/8/R4RK1 w - - 0 1", "a1d1", "Rad1"),
+        ("7k/6pp/8/8/8/8/8/R3K3 w - - 0 1", "a1a8", "Ra8#"),
+    ],
+)
+def test_san(fen, uci, expected):
+    position = Position.from_fen(fen)
+    assert san(position, parse_uci(uci)) == expected
+    assert move_uci(parse_san(position, expected)) == uci
+
+
+def test_pgn_round_trip(tmp_path):
+    games = []
+    for fen in (Position.starting().fen(), KIWIPETE_FEN):
+        start = Position.from_fen(fen)
+        moves = play_line(start.copy(), 80)
+        headers = {"White": 'A "quoted" name', "Result": "*"}
+        games.append(Game.from_moves(moves, headers, start))
+
+    path = str(tmp_path / "games.pgn")
+    write_games(path, games)
+    read = list(read_games(path))
+    assert len(read) == 2
+    for original, parsed in zip(games, read):
+        assert parsed.moves == original.moves
+        assert parsed.headers.items() >= original.headers.items()
+        assert parsed.pgn() == original.pgn()
+
+
+def test_movetext_skips_comments_and_variations():
+    text = b'[Event "x"]\n\n1. e4 {best by test} e5 (1... c5 2. Nf3) 2. Nf3 $1 Nc6 *\n'
+    (game,) = iter_games(io.BytesIO(text))
+    assert [move_uci(move) for move in game.moves] == ["e2e4", "e7e5", "g1f3", "b8c6"]
+
+
+def sample_games():
+    games = []
+    for index, fen in enumerate((Position.starting().fen(), KIWIPETE_FEN)):
+        start = Position.from_fen(fen)
+        moves = play_line(start.copy(), 40 + index)
+        headers = {"Event": f"game {index}", "Result": "*"}
+        games.append(Game.from_moves(moves, headers, start))
+    return games
+
+
+@pytest.mark.parametrize("chunk_size", [1, 7, 64, 1000])
+def test_reading_is_independent_of_chunk_boundaries(chunk_size):
+    games = sample_games()
+    # No blank lines between games, so a tag line right after movetext
+    # is the only record boundary, and no newline after the last one.
+    text = "".join(game.pgn() for game in games).rstrip("\n").encode()
+    read = list(iter_games(io.BytesIO(text), chunk_size=chunk_size))
+    assert [game.pgn() for game in read] == [game.pgn() for game in games]
+
+
+def test_headers_only_skips_movetext(tmp_path):
+    games = sample_games()
+    path = str(tmp_path / "games.pgn")
+    write_games(path, games)
+    read = list(read_games(path, headers_only=True, chunk_size=16))
+    assert [game.headers["Event"] for game in read] == ["game 0", "game 1"]
+    assert read[1].headers["FEN"] == KIWIPETE_FEN
+    assert all(game.movetext is None for game in read)
+    with pytest.raises(ValueError):
+        read[0].moves  # pylint: disable=pointless-statement
+
+
+@pytest.fixture
+def display():
+    init_headless()
+
+
+@pytest.mark.usefixtures("display")
+@pytest.mark.parametrize("name", STANDARD_POSITIONS)
+def test_fen_round_trip(name):
+    fen = STANDARD_POSITIONS[name][0]
+    assert Position.from_fen(fen).fen() == fen
+    assert ChessBoard.from_fen(fen, 64, (0, 0)).fen() == fen
+
+
+def test_epd_round_trip():
+    position = Position.from_fen(KIWIPETE_FEN)
+    operations = {"bm": "e5f7", "id": "kiwi; pete", "c0": ""}
+    epd = position.epd(operations)
+    assert epd.startswith(" ".join(KIWIPETE_FEN.split()[:4]) + " ")
+    parsed, parsed_operations = Position.from_epd(epd)
+    assert parsed.epd() == position.epd()
+    assert parsed_operations == operations
+
+    parsed, _ = Position.from_epd(position.epd({"hmvc": "7", "fmvn": "31"}))
+    assert (parsed.halfmove_clock, parsed.fullmove_number) == (7, 31)
+
+
+@pytest.mark.usefixtures("display")
+def test_board_from_game_replays_moves():
+    (game,) = sample_games()[1:]
+    board = ChessBoard.from_game(game, 64, (0, 0))
+    assert board.fen() == game.end_position().fen()
+    assert board.game(game.headers).pgn() == game.pgn()
@@ -0,0 +1,93 @@
+import random
+
+import pytest
+
+from movegen import legal_moves, parse_uci
+from perft import STANDARD_POSITIONS
+from position import Position
+from zobrist import compute_key
+
+
+def play(position, uci):
+    move = parse_uci(uci)
+    assert move in legal_moves(position)
+    position.make_move(move)
+
+
+def assert_key_matches_fen(position):
+    assert position.key == compute_key(position)
+    assert position.key == Position.from_fen(position.fen()).key
+
+
+@pytest.mark.parametrize("name", STANDARD_POSITIONS)
+def test_incremental_key_matches_fen_along_random_walks(name):
+    rng = random.Random(name)
+    fen = STANDARD_POSITIONS[name][0]
+    position = Position.from_fen(fen)
+    for _ in range(8):
+        played = 0
+        for _ in range(40):
+            moves = legal_moves(position)
+            if not moves:
+                break
+            position.make_move(rng.choice(moves))
+            played += 1
+            assert_key_matches_fen(position)
+        for _ in range(played):
+            position.unmake_move()
+            assert_key_matches_fen(position)
+        assert position.fen() == fen
+
+
+@pytest.mark.parametrize(
+    ("fen", "uci"),
+    [
+        # Castling on either side clears both rights of the side moving.
+        ("r3k2r/8/8/8/8/8/8/R3K2R w KQkq - 0 1", "e1g1"),
+        ("r3k2r/8/8/8/8/8/8/R3K2R b KQkq - 0 1", "e8c8"),
+        # Rook moves and captures clear a single right.
+        ("r3k2r/8/8/8/8/8/8/R3K2R w KQkq - 0 1", "a1a8"),
+        ("r3k2r/8/8/8/8/8/8/R3K2R w KQkq - 0 1", "h1h2"),
+        # A double push next to an enemy pawn sets the en passant square,
+        # and one with no capturer does not.
+        ("4k3/8/8/8/3p4/8/4P3/4K3 w - - 0 1", "e2e4"),
+        ("4k3/8/8/8/8/8/4P3/4K3 w - - 0 1", "e2e4"),
+        # Capturing en passant, and any other move clearing the square.
+        ("4k3/8/8/3pP3/8/8/8/4K3 w - d6 0 1", "e5d6"),
+        ("4k3/8/8/3pP3/8/8/8/4K3 w - d6 0 1", "e1d1"),
+        # Promotions, with and without capture.
+        ("3r3k/4P3/8/8/8/8/8/4K3 w - - 0 1", "e7e8q"),
+        ("3r3k/4P3/8/8/8/8/8/4K3 w - - 0 1", "e7d8n"),
+        ("4k3/8/8/8/8/8/1p6/R3K3 b Q - 0 1", "b2a1r"),
+    ],
+)
+def test_special_move_keys_match_from_scratch(fen, uci):
+    position = Position.from_fen(fen)
+    play(position, uci)
+    assert_key_matches_fen(position)
+    position.unmake_move()
+    assert position.fen() == fen
+    assert_key_matches_fen(position)
+
+
+def test_threefold_shuffle_is_detected_by_hash():
+    position = Position.starting()
+    shuffle = ["g1f3", "g8f6", "f3g1", "f6g8"]
+    assert position.repetitions() == 0
+    for uci in shuffle:
+        play(position, uci)
+    assert position.repetitions() == 1
+    assert not position.is_repetition()
+    for uci in shuffle:
+        play(position, uci)
+    assert position.repetitions() == 2
+    assert position.is_repetition()
+
+
+def test_irreversible_move_resets_repetitions():
+    position = Position.starting()
+    for uci in ["g1f3", "g8f6", "f3g1", "f6g8", "e2e4", "e7e5"]:
+        play(position, uci)
+    for uci in ["g1f3", "g8f6", "f3g1", "f6g8"]:
+        play(position, uci)
+    assert position.repetitions() == 1
@@ -0,0 +1,44 @@
+import pstats
+import sys
+import threading
+import time
+
+from profiling import main, profiled
+
+
+def busy_worker(seconds):
+    end = time.perf_counter() + seconds
+    total = 0
+    while time.perf_counter() < end:
+        total += 1
+    return total
+
+
+def test_sampler_sees_worker_threads(tmp_path):
+    path = tmp_path / "samples.folded"
+    with profiled(sample_path=str(path), sample_interval=0.001):
+        worker = threading.Thread(target=busy_worker, args=(0.3,))
+        worker.start()
+        worker.join()
+    lines = path.read_text(encoding="utf-8").splitlines()
+    assert lines
+    assert all(line.rsplit(" ", 1)[1].isdigit() for line in lines)
+    assert any("busy_worker (test_profiling.py:" in line for line in lines)
+
+
+def test_cprofile_output_loads(tmp_path, monkeypatch):
+    monkeypatch.setattr(sys, "argv", list(sys.argv))
+    monkeypatch.setattr(sys, "path", list(sys.path))
+    script = tmp_path / "script.py"
+    script.write_text(
+        "import sys\n"
+        "def square_all(count):\n"
+        "    return [n * n for n in range(count)]\n"
+        "square_all(int(sys.argv[1]))\n"
+        "sys.exit(0)\n",
+        encoding="utf-8",
+    )
+    output = tmp_path / "script.prof"
+    main(["--cprofile", str(output), str(script), "1000"])
+    stats = pstats.Stats(str(output))
+    assert any(name == "square_all" for _, _, name in stats.stats)
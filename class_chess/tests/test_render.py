@@ -0,0 +1,59 @@
+import os
+
+os.environ.setdefault("SDL_VIDEODRIVER", "dummy")
+
+# pylint: disable=wrong-import-position
+import pygame
+
+from position import STARTING_FEN
+from render import DARK_COLOR, LIGHT_COLOR, BoardRenderer, render_batch
+
+EMPTY_FEN = "8/8/8/8/8/8/8/8 w - - 0 1"
+KINGS_FEN = "4k3/8/8/8/8/8/8/4K3 w - - 0 1"
+
+
+def pixel(data, size, x, y):
+    """Returns the RGB colour of a pixel of a raw diagram buffer."""
+    offset = (y * size * 8 + x) * 3
+    return tuple(data[offset : offset + 3])
+
+
+def test_raw_buffer_size_and_format():
+    size = 32
+    renderer = BoardRenderer(size)
+    data = renderer.render_bytes(EMPTY_FEN)
+    assert len(data) == (8 * size) ** 2 * 3
+    # a8 is a light square in the top left corner, b8 dark next to it.
+    assert pixel(data, size, 1, 1) == LIGHT_COLOR
+    assert pixel(data, size, size + 1, 1) == DARK_COLOR
+    assert pixel(data, size, 1, 7 * size + 1) == DARK_COLOR
+
+
+def test_pieces_are_drawn_on_their_squares():
+    size = 32
+    renderer = BoardRenderer(size)
+    empty = renderer.render_bytes(EMPTY_FEN)
+    kings = renderer.render_bytes(KINGS_FEN)
+    changed = {
+        (index // 3 % (8 * size) // size, index // 3 // (8 * size) // size)
+        for index in range(len(empty))
+        if empty[index] != kings[index]
+    }
+    assert changed == {(4, 0), (4, 7)}
+    assert renderer.render_bytes(KINGS_FEN) == kings
+
+
+def test_png_output(tmp_path):
+    paths = render_batch([STARTING_FEN, KINGS_FEN], str(tmp_path), 16, workers=1)
+    assert paths == [str(tmp_path / "000000.png"), str(tmp_path / "000001.png")]
+    for path in paths:
+        with open(path, "rb") as image:
+            assert image.read(8) == b"\x89PNG\r\n\x1a\n"
+        assert pygame.image.load(path).get_size() == (128, 128)
+
+
+def test_batch_matches_single_renders():
+    renderer = BoardRenderer(16)
+    fens = [STARTING_FEN, KINGS_FEN, EMPTY_FEN]
+    expected = [renderer.render_bytes(fen) for fen in fens]
+    assert render_batch(fens, square_size=16, workers=2, chunksize=1) == expected
@@ -0,0 +1,76 @@
+import time
+
+import pytest
+
+from movegen import move_uci
+from position import Position
+from search import (
+    EXACT,
+    INFINITY,
+    LOWER,
+    MATE_SCORE,
+    Searcher,
+    SearchLimits,
+    TranspositionTable,
+)
+
+MATED_FEN = "6k1/5ppp/8/8/8/8/5PPP/r5K1 w - - 0 1"
+
+
+@pytest.mark.parametrize(
+    "fen, best, plies",
+    [
+        ("6k1/5ppp/8/8/8/8/8/R5K1 w - - 0 1", "a1a8", 1),
+        (
+            "r2qkb1r/pp2nppp/3p4/2pNN1B1/2BnP3/3P4/PPP2PPP/R2bK2R w KQkq - 1 1",
+            "d5f6",
+            3,
+        ),
+    ],
+)
+def test_finds_mate(fen, best, plies):
+    position = Position.from_fen(fen)
+    result = Searcher().search(position, SearchLimits(depth=4))
+    assert move_uci(result.move) == best
+    assert result.score == MATE_SCORE - plies
+    assert position.key == Position.from_fen(fen).key
+
+
+def test_mated_root_has_no_move():
+    result = Searcher().search(Position.from_fen(MATED_FEN), SearchLimits(depth=2))
+    assert result.move is None
+    assert result.score == -MATE_SCORE
+
+
+def test_quiescence_scores_mate_in_check():
+    position = Position.from_fen(MATED_FEN)
+    assert Searcher().quiescence(position, -INFINITY, INFINITY, 0) == -MATE_SCORE
+
+
+def test_node_limit():
+    result = Searcher().search(Position.starting(), SearchLimits(nodes=500))
+    assert result.move is not None
+    assert result.nodes <= 500
+
+
+def test_movetime_limit():
+    start = time.perf_counter()
+    result = Searcher().search(Position.starting(), SearchLimits(movetime=0.1))
+    assert result.move is not None
+    assert time.perf_counter() - start < 0.5
+
+
+def test_transposition_table_packs_entries_into_its_budget():
+    table = TranspositionTable(1)
+    assert table.words.itemsize * len(table.words) == 2**20
+    table.store(12345, 7, -MATE_SCORE, LOWER, 0x1234)
+    assert table.probe(12345) == (7, -MATE_SCORE, LOWER, 0x1234)
+    assert table.probe(12345 + table.size) is None
+    # A shallower result does not replace a deeper one, and a result
+    # without a move keeps the stored move.
+    table.store(12345, 3, 0, EXACT, 0)
+    assert table.probe(12345) == (7, -MATE_SCORE, LOWER, 0x1234)
+    table.store(12345, 9, 50, EXACT, 0)
+    assert table.probe(12345) == (9, 50, EXACT, 0x1234)
+    table.clear()
+    assert table.probe(12345) is None
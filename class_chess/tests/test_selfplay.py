@@ -0,0 +1,112 @@
+import logging
+import os
+import random
+
+import numpy as np
+
+import selfplay
+from movegen import parse_uci
+from position import BLACK, WHITE
+from records import RECORD_DTYPE, read_shard, write_shard
+from selfplay import SearchPlayer, SelfPlayConfig, play_game, run
+
+
+class ScriptedPlayer:
+    """Plays a fixed list of moves."""
+
+    def __init__(self, moves, start):
+        self.moves = [parse_uci(move) for move in moves]
+        self.start = start
+        self.games = 0
+
+    def new_game(self):
+        self.games += 1
+
+    def choose(self, position):
+        move = self.moves[len(position.history) - self.start]
+        return move, [move], [1.0]
+
+    def played(self, move, position):
+        pass
+
+
+def scripted_game(opening, moves, **options):
+    config = SelfPlayConfig("", 1, random_plies=0, openings=[opening], **options)
+    player = ScriptedPlayer(moves, len(opening.split()))
+    records = play_game(config, player, random.Random(0))
+    assert player.games == 1
+    return records
+
+
+def test_outcome_is_from_the_side_to_move():
+    # Fool's mate: black wins.
+    records = scripted_game("f2f3 e7e5", ["g2g4", "d8h4"])
+    assert records["turn"].tolist() == [WHITE, BLACK]
+    assert records["outcome"].tolist() == [-1, 1]
+
+
+def test_white_win_and_unfinished_game():
+    records = scripted_game("e2e4 f7f6 d2d4", ["g7g5", "d1h5"])
+    assert records["outcome"].tolist() == [-1, 1]
+    assert records["turn"].tolist() == [BLACK, WHITE]
+    records = scripted_game("e2e4", ["e7e5", "g1f3"], max_plies=2)
+    assert records["outcome"].tolist() == [0, 0]
+
+
+def test_records_hold_the_policy_target():
+    records = scripted_game("e2e4", ["e7e5"], max_plies=1)
+    assert records[0]["policy_moves"][0] == parse_uci("e7e5")
+    assert records[0]["policy_probs"][0] == 1
+
+
+def test_search_players_share_the_worker_table():
+    config = SelfPlayConfig("", 1, hash_mb=1)
+    first, second = SearchPlayer(config), SearchPlayer(config)
+    assert first.searcher is second.searcher
+    first.searcher.tt.store(1, 1, 0, 0, 0)
+    second.new_game()
+    assert first.searcher.tt.probe(1) is None
+
+
+def test_run_writes_and_resumes(tmp_path):
+    config = SelfPlayConfig(
+        str(tmp_path), 3, workers=2, games_per_shard=2, nodes=50, max_plies=6
+    )
+    written = run(config)
+    assert sorted(written) == [config.shard_path(0), config.shard_path(1)]
+    records = np.concatenate([read_shard(path) for path in written])
+    assert len(records) == 18
+    assert set(records["outcome"].tolist()) <= {-1, 0, 1}
+    assert run(config) == []
+
+
+def flaky_shard(config, index):
+    """Dies on shard 1, raises on shard 2 and writes the others."""
+    with open(os.path.join(config.output_dir, f"attempt-{index}"), "a") as attempts:
+        attempts.write(".")
+    if index == 1:
+        os._exit(1)
+    if index == 2:
+        raise RuntimeError("bad shard")
+    path = config.shard_path(index)
+    write_shard(path, np.zeros(0, dtype=RECORD_DTYPE))
+    return path
+
+
+def test_failures_are_charged_to_their_shard(tmp_path, monkeypatch, caplog):
+    monkeypatch.setattr(selfplay, "generate_shard", flaky_shard)
+    config = SelfPlayConfig(str(tmp_path), 4, workers=2, games_per_shard=1)
+    config.max_retries = 1
+    with caplog.at_level(logging.ERROR, logger="selfplay"):
+        written = run(config)
+    assert sorted(written) == [config.shard_path(0), config.shard_path(3)]
+    given_up = [
+        record.getMessage()
+        for record in caplog.records
+        if "giving up" in record.getMessage()
+    ]
+    assert sorted(given_up) == ["giving up on shard 1", "giving up on shard 2"]
+    # Two rounds, each trying the failing shards at most once in the pool and
+    # once alone.
+    for index in (1, 2):
+        assert 2 <= len((tmp_path / f"attempt-{index}").read_text()) <= 4
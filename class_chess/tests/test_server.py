@@ -0,0 +1,85 @@
+import asyncio
+import contextlib
+import json
+
+from search import SearchLimits
+from server import GameServer
+
+
+async def exchange(path, requests):
+    """Returns the replies to requests sent over one connection."""
+    reader, writer = await asyncio.open_unix_connection(path)
+    replies = []
+    for request in requests:
+        line = request if isinstance(request, str) else json.dumps(request)
+        writer.write(line.encode() + b"\n")
+        await writer.drain()
+        replies.append(json.loads(await reader.readline()))
+    writer.close()
+    await writer.wait_closed()
+    return replies
+
+
+def run_server(tmp_path, requests):
+    path = str(tmp_path / "server.sock")
+    server = GameServer(SearchLimits(depth=1), workers=1, size_mb=1)
+
+    async def run():
+        task = asyncio.create_task(server.serve(unix=path))
+        for _ in range(100):
+            if (tmp_path / "server.sock").exists():
+                break
+            await asyncio.sleep(0.01)
+        try:
+            return await exchange(path, requests)
+        finally:
+            task.cancel()
+            with contextlib.suppress(asyncio.CancelledError):
+                await task
+
+    return asyncio.run(run())
+
+
+def test_game_over_socket(tmp_path):
+    new, move, state, pgn, closed, gone = run_server(
+        tmp_path,
+        [
+            {"op": "new", "engine": "black"},
+            {"op": "move", "game": 1, "move": "e2e4"},
+            {"op": "state", "game": 1},
+            {"op": "pgn", "game": 1},
+            {"op": "close", "game": 1},
+            {"op": "state", "game": 1},
+        ],
+    )
+    assert new["game"] == 1
+    assert new["turn"] == "white"
+    assert "e2e4" in new["legal"]
+    assert move["turn"] == "white"
+    assert move["engine_move"]
+    assert state["fen"] == move["fen"]
+    assert "1. e4 " in pgn["pgn"]
+    assert closed == {"game": 1, "closed": True}
+    assert "error" in gone
+
+
+def test_rejected_requests(tmp_path):
+    replies = run_server(
+        tmp_path,
+        [
+            "not json",
+            {"op": "new", "fen": "6k1/5ppp/8/8/8/8/8/R5K1 w - - 0 1"},
+            {"op": "move", "game": 1, "move": "a1a9"},
+            {"op": "move", "game": 1, "move": "a1b2"},
+            {"op": "move", "game": 1, "move": "a1a8"},
+            {"op": "move", "game": 1, "move": "g8h8"},
+            {"op": "new", "engine": "purple"},
+        ],
+    )
+    assert "error" in replies[0]
+    assert "engine_move" not in replies[1]
+    assert replies[2]["error"].startswith("Invalid move")
+    assert replies[3]["error"].startswith("Illegal move")
+    assert replies[4]["result"] == "1-0"
+    assert replies[5]["error"] == "The game is over"
+    assert "error" in replies[6]
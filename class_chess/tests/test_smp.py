@@ -0,0 +1,107 @@
+import time
+
+import pytest
+
+from movegen import move_uci
+from position import Position
+from search import EXACT, LOWER, MATE_SCORE, SCORE_OFFSET, SearchLimits, evaluate
+import smp
+from smp import ParallelSearcher, SharedTranspositionTable
+
+MATE_IN_ONE_FEN = "6k1/5ppp/8/8/8/8/8/R5K1 w - - 0 1"
+
+
+def test_shared_table_is_visible_to_attached_tables():
+    table = SharedTranspositionTable(1)
+    attached = SharedTranspositionTable(1, table.name)
+    try:
+        key = 0x123456789ABCDEF0
+        table.store(key, 7, -MATE_SCORE + 3, EXACT, 1234)
+        assert attached.probe(key) == (7, -MATE_SCORE + 3, EXACT, 1234)
+        assert attached.probe(key ^ 1) is None
+        attached.store(key, 9, 55, LOWER, 42)
+        assert table.probe(key) == (9, 55, LOWER, 42)
+    finally:
+        attached.close()
+        table.close()
+
+
+def test_parallel_search_finds_mate():
+    with ParallelSearcher(threads=2, size_mb=1) as searcher:
+        position = Position.from_fen(MATE_IN_ONE_FEN)
+        result = searcher.search(position, SearchLimits(depth=4))
+    assert move_uci(result.move) == "a1a8"
+    assert result.score == MATE_SCORE - 1
+    assert position.fen() == MATE_IN_ONE_FEN
+
+
+class Zero:
+    """Scores every position as level."""
+
+    def __call__(self, position):
+        return 0
+
+
+def test_helpers_use_the_main_evaluator():
+    with ParallelSearcher(threads=3, size_mb=1, evaluator_factory=Zero) as searcher:
+        assert isinstance(searcher.evaluate, Zero)
+        result = searcher.search(Position.starting(), SearchLimits(depth=3))
+        scores = [
+            searcher.tt.words[2 * index + 1] >> 32
+            for index in range(searcher.tt.size)
+            if searcher.tt.words[2 * index + 1]
+        ]
+    assert result.score == 0
+    assert scores
+    # Helpers scoring with the classical evaluator would store other values.
+    assert set(scores) == {SCORE_OFFSET}
+
+
+def material_evaluator():
+    return evaluate
+
+
+def test_parallel_search_with_material_evaluation():
+    with ParallelSearcher(
+        threads=2, size_mb=1, evaluator_factory=material_evaluator
+    ) as searcher:
+        assert searcher.evaluate is evaluate
+        position = Position.from_fen(MATE_IN_ONE_FEN)
+        result = searcher.search(position, SearchLimits(depth=2))
+    assert move_uci(result.move) == "a1a8"
+
+
+def test_rejects_main_only_evaluator():
+    with pytest.raises(ValueError):
+        ParallelSearcher(threads=2, size_mb=1, evaluator=Zero())
+
+
+def test_dead_helper_is_dropped():
+    with ParallelSearcher(threads=3, size_mb=1) as searcher:
+        dead = searcher.helpers[0]
+        dead.kill()
+        dead.join()
+        position = Position.from_fen(MATE_IN_ONE_FEN)
+        result = searcher.search(position, SearchLimits(depth=3))
+        assert len(searcher.helpers) == 1
+        assert dead not in searcher.helpers
+        # The remaining helper still takes part in later searches.
+        result = searcher.search(position, SearchLimits(depth=3))
+    assert move_uci(result.move) == "a1a8"
+
+
+class Slow:
+    """Scores every position as level, slowly enough to miss stop checks."""
+
+    def __call__(self, position):
+        time.sleep(0.01)
+        return 0
+
+
+def test_hung_helper_is_dropped(monkeypatch):
+    monkeypatch.setattr(smp, "HELPER_STOP_SECONDS", 0.2)
+    with ParallelSearcher(threads=2, size_mb=1, evaluator_factory=Slow) as searcher:
+        start = time.perf_counter()
+        searcher.search(Position.starting(), SearchLimits(depth=1))
+        assert time.perf_counter() - start < 5
+        assert not searcher.helpers
@@ -0,0 +1,72 @@
+import os
+
+os.environ.setdefault("SDL_VIDEODRIVER", "dummy")
+
+# pylint: disable=wrong-import-position
+import pygame
+import pytest
+
+import spritesheet
+from chess_set import Piece
+from render import init_headless
+from spritesheet import PIECE_SCALE, SpriteAtlas, SpriteSheet, get_atlas
+
+
+@pytest.fixture(autouse=True)
+def display():
+    init_headless()
+
+
+def test_sheet_is_loaded_once(monkeypatch):
+    loads = []
+
+    class CountingSheet(SpriteSheet):
+        def __init__(self, filename):
+            loads.append(filename)
+            super().__init__(filename)
+
+    monkeypatch.setattr(spritesheet, "SpriteSheet", CountingSheet)
+    atlas = SpriteAtlas()
+    king = atlas.sprite("white", "king")
+    assert atlas.sprite("white", "king") is king
+    atlas.sprite("black", "pawn")
+    atlas.sprite("black", "pawn", 64)
+    assert loads == [spritesheet.PIECES_FILENAME]
+
+
+def test_atlas_is_shared():
+    assert get_atlas() is get_atlas()
+    assert get_atlas().sprite("black", "queen") is get_atlas().sprite("black", "queen")
+
+
+def test_native_and_scaled_sizes():
+    atlas = get_atlas()
+    native = atlas.sprite("white", "rook")
+    sheet = SpriteSheet(spritesheet.PIECES_FILENAME)
+    assert (
+        native.get_size() == sheet.load_grid_images(2, 6, 64, 72, 68, 48)[8].get_size()
+    )
+    scaled = atlas.sprite("white", "rook", 64)
+    assert max(scaled.get_size()) == round(64 * PIECE_SCALE)
+    assert scaled.get_colorkey() == native.get_colorkey()
+
+
+def test_piece_image_is_loaded_lazily(monkeypatch):
+    requests = []
+    atlas = get_atlas()
+
+    class RecordingAtlas:
+        def sprite(self, color, name, size=None):
+            requests.append((color, name, size))
+            return atlas.sprite(color, name, size)
+
+    monkeypatch.setattr(spritesheet, "get_atlas", RecordingAtlas)
+    screen = pygame.Surface((128, 128))
+    piece = Piece(screen, "knight", "white")
+    assert requests == []
+    image = piece.image
+    assert piece.image is image
+    assert requests == [("white", "knight", None)]
+    assert image is atlas.sprite("white", "knight")
+    piece.blitme((64, 64))
+    assert piece.rect.center == (64, 64)
@@ -0,0 +1,116 @@
+import os
+import shutil
+
+import pytest
+
+from movegen import checkers, legal_moves, move_uci
+from position import Position
+from search import TABLEBASE_SCORE, Searcher, SearchLimits
+from tablebase import Tablebase
+
+pytest.importorskip("chess.syzygy")
+
+# The three-piece tables, as shipped with python-chess's test data.
+SYZYGY_DIR = os.path.join(os.path.dirname(__file__), "syzygy")
+MATE_IN_ONE_FEN = "7k/8/6K1/8/8/8/8/1Q6 w - - 0 1"
+LONG_WIN_FEN = "8/8/8/3k4/8/8/8/KQ6 w - - {clock} 1"
+
+
+@pytest.fixture
+def tablebase():
+    tables = Tablebase(SYZYGY_DIR)
+    yield tables
+    tables.close()
+
+
+def is_checkmate(position):
+    return bool(checkers(position)) and not legal_moves(position)
+
+
+@pytest.mark.parametrize(
+    "fen, wdl",
+    [
+        (MATE_IN_ONE_FEN, 2),
+        ("1Q5k/8/6K1/8/8/8/8/8 b - - 0 1", -2),  # checkmated
+        ("7K/8/6k1/8/8/8/8/1q6 b - - 0 1", 2),  # colours reversed
+        ("k7/2Q5/1K6/8/8/8/8/8 b - - 0 1", 0),  # stalemate
+        ("8/8/8/8/8/8/Qk6/7K b - - 0 1", 0),  # the queen falls
+        ("8/8/8/8/8/8/8/KN5k w - - 0 1", 0),  # insufficient material
+        ("8/8/8/8/8/8/8/K6k w - - 0 1", 0),  # bare kings
+        ("4k3/8/8/8/8/8/8/R3K3 w Q - 0 1", None),  # castling rights
+        ("7k/8/6K1/8/8/8/P7/Q7 w - - 0 1", None),  # four pieces
+    ],
+)
+def test_probe(tablebase, fen, wdl):
+    position = Position.from_fen(fen)
+    assert tablebase.max_pieces == 3
+    assert tablebase.probe_wdl(position) == wdl
+    assert tablebase.probe(position) == wdl
+
+
+def test_missing_tables(tmp_path):
+    for extension in (".rtbw", ".rtbz"):
+        shutil.copy(os.path.join(SYZYGY_DIR, "KQvK" + extension), tmp_path)
+    tables = Tablebase(str(tmp_path))
+    assert tables.probe(Position.from_fen(MATE_IN_ONE_FEN)) == 2
+    assert tables.probe(Position.from_fen("7k/8/6K1/8/8/8/8/R7 w - - 0 1")) is None
+    tables.close()
+
+
+def test_directory_without_tables_is_rejected(tmp_path):
+    with pytest.raises(ValueError, match="Syzygy"):
+        Tablebase(str(tmp_path))
+
+
+def test_fifty_move_rule(tablebase):
+    dtz = tablebase.probe_dtz(Position.from_fen(LONG_WIN_FEN.format(clock=0)))
+    assert dtz > 1
+    in_time = Position.from_fen(LONG_WIN_FEN.format(clock=100 - dtz))
+    assert tablebase.probe(in_time) == 2
+    too_late = Position.from_fen(LONG_WIN_FEN.format(clock=101 - dtz))
+    assert tablebase.probe_wdl(too_late) == 2
+    assert tablebase.probe(too_late) is None
+
+
+def test_probe_cache(tablebase):
+    position = Position.from_fen(LONG_WIN_FEN.format(clock=0))
+    tablebase.cache_size = 1
+    tablebase.probe_wdl(position)
+    tablebase.probe_wdl(position)
+    assert (tablebase.hits, tablebase.misses) == (1, 1)
+    tablebase.probe_dtz(position)
+    tablebase.probe_wdl(position)
+    assert (tablebase.hits, tablebase.misses) == (1, 3)
+
+
+@pytest.mark.parametrize(
+    "fen", [LONG_WIN_FEN.format(clock=0), "8/8/3k4/8/8/8/8/KR6 w - - 0 1"]
+)
+def test_best_moves_mate_in_time(tablebase, fen):
+    position = Position.from_fen(fen)
+    winner = position.turn
+    while not is_checkmate(position):
+        move, value = tablebase.best_move(position)
+        assert value == (2 if position.turn == winner else -2)
+        position.make_move(move)
+        assert position.halfmove_clock < 100
+    assert position.turn != winner
+
+
+def test_best_move_and_search(tablebase):
+    position = Position.from_fen(MATE_IN_ONE_FEN)
+    move, value = tablebase.best_move(position)
+    assert value == 2
+    position.make_move(move)
+    assert is_checkmate(position)
+    position.unmake_move()
+    result = Searcher(tablebase=tablebase).search(position, SearchLimits(depth=3))
+    assert move_uci(result.move) == move_uci(move)
+    assert result.score == TABLEBASE_SCORE
+
+
+def test_search_probes_inside_the_tree(tablebase):
+    position = Position.from_fen("8/8/8/3k4/8/8/1n6/KQ6 w - - 0 1")
+    result = Searcher(tablebase=tablebase).search(position, SearchLimits(depth=2))
+    assert move_uci(result.move) == "b1b2"
+    assert result.score == TABLEBASE_SCORE - 1
@@ -0,0 +1,125 @@
+import asyncio
+import io
+
+from movegen import legal_moves, move_uci, parse_uci
+from position import Position
+from uci import UCIEngine
+
+MATE_IN_ONE_FEN = "6k1/5ppp/8/8/8/8/8/R5K1 w - - 0 1"
+
+
+def session(commands, wait=True):
+    """Returns the engine's output lines for commands.
+
+    ``go`` commands are waited for unless wait is False, in which case the
+    search runs on while the following commands are handled.
+    """
+    output = io.StringIO()
+
+    async def run():
+        engine = UCIEngine(output)
+        for command in commands:
+            await engine.handle(command)
+            if (
+                wait
+                and command.startswith("go")
+                and "infinite" not in command
+                and engine.search_task is not None
+            ):
+                await engine.search_task
+        reader = asyncio.StreamReader()
+        reader.feed_eof()
+        await engine.run(reader)
+
+    asyncio.run(run())
+    return output.getvalue().splitlines()
+
+
+def bestmoves(lines):
+    return [line.split()[1] for line in lines if line.startswith("bestmove")]
+
+
+def test_handshake():
+    lines = session(["uci", "isready"])
+    assert lines[0] == "id name TensorChess"
+    assert "option name Hash type spin default 16 min 1 max 65536" in lines
+    assert lines[-2:] == ["uciok", "readyok"]
+
+
+def test_go_from_moves():
+    lines = session(["position startpos moves e2e4 e7e5", "go depth 2"])
+    position = Position.starting()
+    for uci in ("e2e4", "e7e5"):
+        position.make_move(parse_uci(uci))
+    assert [line.split()[2] for line in lines if line.startswith("info depth")] == [
+        "1",
+        "2",
+    ]
+    assert bestmoves(lines)[0] in {move_uci(move) for move in legal_moves(position)}
+
+
+def test_mate_score_and_bestmove():
+    lines = session([f"position fen {MATE_IN_ONE_FEN}", "go depth 3"])
+    assert "score mate 1" in lines[-2]
+    assert lines[-1] == "bestmove a1a8"
+
+
+def test_go_mate_limits_depth():
+    lines = session([f"position fen {MATE_IN_ONE_FEN}", "go mate 2"])
+    depths = [int(line.split()[2]) for line in lines if line.startswith("info depth")]
+    assert max(depths) <= 3
+    assert "score mate 1" in lines[-2]
+    assert lines[-1] == "bestmove a1a8"
+    engine = UCIEngine(io.StringIO())
+    assert engine.limits("mate 3").depth == 5
+    assert engine.limits("depth 2 mate 3").depth == 2
+
+
+def test_multipv_and_searchmoves():
+    lines = session(
+        [
+            "setoption name MultiPV value 3",
+            "position startpos",
+            "go depth 1 searchmoves a2a3 b2b3 c2c3 d2d4",
+        ]
+    )
+    infos = [line.split() for line in lines if line.startswith("info depth")]
+    assert [info[info.index("multipv") + 1] for info in infos] == ["1", "2", "3"]
+    moves = {info[info.index("pv") + 1] for info in infos}
+    assert moves < {"a2a3", "b2b3", "c2c3", "d2d4"}
+
+
+def test_infinite_search_waits_for_stop():
+    lines = session(["position startpos", "go infinite", "isready", "stop"], False)
+    assert len(bestmoves(lines)) == 1
+    assert lines[-1].startswith("bestmove")
+    assert lines.index("readyok") < len(lines) - 1
+
+
+def test_illegal_move_and_unknown_option():
+    lines = session(
+        ["position startpos moves e2e4 e2e4", "setoption name Colour value red"]
+    )
+    assert lines == [
+        "info string illegal move e2e4",
+        "info string unknown option Colour",
+    ]
+
+
+def test_malformed_commands_keep_the_engine_running(tmp_path):
+    lines = session(
+        [
+            "setoption name Hash value abc",
+            f"setoption name BookFile value {tmp_path / 'missing.bin'}",
+            "position fen 8/8/8 w - - 0 1",
+            "position startpos moves e2e4 e7e9",
+            "go depth two",
+            "go depth 1 searchmoves e7e5x",
+            f"position fen {MATE_IN_ONE_FEN}",
+            "go depth 2",
+            "isready",
+        ]
+    )
+    errors = [line for line in lines if line.startswith("info string error")]
+    assert len(errors) == 6
+    assert lines[-2:] == ["bestmove a1a8", "readyok"]